@@ -0,0 +1,72 @@
+import collections, threading
+from typing import Deque, Dict, Optional, Tuple
+import overhuman_config as cfg
+from overhuman_state import state
+
+ACEZ_WINDOW_SEC   = getattr(cfg, 'ACEZ_WINDOW_SEC', 45)
+ACEZ_DROP_PCT     = getattr(cfg, 'ACEZ_DROP_PCT', 1.0)
+ACEZ_SPIKE_PCT    = getattr(cfg, 'ACEZ_SPIKE_PCT', 1.0)
+ACEZ_COOLDOWN_SEC = getattr(cfg, 'ACEZ_COOLDOWN_SEC', 120)
+
+class CollapseSpikeDetector:
+    """Rolling max/min over the last window_sec of prices with monotonic deques (amortized O(1) per sample).
+    COLLAPSE when the price is drop_pct below the window max, SPIKE when spike_pct above the window min.
+    update() is not thread-safe; AceZMonitor serializes it per symbol with `lock`."""
+    __slots__ = ('window', 'drop', 'spike', 'maxq', 'minq', 'lock')
+
+    def __init__(self, window_sec: float = ACEZ_WINDOW_SEC, drop_pct: float = ACEZ_DROP_PCT, spike_pct: float = ACEZ_SPIKE_PCT):
+        self.window = window_sec; self.drop = drop_pct; self.spike = spike_pct
+        self.maxq: Deque[Tuple[float, float]] = collections.deque()  # prices decreasing front -> back
+        self.minq: Deque[Tuple[float, float]] = collections.deque()  # prices increasing front -> back
+        self.lock = threading.Lock()
+
+    def update(self, ts: float, price: float) -> Optional[Tuple[str, float]]:
+        maxq = self.maxq; minq = self.minq
+        while maxq and maxq[-1][1] <= price: maxq.pop()
+        maxq.append((ts, price))
+        while minq and minq[-1][1] >= price: minq.pop()
+        minq.append((ts, price))
+        cutoff = ts - self.window
+        while maxq[0][0] < cutoff: maxq.popleft()
+        while minq[0][0] < cutoff: minq.popleft()
+        # a lone sample leaves both extrema equal to the price, so drop/spike are 0 and nothing fires
+        mx = maxq[0][1]; mn = minq[0][1]
+        drop = (mx - price)*100.0/price if price else 0.0
+        if drop >= self.drop: return ('COLLAPSE', drop)
+        spike = (price - mn)*100.0/mn if mn else 0.0
+        if spike >= self.spike: return ('SPIKE', spike)
+        return None
+
+class AceZMonitor:
+    """One detector per symbol, fed from every price update (stream ticks, kline updates, REST samples).
+    The newest event waits until the symbol is evaluated; take() applies ACEZ_COOLDOWN_SEC per (symbol, side)."""
+
+    def __init__(self, window_sec: float = ACEZ_WINDOW_SEC, drop_pct: float = ACEZ_DROP_PCT,
+                 spike_pct: float = ACEZ_SPIKE_PCT, cooldown_sec: float = ACEZ_COOLDOWN_SEC):
+        self.window = window_sec; self.drop = drop_pct; self.spike = spike_pct; self.cooldown = cooldown_sec
+        self._det: Dict[str, CollapseSpikeDetector] = {}
+        self._pending: Dict[str, Tuple[str, float, float]] = {}
+        self._lock = threading.Lock()
+        self.streaming = False  # True once a market stream feeds on_price; per-evaluation samples are then skipped
+
+    def on_price(self, symbol: str, ts: float, price: float):
+        det = self._det.get(symbol)
+        if det is None:
+            with self._lock: det = self._det.setdefault(symbol, CollapseSpikeDetector(self.window, self.drop, self.spike))
+        with det.lock:
+            if det.maxq and ts < det.maxq[-1][0]: return  # out of order: the deques need non-decreasing timestamps
+            ev = det.update(ts, float(price))
+        if ev: self._pending[symbol] = (ev[0], ev[1], ts)
+
+    def pending(self, symbol: str) -> bool: return symbol in self._pending
+
+    def take(self, symbol: str, now: float) -> Optional[Tuple[str, str, float]]:
+        """(side, event_type, magnitude_pct) for a fresh event whose side is out of cooldown, else None."""
+        ev = self._pending.pop(symbol, None)
+        if ev is None or now - ev[2] > self.window: return None
+        etype, mag, _ = ev
+        side = 'LONG' if etype == 'COLLAPSE' else 'SHORT'
+        if now - state.get(symbol, side).acez_last_fire_ts < self.cooldown: return None
+        return side, etype, mag
+
+acez_monitor = AceZMonitor()
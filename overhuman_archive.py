@@ -0,0 +1,162 @@
+"""Append-only columnar kline archive: <root>/<SYMBOL>_<interval>/<column>.bin, one little-endian int64 /
+float64 array per column with no header, so any column is np.memmap'ed as-is (zero-copy reads).
+
+    python overhuman_archive.py info
+    python overhuman_archive.py backfill BTCUSDT ETHUSDT --bars 43200   # a month of 1m history
+"""
+import os, argparse, threading
+from typing import Dict, List, Optional
+import numpy as np
+import overhuman_config as cfg
+from utils import retry
+from overhuman_klines import interval_ms, parse_kline
+from overhuman_ratelimit import limiter, klines_weight
+
+KLINE_ARCHIVE_DIR          = getattr(cfg, 'KLINE_ARCHIVE_DIR', 'kline_archive')
+KLINE_ARCHIVE_BACKFILL_MAX = getattr(cfg, 'KLINE_ARCHIVE_BACKFILL_MAX', 10080)
+ARCHIVE_COLUMNS = (('open_time', '<i8'), ('open', '<f8'), ('high', '<f8'), ('low', '<f8'), ('close', '<f8'), ('volume', '<f8'))
+BACKFILL_PAGE = 1500  # max klines per request
+
+class KlineArchive:
+    """Closed bars only, strictly increasing open_time (holes allowed where the bot was down and
+    nothing backfilled). Rows are appended column by column; a crash between columns leaves a torn
+    tail, so the row count is the shortest column and the writer truncates back to it on open."""
+
+    def __init__(self, root: str = KLINE_ARCHIVE_DIR, interval: str = cfg.INTERVAL):
+        self.root = root; self.interval = interval; self.step_ms = interval_ms(interval)
+        self._files: Dict[str, list] = {}
+        self._last: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    # ----- layout -----
+    def path(self, symbol: str) -> str: return os.path.join(self.root, f'{symbol}_{self.interval}')
+
+    def symbols(self) -> List[str]:
+        tail = '_' + self.interval
+        try: return sorted(n[:-len(tail)] for n in os.listdir(self.root) if n.endswith(tail))
+        except OSError: return []
+
+    def count(self, symbol: str) -> int:
+        sizes = []
+        for name, _ in ARCHIVE_COLUMNS:
+            try: sizes.append(os.path.getsize(os.path.join(self.path(symbol), name + '.bin')))
+            except OSError: return 0
+        return min(sizes) // 8
+
+    # ----- writing -----
+    def _open(self, symbol: str) -> list:
+        files = self._files.get(symbol)
+        if files is not None: return files
+        with self._lock:
+            if symbol in self._files: return self._files[symbol]
+            p = self.path(symbol); os.makedirs(p, exist_ok=True)
+            n = self.count(symbol); files = []
+            for name, _ in ARCHIVE_COLUMNS:
+                f = open(os.path.join(p, name + '.bin'), 'ab'); f.truncate(n*8); files.append(f)
+            self._last[symbol] = int(self.columns(symbol)['open_time'][-1]) if n else -1
+            self._files[symbol] = files
+            return files
+
+    def last_open(self, symbol: str) -> int:
+        """open_time of the newest archived bar, -1 when empty."""
+        if symbol not in self._last: self._open(symbol)
+        return self._last[symbol]
+
+    def append(self, symbol: str, bars: List[tuple]) -> int:
+        """Append closed (open_time, open, high, low, close, volume, ...) bars; already archived ones are skipped."""
+        files = self._open(symbol); last = self._last[symbol]
+        new = [b for b in bars if b[0] > last]
+        if not new: return 0
+        new.sort(key=lambda b: b[0])
+        for j, ((_, dt), f) in enumerate(zip(ARCHIVE_COLUMNS, files)):
+            f.write(np.fromiter((b[j] for b in new), dtype=dt, count=len(new)).tobytes())
+        for f in files: f.flush()
+        self._last[symbol] = int(new[-1][0])
+        return len(new)
+
+    def on_bar(self, symbol: str, row: dict):
+        """KlineStore.on_close hook: archive every committed bar as it closes."""
+        if row['open_time'] <= self._last.get(symbol, -1): return  # warm-start / reset replays
+        try: self.append(symbol, [(row['open_time'], row['open'], row['high'], row['low'], row['close'], row['volume'])])
+        except OSError as e: print('[WARN] kline archive:', symbol, e)
+
+    def close(self):
+        with self._lock:
+            for files in self._files.values():
+                for f in files: f.close()
+            self._files.clear()
+
+    # ----- reading -----
+    def columns(self, symbol: str, start_ms: Optional[int] = None, end_ms: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """{column: read-only memmap slice} for start_ms <= open_time < end_ms (no copy)."""
+        n = self.count(symbol)
+        if n == 0: return {name: np.empty(0, dtype=dt) for name, dt in ARCHIVE_COLUMNS}
+        p = self.path(symbol)
+        cols = {name: np.memmap(os.path.join(p, name + '.bin'), dtype=dt, mode='r', shape=(n,)) for name, dt in ARCHIVE_COLUMNS}
+        ot = cols['open_time']
+        lo = int(np.searchsorted(ot, start_ms, 'left')) if start_ms is not None else 0
+        hi = int(np.searchsorted(ot, end_ms, 'left')) if end_ms is not None else n
+        return {k: v[lo:hi] for k, v in cols.items()}
+
+    def frame(self, symbol: str, start_ms: Optional[int] = None, end_ms: Optional[int] = None):
+        """Columns as a DataFrame in the overhuman_backtest.load_klines layout."""
+        import pandas as pd
+        cols = self.columns(symbol, start_ms, end_ms)
+        df = pd.DataFrame({k: np.asarray(v) for k, v in cols.items()})
+        df['close_time'] = df['open_time'] + self.step_ms - 1
+        return df
+
+    def tail(self, symbol: str, n: int) -> List[tuple]:
+        """Up to n newest bars as parse_kline tuples, cut at the newest hole so the result is contiguous."""
+        cols = self.columns(symbol)
+        ot = cols['open_time'][-n:]
+        if len(ot) == 0: return []
+        holes = np.flatnonzero(np.diff(ot) != self.step_ms)
+        start = int(holes[-1]) + 1 if len(holes) else 0
+        arrs = [np.asarray(cols[name][-n:][start:]).tolist() for name, _ in ARCHIVE_COLUMNS]
+        return [(int(t), o, h, l, c, v, int(t) + self.step_ms - 1) for t, o, h, l, c, v in zip(*arrs)]
+
+    # ----- REST backfill -----
+    def backfill(self, client, symbol: str, now_ms: int, max_bars: int = KLINE_ARCHIVE_BACKFILL_MAX) -> int:
+        """Fetch the closed bars between the newest archived one (or now_ms - max_bars bars when empty)
+        and now_ms in BACKFILL_PAGE pages. Gaps longer than max_bars keep their oldest part as a hole."""
+        last = self.last_open(symbol)
+        start = max(last + self.step_ms if last >= 0 else 0, now_ms - max_bars*self.step_ms)
+        start -= start % self.step_ms
+        added = 0
+        while start + self.step_ms <= now_ms:
+            limit = min(BACKFILL_PAGE, (now_ms - start)//self.step_ms)
+            limiter.acquire(klines_weight(limit))
+            kl = retry(lambda: client.futures_klines(symbol=symbol, interval=self.interval, startTime=start, limit=limit),
+                       name='klines_backfill', weight=klines_weight(limit), attempts=3, on_error=lambda e,i: print('[WARN] backfill attempt', symbol, i, e))
+            bars = [b for b in map(parse_kline, kl) if b[0] + self.step_ms <= now_ms]  # closed only
+            if not bars: break
+            added += self.append(symbol, bars)
+            start = bars[-1][0] + self.step_ms
+        return added
+
+def main():
+    ap = argparse.ArgumentParser(description='Local kline archive')
+    ap.add_argument('cmd', choices=['info', 'backfill'])
+    ap.add_argument('symbols', nargs='*')
+    ap.add_argument('--dir', default=KLINE_ARCHIVE_DIR)
+    ap.add_argument('--interval', default=cfg.INTERVAL)
+    ap.add_argument('--bars', type=int, default=KLINE_ARCHIVE_BACKFILL_MAX, help='history to fetch for an empty symbol')
+    args = ap.parse_args()
+    arch = KlineArchive(args.dir, args.interval)
+    if args.cmd == 'backfill':
+        import time
+        from utils import setup_client, load_env_overrides
+        load_env_overrides(cfg)
+        client = limiter.attach(setup_client(cfg.TESTNET))
+        for sym in args.symbols or getattr(cfg, 'SYMBOLS', [cfg.SYMBOL]):
+            print(f'[ARCHIVE] {sym} +{arch.backfill(client, sym, int(time.time()*1000), args.bars)} bars')
+        arch.close()
+    for sym in args.symbols or arch.symbols():
+        ot = arch.columns(sym)['open_time']
+        if len(ot) == 0: print(f'[ARCHIVE] {sym} empty'); continue
+        holes = int(np.count_nonzero(np.diff(ot) != arch.step_ms))
+        print(f'[ARCHIVE] {sym} {len(ot)} bars {np.datetime64(int(ot[0]), "ms")} .. {np.datetime64(int(ot[-1]), "ms")} holes={holes}')
+
+if __name__ == '__main__':
+    main()
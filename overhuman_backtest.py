@@ -0,0 +1,185 @@
+# overhuman_backtest.py - offline replay of the live strategy over historical klines
+import os, glob, time, argparse
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+import overhuman_config as cfg
+from overhuman_indicators import add_indicators
+from overhuman_filters import market_filters_mask, signal_vector
+from overhuman_klines import KLINE_COLUMNS, interval_ms
+
+# knobs the simulation reads; names match overhuman_config so sweeps can address them directly
+PARAM_KEYS = ['MIN_VOL_PCT','DOJI_ATR_RATIO','VOL_BOOST_FACTOR','BB_WIDTH_MIN','MIN_ADX',
+              'BASE_SL_PCT','BASE_TP_PCT','ADAPT_TRIGGER_ATR','TP_EXPAND_FACTOR','TRAIL_SL_LOCK_PCT',
+              'MICRO_TP_TRIGGER_MINUTES','MICRO_TP_PCT','BACKTEST_FEE_PCT']
+
+def default_params() -> dict:
+    p = {k: float(getattr(cfg, k)) for k in PARAM_KEYS if hasattr(cfg, k)}
+    p.setdefault('BACKTEST_FEE_PCT', 0.04)
+    return p
+
+# ===== Loading =====
+def load_klines(path: str) -> pd.DataFrame:
+    """CSV (with or without header, Binance kline layout), Parquet or a KlineArchive symbol directory
+    (<SYMBOL>_<interval>/) -> float OHLCV frame sorted by open_time."""
+    if _is_archive(path):
+        from overhuman_archive import KlineArchive
+        root, name = os.path.split(os.path.normpath(path)); sym, interval = name.rsplit('_', 1)
+        return KlineArchive(root, interval).frame(sym)
+    if path.endswith('.parquet') or path.endswith('.pq'):
+        df = pd.read_parquet(path)
+    else:
+        with open(path) as f: first = f.readline().split(',')[0].strip()
+        if first.lstrip('-').isdigit():
+            df = pd.read_csv(path, header=None)
+            df.columns = KLINE_COLUMNS[:len(df.columns)]
+        else:
+            df = pd.read_csv(path)
+    for c in ['open','high','low','close','volume']: df[c] = df[c].astype(float)
+    df['open_time'] = df['open_time'].astype('int64')
+    return df.sort_values('open_time').drop_duplicates('open_time').reset_index(drop=True)
+
+def _is_archive(path: str) -> bool: return os.path.isfile(os.path.join(path, 'open_time.bin'))
+
+def symbol_from_path(path: str) -> str:
+    stem = os.path.basename(path).split('.')[0]
+    return stem.split('-')[0].split('_')[0].upper()
+
+def load_universe(paths: Iterable[str]) -> Dict[str, pd.DataFrame]:
+    """Files or globs -> {symbol: frame}; several files of one symbol (monthly dumps) are concatenated."""
+    files: Dict[str, List[str]] = {}
+    for p in paths:
+        hits = sorted(glob.glob(os.path.join(p, '*'))) if os.path.isdir(p) and not _is_archive(p) else sorted(glob.glob(p))
+        for f in hits:
+            if f.endswith(('.csv', '.parquet', '.pq')) or _is_archive(f): files.setdefault(symbol_from_path(f), []).append(f)
+    out = {}
+    for sym, fs in files.items():
+        df = pd.concat([load_klines(f) for f in fs], ignore_index=True) if len(fs) > 1 else load_klines(fs[0])
+        out[sym] = df.sort_values('open_time').drop_duplicates('open_time').reset_index(drop=True)
+    return out
+
+# ===== Vectorized preparation =====
+INDICATOR_KEYS = ['ATR_WINDOW','VOL_WINDOW','BB_WINDOW','ADX_PERIOD']
+
+def prepare(df: pd.DataFrame, params: Optional[dict] = None) -> pd.DataFrame:
+    """Indicator columns for the whole history in one pass. Only INDICATOR_KEYS affect them;
+    filter/exit knobs can be swept over the same prepared frame."""
+    p = params or {}
+    kw = {k.lower(): int(p.get(k, getattr(cfg, k))) for k in INDICATOR_KEYS}
+    return add_indicators(df[['open_time','open','high','low','close','volume']], **kw)
+
+def signals(ind, p: dict) -> np.ndarray:
+    """Filter mask AND signal as one int8 column: +1 long entry, -1 short entry, 0 nothing.
+    ind is a frame or any {column: Series} mapping."""
+    mask = market_filters_mask(ind, None, p['MIN_VOL_PCT'], p['DOJI_ATR_RATIO'], p['VOL_BOOST_FACTOR'], p['BB_WIDTH_MIN'], p['MIN_ADX'])
+    return (signal_vector(ind) * mask.astype('int8')).to_numpy()
+
+# ===== Trade simulation =====
+def atr_bracket(entry: float, atr: float, p: dict) -> Tuple[float, float]:
+    """Float mirror of execution.calc_atr_sl_tp -> (sl_pct, tp_pct)."""
+    if not atr or atr != atr:
+        return p['BASE_SL_PCT'], p['BASE_TP_PCT']
+    sl_pct = max(atr / entry * 100, p['BASE_SL_PCT'])
+    tp_pct = min(p['BASE_TP_PCT'] + atr / entry * 100 * 1.2, 10.0)
+    return sl_pct, tp_pct
+
+def _walk(o, h, l, c, atr, i: int, sgn: int, p: dict, hold_bars: int) -> Tuple[int, float, str]:
+    """Follow one position opened at close[i] until SL/TP/micro-TP; rearm swaps the bracket once.
+    Scans forward in growing vectorized chunks; SL wins when both levels sit inside one bar."""
+    n = len(c); entry = c[i]
+    sl_pct, tp_pct = atr_bracket(entry, atr[i], p)
+    tp = entry * (1 + sgn*tp_pct/100); sl = entry * (1 - sgn*sl_pct/100)
+    trigger = p['ADAPT_TRIGGER_ATR']; micro_pct = p['MICRO_TP_PCT']
+    rearmed = False; j = i + 1; chunk = 64
+    while j < n:
+        hi = min(n, j + chunk)
+        H = h[j:hi]; L = l[j:hi]; C = c[j:hi]; A = atr[j:hi]
+        if sgn > 0: sl_hit = L <= sl; tp_hit = H >= tp; moved = C - entry
+        else: sl_hit = H >= sl; tp_hit = L <= tp; moved = entry - C
+        micro = (np.arange(j - i, hi - i) >= hold_bars) & (moved / entry * 100 >= micro_pct)
+        ev = sl_hit | tp_hit | micro
+        if not rearmed:
+            rearm = (moved > 0) & (A > 0) & (moved >= trigger * A)
+            ev = ev | rearm
+        if not ev.any():
+            j = hi; chunk *= 2; continue
+        r = int(ev.argmax()); jj = j + r
+        if sl_hit[r]: return jj, (min(o[jj], sl) if sgn > 0 else max(o[jj], sl)), 'SL'
+        if tp_hit[r]: return jj, (max(o[jj], tp) if sgn > 0 else min(o[jj], tp)), 'TP'
+        if micro[r]: return jj, C[r], 'MICRO_TP'
+        # adaptive rearm at this bar's close (maybe_rearm_adaptive): expanded TP, SL locked near entry
+        tp = entry * (1 + sgn*p['BASE_TP_PCT']*p['TP_EXPAND_FACTOR']/100)
+        sl = entry * (1 - sgn*max(0.05, p['TRAIL_SL_LOCK_PCT'])/100)
+        rearmed = True; j = jj + 1; chunk = 64
+    return n - 1, c[n - 1], 'EOD'
+
+def simulate(ind, sig: np.ndarray, p: dict, bar_ms: int, symbol: str = '') -> List[dict]:
+    """Hedge-mode replay: LONG and SHORT are independent, one open position per side."""
+    o = ind['open'].to_numpy(); h = ind['high'].to_numpy(); l = ind['low'].to_numpy()
+    c = ind['close'].to_numpy(); atr = ind['atr'].to_numpy(); t = ind['open_time'].to_numpy()
+    hold_bars = int(np.ceil(p['MICRO_TP_TRIGGER_MINUTES'] * 60_000 / bar_ms))
+    fee = 2 * p['BACKTEST_FEE_PCT']
+    trades = []
+    for sgn, side in ((1, 'LONG'), (-1, 'SHORT')):
+        idx = np.flatnonzero(sig == sgn); k = 0
+        while k < len(idx):
+            i = int(idx[k])
+            if i >= len(c) - 1: break
+            jj, px, reason = _walk(o, h, l, c, atr, i, sgn, p, hold_bars)
+            gross = sgn * (px - c[i]) / c[i] * 100
+            trades.append({'symbol': symbol, 'side': side, 'entry_time': int(t[i]), 'exit_time': int(t[jj]) + bar_ms,
+                           'entry_price': float(c[i]), 'exit_price': float(px), 'bars': jj - i,
+                           'pnl_pct': float(gross - fee), 'reason': reason})
+            k = int(np.searchsorted(idx, jj + 1))
+    return trades
+
+def summarize(trades: pd.DataFrame) -> dict:
+    if trades.empty:
+        return {'trades': 0, 'win_rate': 0.0, 'net_pct': 0.0, 'avg_pct': 0.0, 'profit_factor': 0.0, 'max_dd_pct': 0.0}
+    pnl = trades.sort_values('exit_time')['pnl_pct'].to_numpy()
+    eq = np.cumsum(pnl); dd = float((np.maximum.accumulate(np.maximum(eq, 0)) - eq).max())
+    gains = pnl[pnl > 0].sum(); losses = -pnl[pnl < 0].sum()
+    return {'trades': int(len(pnl)), 'win_rate': float((pnl > 0).mean()), 'net_pct': float(pnl.sum()),
+            'avg_pct': float(pnl.mean()), 'profit_factor': float(gains / losses) if losses > 0 else float('inf'),
+            'max_dd_pct': dd}
+
+def run_backtest(frames: Dict[str, pd.DataFrame], params: Optional[dict] = None, interval: str = cfg.INTERVAL,
+                 prepared: Optional[Dict[str, pd.DataFrame]] = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """frames: {symbol: raw klines}. prepared (optional) reuses indicator frames across runs.
+    Returns (trades, per-symbol summary with a TOTAL row)."""
+    p = default_params(); p.update(params or {})
+    bar_ms = interval_ms(interval)
+    rows = []; summary = []
+    for sym, df in frames.items():
+        ind = prepared[sym] if prepared is not None and sym in prepared else prepare(df, p)
+        tr = simulate(ind, signals(ind, p), p, bar_ms, sym)
+        rows += tr
+        summary.append({'symbol': sym, **summarize(pd.DataFrame(tr))})
+    trades = pd.DataFrame(rows, columns=['symbol','side','entry_time','exit_time','entry_price','exit_price','bars','pnl_pct','reason'])
+    summary.append({'symbol': 'TOTAL', **summarize(trades)})
+    return trades, pd.DataFrame(summary)
+
+def main():
+    ap = argparse.ArgumentParser(description='Replay the strategy over historical klines (CSV/Parquet).')
+    ap.add_argument('paths', nargs='+', help='files, globs or directories (CSV/Parquet or kline archive <SYMBOL>_<interval> dirs); symbol is taken from the name')
+    ap.add_argument('--interval', default=cfg.INTERVAL)
+    ap.add_argument('--set', action='append', default=[], metavar='KEY=VALUE', help='override a parameter')
+    ap.add_argument('--trades-out', help='write the trade list to this CSV')
+    ap.add_argument('--check-fast', action='store_true', help='verify the float filter path against the Decimal path')
+    args = ap.parse_args()
+    params = {k: float(v) for k, v in (s.split('=', 1) for s in args.set)}
+    t0 = time.time(); frames = load_universe(args.paths)
+    bars = sum(len(f) for f in frames.values())
+    print(f'[BT] loaded {len(frames)} symbols / {bars} bars in {time.time()-t0:.2f}s')
+    if args.check_fast:
+        from overhuman_filters import check_fast_equivalence
+        for sym, df in frames.items():
+            bad = check_fast_equivalence(prepare(df))
+            print(f'[BT] fast path {sym}: ' + ('OK' if not bad else f'{len(bad)} mismatching rows, first at {bad[:5]}'))
+    t0 = time.time(); trades, summary = run_backtest(frames, params, args.interval)
+    print(f'[BT] simulated in {time.time()-t0:.2f}s')
+    print(summary.to_string(index=False))
+    if args.trades_out: trades.to_csv(args.trades_out, index=False)
+
+if __name__ == '__main__':
+    main()
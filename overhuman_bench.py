@@ -0,0 +1,258 @@
+"""Hot-path benchmarks on kline fixtures, with the paper exchange as the client. Results go to JSON and
+can be compared against a saved baseline. The fixtures in bench_fixtures/ are synthetic random walks
+(overhuman_paper.synthetic_klines, fixed seeds), not recorded market data, until `record` replaces them.
+
+    python overhuman_bench.py                                   # all cases -> bench_results.json
+    python overhuman_bench.py --only indicators,filters --quick
+    python overhuman_bench.py --save-baseline                   # also store as bench_baseline.json
+    python overhuman_bench.py --baseline bench_baseline.json    # compare; exit 1 on a regression
+    python overhuman_bench.py record BTCUSDT ETHUSDT --bars 1000  # replace the synthetic fixtures with real klines
+"""
+import os, io, csv, sys, json, time, glob, argparse, platform, subprocess, contextlib, tracemalloc
+from decimal import Decimal
+from typing import Callable, Dict, List
+import numpy as np
+import overhuman_config as cfg
+
+BENCH_FIXTURE_DIR    = getattr(cfg, 'BENCH_FIXTURE_DIR', 'bench_fixtures')
+BENCH_RESULTS_FILE   = getattr(cfg, 'BENCH_RESULTS_FILE', 'bench_results.json')
+BENCH_BASELINE_FILE  = getattr(cfg, 'BENCH_BASELINE_FILE', 'bench_baseline.json')
+BENCH_CYCLE_SYMBOLS  = getattr(cfg, 'BENCH_CYCLE_SYMBOLS', [4, 50, 200])
+BENCH_REGRESSION_PCT = getattr(cfg, 'BENCH_REGRESSION_PCT', 15.0)  # p50 slowdown that counts as a regression
+FIXTURE_SYMBOLS = max(BENCH_CYCLE_SYMBOLS)
+FIXTURE_BARS    = 600  # 300 warm-up + room for the cycle runs
+WINDOW          = 300  # bars per evaluation, as KLINE_BUFFER_SIZE / get_klines(limit=300)
+CASES = ('klines', 'indicators', 'filters', 'acez', 'risk', 'cycle')
+
+# ===== Fixtures =====
+def fixture_paths(root: str = BENCH_FIXTURE_DIR) -> List[str]:
+    return sorted(glob.glob(os.path.join(root, f'*_{cfg.INTERVAL}.csv')))
+
+def write_fixture(root: str, symbol: str, klines: List[list]):
+    os.makedirs(root, exist_ok=True)
+    with open(os.path.join(root, f'{symbol}_{cfg.INTERVAL}.csv'), 'w', newline='') as f: csv.writer(f).writerows(klines)
+
+def ensure_fixtures(root: str = BENCH_FIXTURE_DIR, symbols: int = FIXTURE_SYMBOLS, bars: int = FIXTURE_BARS) -> List[str]:
+    """Synthetic fixtures are written once so every later run (and the baseline) replays the same bars."""
+    paths = fixture_paths(root)
+    if len(paths) >= symbols: return paths
+    from overhuman_paper import synthetic_klines
+    for j in range(len(paths), symbols):
+        write_fixture(root, f'BENCH{j:03d}USDT', synthetic_klines(bars, seed=7919*j + 1, start_price=5.0 + j))
+    print(f'[BENCH] wrote synthetic fixtures to {root}/ ({symbols} x {bars} bars)')
+    return fixture_paths(root)
+
+def load_fixtures(root: str, symbols: int) -> Dict[str, List[list]]:
+    """{symbol: raw REST-layout klines}; recorded symbols are cycled when fewer than asked for."""
+    from overhuman_paper import klines_from_csv
+    from overhuman_backtest import symbol_from_path
+    paths = fixture_paths(root) or ensure_fixtures(root)
+    raw = [(symbol_from_path(p), klines_from_csv(p)) for p in paths[:symbols]]
+    out = {}
+    for j in range(symbols):
+        sym, kl = raw[j % len(raw)]
+        out[sym if j < len(raw) else f'{sym[:-4]}{j}USDT'] = kl
+    n = min(len(kl) for kl in out.values())
+    return {s: kl[:n] for s, kl in out.items()}
+
+def record(symbols: List[str], bars: int, root: str):
+    from utils import setup_client, load_env_overrides
+    from overhuman_ratelimit import limiter
+    load_env_overrides(cfg)
+    client = limiter.attach(setup_client(cfg.TESTNET))
+    for sym in symbols:
+        kl = client.futures_klines(symbol=sym, interval=cfg.INTERVAL, limit=min(bars, 1500))[:-1]  # closed bars only
+        write_fixture(root, sym, kl); print(f'[BENCH] recorded {sym} {len(kl)} bars')
+
+# ===== Measurement =====
+def measure(fn: Callable[[], object], n: int, per_call: int = 1, warmup: int = 3) -> dict:
+    """Time n calls of fn (each doing per_call operations). Latencies are per operation; peak_kb is the
+    largest Python allocation footprint of one call (tracemalloc, measured in a separate pass)."""
+    for _ in range(warmup): fn()
+    samples = np.empty(n)
+    for i in range(n):
+        t0 = time.perf_counter(); fn(); samples[i] = time.perf_counter() - t0
+    tracemalloc.start(); fn(); peak = tracemalloc.get_traced_memory()[1]; tracemalloc.stop()
+    return stats(samples / per_call, ops=n*per_call, total=float(samples.sum()), peak_kb=peak/1024)
+
+def stats(lat: np.ndarray, ops: int, total: float, peak_kb: float) -> dict:
+    p50, p90, p99 = np.percentile(lat, [50, 90, 99]) * 1e6
+    return {'ops': int(ops), 'ops_per_s': round(ops/total, 1) if total else None, 'p50_us': round(p50, 2),
+            'p90_us': round(p90, 2), 'p99_us': round(p99, 2), 'max_us': round(float(lat.max())*1e6, 2), 'peak_kb': round(peak_kb, 1)}
+
+# ===== Cases =====
+def _exchange(data: Dict[str, List[list]]):
+    from overhuman_paper import PaperExchange
+    return PaperExchange(data, start=WINDOW, latency_ms=0.0, jitter_ms=0.0, weight_limit=None)
+
+def bench_klines(data, n) -> dict:
+    import overhuman_commander_ultra as cu
+    from overhuman_klines import KlineStore
+    ex = _exchange(data); syms = list(data); sym = syms[0]; raw = ex.futures_klines(symbol=sym, interval=cfg.INTERVAL, limit=WINDOW)
+    it = iter(range(10**9))
+    def full():
+        store = KlineStore(ex); store.ingest(sym, raw)
+    store = KlineStore(ex); store.ingest(sym, raw)
+    return {'klines.get_klines': measure(lambda: cu.get_klines(ex, syms[next(it) % len(syms)]), n),
+            'klines.ingest_full': measure(full, n),
+            'klines.ingest_forming': measure(lambda: store.ingest(sym, raw[-2:]), n*10, per_call=1)}
+
+def bench_indicators(data, n) -> dict:
+    import pandas as pd
+    from overhuman_indicators import add_indicators, add_indicators_reference, compute_indicators, StreamingIndicators
+    from overhuman_klines import parse_kline
+    bars = [[parse_kline(k) for k in kl[:WINDOW]] for kl in data.values()]
+    cols = ['open_time', 'open', 'high', 'low', 'close', 'volume', 'close_time']
+    df = pd.DataFrame(bars[0], columns=cols); arr = np.array(bars, dtype=float)
+    H, L, C, V = arr[..., 2], arr[..., 3], arr[..., 4], arr[..., 5]
+    si = StreamingIndicators(); [si.push(b) for b in bars[0]]; nxt = bars[0][-1]
+    return {'indicators.add_indicators': measure(lambda: add_indicators(df), n),
+            'indicators.reference_pandas': measure(lambda: add_indicators_reference(df.copy()), max(5, n//4)),
+            'indicators.batch_per_symbol': measure(lambda: compute_indicators(H, L, C, V), max(5, n//4), per_call=len(bars)),
+            'indicators.stream_peek': measure(lambda: si.peek(nxt), n*10)}
+
+def bench_filters(data, n) -> dict:
+    import pandas as pd
+    from overhuman_indicators import add_indicators, StreamingIndicators
+    from overhuman_filters import market_filters_ok, pick_signal, market_filters_ok_fast, pick_signal_fast
+    from overhuman_klines import parse_kline
+    frames, rows = [], []
+    for kl in list(data.values())[:50]:
+        b = [parse_kline(k) for k in kl[:WINDOW]]
+        frames.append(add_indicators(pd.DataFrame(b, columns=['open_time', 'open', 'high', 'low', 'close', 'volume', 'close_time'])))
+        si = StreamingIndicators(); rows.append([si.push(x) for x in b][-1])
+    htf = {iv: {'ema_fast': 1.0 + j, 'ema_slow': 1.5} for j, iv in enumerate(('3m', '5m', '15m'))}
+    def decimal_path():
+        for f in frames:
+            if market_filters_ok(f, htf): pick_signal(f)
+    def fast_path():
+        for r in rows:
+            if market_filters_ok_fast(r, htf): pick_signal_fast(r)
+    return {'filters.decimal_frame': measure(decimal_path, n, per_call=len(frames)),
+            'filters.fast_row': measure(fast_path, n, per_call=len(rows))}
+
+def bench_acez(data, n) -> dict:
+    from overhuman_acez import CollapseSpikeDetector
+    # a tick stream: every bar's open / high / low / close, 15s apart
+    px = [float(x) for kl in list(data.values())[:4] for k in kl for x in (k[1], k[2], k[3], k[4])]
+    ticks = [(i*15.0, p) for i, p in enumerate(px)]
+    def run():
+        det = CollapseSpikeDetector()
+        for ts, p in ticks: det.update(ts, p)
+    return {'acez.detector_update': measure(run, max(5, n//10), per_call=len(ticks))}
+
+def bench_risk(data, n) -> dict:
+    from overhuman_risk import compute_risk_based_qty
+    from overhuman_exchange_info import parse_symbol_filters
+    from overhuman_equity import equity
+    from overhuman_portfolio import PortfolioRisk, Candidate
+    from overhuman_indicators import StreamingIndicators
+    from overhuman_klines import parse_kline
+    from utils import d
+    ex = _exchange(data); equity.refresh(ex)
+    filters = {s['symbol']: {k: d(v) for k, v in parse_symbol_filters(s).items()} for s in ex.futures_exchange_info()['symbols']}
+    syms = list(data)[:50]; cands = []
+    for j, s in enumerate(syms):
+        si = StreamingIndicators(); row = [si.push(parse_kline(k)) for k in data[s][:WINDOW]][-1]
+        cands.append(Candidate(s, 'SIGNAL', 'LONG' if j % 2 else 'SHORT', Decimal('1'), 'bench', row, Decimal(repr(row['close'])), filters[s]))
+    sym = syms[0]; price = cands[0].mark; sl = price * Decimal('0.006')
+    pr = PortfolioRisk(max_open=len(syms))
+    return {'risk.compute_risk_based_qty': measure(lambda: compute_risk_based_qty(ex, filters[sym], sl, sym, Decimal('1.2'), price), n*10),
+            'risk.portfolio_plan': measure(lambda: pr.plan(ex, cands, 0.0), max(5, n//4), per_call=len(cands))}
+
+def bench_cycle(root: str, sizes: List[int], cycles: int) -> dict:
+    """A full main() loop per cycle on the paper exchange, each size in a fresh interpreter (clean module
+    state, and peak RSS belongs to that run alone)."""
+    out = {}
+    for k in sizes:
+        res = subprocess.run([sys.executable, os.path.abspath(__file__), 'cycle-worker', '--symbols', str(k),
+                              '--cycles', str(cycles), '--fixtures', root], capture_output=True, text=True)
+        if res.returncode: print(f'[BENCH] cycle.{k} failed:', res.stderr.strip()[-400:]); continue
+        w = json.loads(res.stdout.strip().splitlines()[-1])
+        lat = np.array(w['cycle_s'][1:])  # the first includes boot + bootstrap
+        r = stats(lat, ops=len(lat), total=float(lat.sum()), peak_kb=w['max_rss_kb'])
+        r.update(symbols=k, first_cycle_ms=round(w['cycle_s'][0]*1000, 2), symbols_per_s=round(k*len(lat)/float(lat.sum()), 1))
+        out[f'cycle.{k}_symbols'] = r
+    return out
+
+def cycle_worker(args):
+    import tempfile, resource
+    from overhuman_paper import PaperExchange, run_bot
+    data = load_fixtures(args.fixtures, args.symbols)
+    cfg.USER_DATA_STREAM = True; cfg.MARKET_DATA_MODE = 'rest'
+    ex = PaperExchange(data, start=WINDOW, latency_ms=0.0, jitter_ms=0.0, weight_limit=None, leverage=cfg.LEVERAGE)
+    cycle_s: List[float] = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        run_bot(ex, args.cycles, log_prefix=os.path.join(tempfile.gettempdir(), 'bench_'), cycle_s=cycle_s)
+    print(json.dumps({'cycle_s': cycle_s, 'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}))
+
+# ===== Reporting =====
+def meta() -> dict:
+    import pandas as pd
+    try: rev = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError: rev = None
+    return {'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'git': rev, 'python': platform.python_version(),
+            'numpy': np.__version__, 'pandas': pd.__version__, 'machine': platform.machine(), 'cpus': os.cpu_count()}
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], threshold_pct: float) -> List[str]:
+    """Print new vs baseline p50 per case; returns the names that regressed by more than threshold_pct."""
+    bad = []
+    print(f'{"case":34s} {"base p50 us":>12s} {"p50 us":>12s} {"change":>8s}')
+    for name, r in results.items():
+        b = baseline.get(name)
+        if not b or not b.get('p50_us'): print(f'{name:34s} {"-":>12s} {r["p50_us"]:12.2f}       new'); continue
+        ch = (r['p50_us'] / b['p50_us'] - 1) * 100
+        flag = ' REGRESSION' if ch > threshold_pct else ''
+        if flag: bad.append(name)
+        print(f'{name:34s} {b["p50_us"]:12.2f} {r["p50_us"]:12.2f} {ch:+7.1f}%{flag}')
+    return bad
+
+def main():
+    ap = argparse.ArgumentParser(description='Benchmarks for the trading loop hot paths')
+    ap.add_argument('cmd', nargs='?', default='run', choices=['run', 'record', 'cycle-worker'])
+    ap.add_argument('record_symbols', nargs='*', metavar='SYMBOL', help='symbols to record (record)')
+    ap.add_argument('--fixtures', default=BENCH_FIXTURE_DIR)
+    ap.add_argument('--only', help=f'comma-separated subset of {",".join(CASES)}')
+    ap.add_argument('--n', type=int, default=200, help='samples per micro-benchmark')
+    ap.add_argument('--cycles', type=int, default=60, help='main() cycles per size')
+    ap.add_argument('--symbols', type=int, default=4, help='(cycle-worker) symbols')
+    ap.add_argument('--sizes', default=','.join(map(str, BENCH_CYCLE_SYMBOLS)), help='symbol counts for the cycle case')
+    ap.add_argument('--quick', action='store_true', help='fewer samples / cycles')
+    ap.add_argument('--bars', type=int, default=FIXTURE_BARS, help='(record) bars per symbol')
+    ap.add_argument('--out', default=BENCH_RESULTS_FILE)
+    ap.add_argument('--baseline', help='compare against this results file')
+    ap.add_argument('--save-baseline', action='store_true', help=f'also write the results to {BENCH_BASELINE_FILE}')
+    ap.add_argument('--threshold', type=float, default=BENCH_REGRESSION_PCT, help='p50 regression threshold in %%')
+    args = ap.parse_args()
+    if args.cmd == 'record': return record(args.record_symbols or getattr(cfg, 'SYMBOLS', [cfg.SYMBOL]), args.bars, args.fixtures)
+    if args.cmd == 'cycle-worker': return cycle_worker(args)
+    if args.quick: args.n = max(20, args.n // 5); args.cycles = max(10, args.cycles // 3)
+    cases = args.only.split(',') if args.only else list(CASES)
+    unknown = set(cases) - set(CASES)
+    if unknown: ap.error(f'unknown case(s): {",".join(sorted(unknown))}')
+    ensure_fixtures(args.fixtures)
+    data = load_fixtures(args.fixtures, 50)
+    results: Dict[str, dict] = {}
+    for case in cases:
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):  # the code under test logs
+            if case == 'cycle': results.update(bench_cycle(args.fixtures, [int(x) for x in args.sizes.split(',')], args.cycles))
+            else: results.update(globals()['bench_' + case](data, args.n))
+        print(f'[BENCH] {case} done in {time.perf_counter() - t0:.1f}s')
+    print(f'{"case":34s} {"ops/s":>12s} {"p50 us":>10s} {"p90 us":>10s} {"p99 us":>10s} {"peak kb":>9s}')
+    for name, r in results.items():
+        print(f'{name:34s} {r["ops_per_s"]:12.1f} {r["p50_us"]:10.2f} {r["p90_us"]:10.2f} {r["p99_us"]:10.2f} {r["peak_kb"]:9.1f}')
+    doc = {'meta': meta(), 'args': {k: v for k, v in vars(args).items() if k not in ('cmd', 'record_symbols')}, 'results': results}
+    with open(args.out, 'w') as f: json.dump(doc, f, indent=1)
+    print(f'[BENCH] results -> {args.out}')
+    if args.save_baseline:
+        with open(BENCH_BASELINE_FILE, 'w') as f: json.dump(doc, f, indent=1)
+        print(f'[BENCH] baseline -> {BENCH_BASELINE_FILE}')
+    if args.baseline:
+        with open(args.baseline) as f: base = json.load(f)['results']
+        bad = compare(results, base, args.threshold)
+        if bad: print(f'[BENCH] {len(bad)} regression(s) over {args.threshold}%:', ', '.join(bad)); raise SystemExit(1)
+
+if __name__ == '__main__':
+    main()
@@ -1,18 +1,28 @@
 # overhuman_commander_ultra_fixed.py
-import time, os, collections
-import pandas as pd
+import time
+_IMPORT_T0=time.perf_counter()
 from decimal import Decimal, ROUND_DOWN, ROUND_UP, getcontext
-from typing import Dict, Deque, Tuple, List
-from utils import setup_client, load_env_overrides, retry, d, adjust_qty_step
+from typing import Dict, List
+from utils import setup_client, load_env_overrides, retry, d
 import overhuman_config as cfg
-from overhuman_indicators import add_indicators
-from overhuman_filters import market_filters_ok, pick_signal
-from overhuman_risk import compute_risk_based_qty
-from overhuman_execution import (
-    get_position_side_amt, can_open_new_side, place_entry_market,
-    place_brackets, maybe_micro_tp, maybe_rearm_adaptive, _handle_trade_exit, calc_atr_sl_tp
-)
-from overhuman_telemetry import append_telemetry, metrics
+from overhuman_klines import KlineStore, KLINE_COLUMNS
+from overhuman_archive import KlineArchive
+from overhuman_htf import HTFEngine
+from overhuman_exchange_info import filter_registry
+from overhuman_stream import MarketStream, BinanceWSTransport, ReplayTransport, price_state
+from overhuman_userstream import UserDataStream, BinanceUserTransport
+from overhuman_positions import positions
+from overhuman_state import state
+from overhuman_equity import equity
+from overhuman_acez import acez_monitor
+from overhuman_scheduler import SymbolScheduler, BurstCadence
+from overhuman_ratelimit import limiter, klines_weight, WEIGHTS
+from overhuman_filters import market_filters_ok, pick_signal, market_filters_ok_fast, pick_signal_fast
+from overhuman_portfolio import portfolio, Candidate
+from overhuman_execution import place_entry_market, place_entry_with_brackets, calc_atr_sl_tp
+from overhuman_telemetry import append_telemetry
+from overhuman_metrics import metrics, serve_metrics, CycleProfiler
+IMPORT_SEC=time.perf_counter()-_IMPORT_T0
 
 getcontext().prec = 18
 
@@ -22,145 +32,301 @@ AFTERBURNER_SCAN_FACTOR   = getattr(cfg, 'AFTERBURNER_SCAN_FACTOR', 3)
 AFTERBURNER_MAX_DURATION  = getattr(cfg, 'AFTERBURNER_MAX_DURATION_SEC', 300)
 
 ACEZ_ENABLED              = getattr(cfg, 'ACEZ_ENABLED', True)
-ACEZ_WINDOW_SEC           = getattr(cfg, 'ACEZ_WINDOW_SEC', 45)
-ACEZ_DROP_PCT             = getattr(cfg, 'ACEZ_DROP_PCT', 1.0)
-ACEZ_SPIKE_PCT            = getattr(cfg, 'ACEZ_SPIKE_PCT', 1.0)
-ACEZ_COOLDOWN_SEC         = getattr(cfg, 'ACEZ_COOLDOWN_SEC', 120)
 ACEZ_QTY_FACTOR           = getattr(cfg, 'ACEZ_QTY_FACTOR', Decimal('0.5'))
 ACEZ_TP_SL_ATR_MULT       = getattr(cfg, 'ACEZ_TP_SL_ATR_MULT', (Decimal('0.6'), Decimal('0.8')))
 
+FAST_FILTERS              = getattr(cfg, 'FAST_FILTERS', True)
+HTF_ENABLED               = getattr(cfg, 'HTF_ENABLED', True)
+BATCH_ORDERS              = getattr(cfg, 'BATCH_ORDERS', True)
+
 SYMBOLS: List[str]        = getattr(cfg, 'SYMBOLS', [getattr(cfg, 'SYMBOL', 'BTCUSDT')])
-MAX_OPEN_POS              = getattr(cfg, 'MAX_OPEN_POSITIONS', 2)
+
+ENSURE_SETTINGS = getattr(cfg, 'ENSURE_SETTINGS', True)
+NO_POSITION_MODE_CHANGE = -4059  # "No need to change position side."
+BOOT: Dict[str, float] = {}  # startup phase -> seconds (last boot)
 
 # ===== Helpers =====
-def ensure_futures_settings(client, symbol, leverage, hedge_mode):
-    def _lev(): return client.futures_change_leverage(symbol=symbol, leverage=leverage)
-    def _pmode(): return client.futures_change_position_mode(dualSidePosition=hedge_mode)
-    try: retry(_lev, on_error=lambda e,i: print('[WARN]', symbol, 'leverage attempt', i, e))
-    except Exception as e: print('[WARN]', symbol, 'leverage:', e)
-    try: retry(_pmode, on_error=lambda e,i: print('[WARN]', symbol, 'position mode attempt', i, e))
-    except Exception as e: print('[WARN]', symbol, 'position mode:', e)
+def ensure_futures_settings(client, symbols, leverage, hedge_mode, workers: int = 8):
+    """Bring position mode (account-wide) and per-symbol leverage to the config. Reads the current
+    state first (one positionRisk + one position-mode call) and only changes what differs, the
+    leverage changes concurrently; unreadable state falls back to setting everything."""
+    try:
+        limiter.acquire(WEIGHTS['positions'])
+        current={r['symbol']: int(r['leverage']) for r in client.futures_position_information() if 'leverage' in r}
+    except Exception as e: current={}; print('[WARN] leverage read:', e)
+    try: dual=client.futures_get_position_mode().get('dualSidePosition')
+    except Exception as e: dual=None; print('[WARN] position mode read:', e)
+    if dual is None or bool(dual)!=bool(hedge_mode):
+        def _pmode():
+            try: return client.futures_change_position_mode(dualSidePosition=hedge_mode)
+            except Exception as e:
+                if getattr(e,'code',None)!=NO_POSITION_MODE_CHANGE: raise
+        try: retry(_pmode, attempts=2, name='position_mode', on_error=lambda e,i: print('[WARN] position mode attempt', i, e))
+        except Exception as e: print('[WARN] position mode:', e)
+    todo=[s for s in symbols if current.get(s)!=int(leverage)]
+    def _lev(symbol):
+        limiter.acquire(1)
+        try: retry(lambda: client.futures_change_leverage(symbol=symbol, leverage=leverage), attempts=2, name='leverage',
+                   on_error=lambda e,i: print('[WARN]', symbol, 'leverage attempt', i, e))
+        except Exception as e: print('[WARN]', symbol, 'leverage:', e)
+    pool=SymbolScheduler(min(workers, len(todo)) or 1)
+    try: pool.map(_lev, todo)
+    finally: pool.shutdown()
+    print(f'[BOOT] Settings: position mode {"ok" if dual is not None and bool(dual)==bool(hedge_mode) else "set"}, '
+          f'leverage {len(symbols)-len(todo)}/{len(symbols)} already {leverage}x')
+
+def _boot_phase(name: str, t0: float) -> float:
+    BOOT[name]=time.perf_counter()-t0; metrics.observe(f'boot{{phase="{name}"}}', BOOT[name])
+    return time.perf_counter()
 
 def fetch_filters(client, symbol):
-    info = client.futures_exchange_info()
-    sym = next((s for s in info['symbols'] if s['symbol']==symbol), None)
-    if not sym: raise RuntimeError(f'Symbol not found: {symbol}')
-    tick=d('0.1'); step=d('0.001'); min_notional=d('5'); min_qty=d('0.001')
-    for f in sym.get('filters', []):
-        t=f.get('filterType')
-        if t=='PRICE_FILTER': tick=d(f.get('tickSize', tick))
-        elif t=='LOT_SIZE': step=d(f.get('stepSize', step)); min_qty=d(f.get('minQty', min_qty))
-        elif t in ('MIN_NOTIONAL',): v=f.get('notional') or f.get('minNotional'); min_notional=d(v) if v else min_notional
-    return {'tick': tick, 'step': step, 'min_notional': min_notional, 'min_qty': min_qty}
-
-def adjust_qty_for_exchange(qty: Decimal, step: Decimal, min_notional: Decimal, mark: Decimal) -> Decimal:
-    """ปรับ qty ให้ปัด step size และผ่าน min_notional"""
+    filter_registry.load(client)
+    return filter_registry.get(symbol)
+
+def adjust_qty_for_exchange(qty: Decimal, step: Decimal = None, min_notional: Decimal = None, mark: Decimal = None, symbol: str = None) -> Decimal:
+    """ปรับ qty ให้ปัด step size และผ่าน min_notional (step/min_notional มาจาก filter registry ถ้าไม่ได้ส่งมา)"""
+    if step is None or min_notional is None:
+        f = filter_registry.get(symbol)
+        step = f['step'] if step is None else step
+        min_notional = f['min_notional'] if min_notional is None else min_notional
     qty = qty.quantize(step, rounding=ROUND_DOWN)
     if qty * mark < min_notional:
         qty = (min_notional / mark).quantize(step, rounding=ROUND_UP)
     return qty
 
 def get_klines(client, symbol, interval=cfg.INTERVAL, limit=300):
+    import pandas as pd
     kl = client.futures_klines(symbol=symbol, interval=interval, limit=limit)
-    df = pd.DataFrame(kl, columns=['open_time','open','high','low','close','volume','close_time','quote_volume','trades','taker_buy_base','taker_buy_quote','ignore'])
+    df = pd.DataFrame(kl, columns=KLINE_COLUMNS)
     for c in ['open','high','low','close','volume']: df[c] = df[c].astype(float)
     return df
 
-def _percent_change(a: float, b: float) -> float:
-    if b==0: return 0.0
-    return (a-b)*100.0/b
+def bracket_pcts(kind: str, mark: Decimal, atr, side: str):
+    """(tp_pct, sl_pct) for a new entry: ACE-Z uses ACEZ_TP_SL_ATR_MULT x ATR, signals use calc_atr_sl_tp."""
+    atr = d(atr) if atr is not None and atr == atr else None
+    if kind == 'ACE-Z' and atr:
+        tp_mult, sl_mult = ACEZ_TP_SL_ATR_MULT
+        return atr*d(tp_mult)/mark*Decimal('100'), atr*d(sl_mult)/mark*Decimal('100')
+    sl_pct, tp_pct, _ = calc_atr_sl_tp(mark, atr, side)
+    return tp_pct, sl_pct
+
+def open_entry(client, sym: str, kind: str, side: str, qty: Decimal, mark: Decimal, atr, filters):
+    direction = 'BUY' if side=='LONG' else 'SELL'
+    if not BATCH_ORDERS:
+        return place_entry_market(client, sym, direction, qty, cfg.HEDGE_MODE)
+    tp_pct, sl_pct = bracket_pcts(kind, mark, atr, side)
+    return place_entry_with_brackets(client, sym, direction, qty, mark, tp_pct, sl_pct, filters, cfg.HEDGE_MODE)
 
-def detect_collapse_spike(price_window: Deque[Tuple[float,float]], now_ts: float, window_sec: int, drop_pct: float, spike_pct: float):
-    while price_window and (now_ts-price_window[0][0]>window_sec): price_window.popleft()
-    if len(price_window)<2: return None
-    prices = [p for _,p in price_window]; cur=prices[-1]; mx=max(prices); mn=min(prices)
-    drop=_percent_change(mx,cur); spike=_percent_change(cur,mn)
-    if drop>=drop_pct: return ('COLLAPSE',drop)
-    if spike>=spike_pct: return ('SPIKE',spike)
-    return None
+def warm_start(client, kline_store, archive):
+    """Backfill each symbol's archive up to now over REST, seed the kline buffer (and the HTF hooks) from
+    it, then archive every bar as it closes. Symbols without history bootstrap with the usual full fetch."""
+    now_ms=kline_store.clock(); warm=filled=0
+    for sym in SYMBOLS:
+        try:
+            if archive.last_open(sym)>=0: filled+=archive.backfill(client, sym, now_ms)
+            bars=archive.tail(sym, kline_store.capacity)
+            if bars: kline_store.seed(sym, bars); warm+=1
+        except Exception as e: print('[WARN] kline archive warm start:', sym, e)
+    kline_store.on_close.append(archive.on_bar)
+    print(f'[BOOT] Kline archive {archive.root}: {warm}/{len(SYMBOLS)} symbols warm, {filled} bars backfilled')
 
 # ===== Main Loop =====
-def main():
+def main(client=None, sleep=time.sleep, clock=time.time):
+    """client: an already-built client (e.g. overhuman_paper.PaperExchange) instead of Binance;
+    sleep / clock: loop pause and scan-time source (a paper run advances and reads exchange time)."""
+    t_boot=t=time.perf_counter(); BOOT.clear(); BOOT['imports']=IMPORT_SEC
     load_env_overrides(cfg)
-    client = setup_client(cfg.TESTNET)
-    print('[BOOT] Connected to Binance Futures Testnet' if cfg.TESTNET else '[BOOT] Connected to Binance Futures')
+    if client is None:
+        client = setup_client(cfg.TESTNET, getattr(cfg,'HTTP_POOL_SIZE',16),
+                              getattr(cfg,'HTTP_CONNECT_TIMEOUT',3.05), getattr(cfg,'HTTP_READ_TIMEOUT',10.0))
+        print('[BOOT] Connected to Binance Futures Testnet' if cfg.TESTNET else '[BOOT] Connected to Binance Futures')
+    client = limiter.attach(client)
+    t=_boot_phase('client', t)
 
-    try: bal=client.futures_account_balance(); print('[OK] Auth sample:', bal[0])
+    try: print('[OK] Auth sample: equity', equity.refresh(client))  # also primes the sizing cache
     except Exception as e: print('[FATAL] Auth failed:', e); return
+    t=_boot_phase('auth', t)
 
-    # per-symbol settings
-    filters_map: Dict[str, Dict] = {}
-    price_window: Dict[str, Deque[Tuple[float,float]]] = {sym: collections.deque() for sym in SYMBOLS}
-    entry_ts_map: Dict[str, Dict[str,float]] = {sym:{'LONG':0.0,'SHORT':0.0} for sym in SYMBOLS}
-    pyramid_count_map: Dict[str, Dict[str,int]] = {sym:{'LONG':0,'SHORT':0} for sym in SYMBOLS}
-    acez_last_fire_ts: Dict[str, Dict[str,float]] = {sym:{'LONG':0.0,'SHORT':0.0} for sym in SYMBOLS}
-    
+    if ENSURE_SETTINGS: ensure_futures_settings(client, SYMBOLS, cfg.LEVERAGE, cfg.HEDGE_MODE, getattr(cfg,'SCAN_WORKERS',8))
+    t=_boot_phase('settings', t)
+    filter_registry.load(client)
     for sym in SYMBOLS:
-        ensure_futures_settings(client, sym, cfg.LEVERAGE, cfg.HEDGE_MODE)
-        filters_map[sym]=fetch_filters(client, sym)
-        print(f"[INFO] {sym} Filters: tick={filters_map[sym]['tick']} step={filters_map[sym]['step']} minNotional={filters_map[sym]['min_notional']}")
+        f=filter_registry.get(sym)
+        print(f"[INFO] {sym} Filters: tick={f['tick']} step={f['step']} minNotional={f['min_notional']}")
+    filter_registry.start_background_refresh(client)
+    t=_boot_phase('filters', t)
+
+    equity.start_poller(client)
+    if getattr(cfg,'USER_DATA_STREAM',True):
+        try:
+            transport=client.user_transport() if hasattr(client,'user_transport') else BinanceUserTransport(cfg.TESTNET)
+            user_stream=UserDataStream(client, transport)
+            user_stream.on_balance.append(equity.on_balance)
+            user_stream.start()
+            print('[BOOT] User-data stream live (fills/positions pushed, no position polling)')
+        except Exception as e:
+            positions.set_live(False); print('[WARN] user-data stream unavailable, polling positions:', e)
+    t=_boot_phase('user_stream', t)
+
+    kline_store=KlineStore(client, cfg.INTERVAL, clock=getattr(client,'clock_ms',None))
+    htf=HTFEngine(getattr(cfg,'HTF_INTERVALS',[]), cfg.INTERVAL)
+    if HTF_ENABLED: kline_store.on_close.append(htf.on_bar)
+    if getattr(cfg,'KLINE_ARCHIVE',True):
+        warm_start(client, kline_store, KlineArchive(getattr(cfg,'KLINE_ARCHIVE_DIR','kline_archive'), cfg.INTERVAL))
+    t=_boot_phase('warm_start', t)
+    BOOT['total']=IMPORT_SEC+time.perf_counter()-t_boot
+    print(f"[BOOT] Ready in {BOOT['total']:.2f}s (" + ' '.join(f'{k}={v:.2f}' for k, v in BOOT.items() if k!='total') + ')')
+    last_telemetry=0.0; last_metrics_dump=time.time()
+    if getattr(cfg,'METRICS_PORT',0): serve_metrics(cfg.METRICS_PORT); print(f'[BOOT] Metrics on :{cfg.METRICS_PORT}/metrics')
+    profiler=CycleProfiler(getattr(cfg,'PROFILE_CYCLES',0))
+
+    cadence=BurstCadence(AFTERBURNER_SCAN_FACTOR, AFTERBURNER_MAX_DURATION)
+    filters_ok, signal_of = (market_filters_ok_fast, pick_signal_fast) if FAST_FILTERS else (market_filters_ok, pick_signal)
 
-    last_telemetry=time.time()
+    def evaluate_symbol(sym: str, row: dict, now: float, verbose: bool = True) -> List[tuple]:
+        """Pure per-symbol stage (safe on worker threads): returns (kind, side, qty_factor, note, magnitude, event) intents."""
+        intents=[]
+        last_close=row['close']
+        if verbose: print(f"[LOOP] {sym} at {time.strftime('%X')} last close={last_close}")
 
-    def count_open_positions() -> int:
-        total=0
-        for s in SYMBOLS:
-            for side in ('LONG','SHORT'):
-                amt,_=get_position_side_amt(client,s,side)
-                if amt!=0: total+=1
-        return total
+        if ACEZ_ENABLED:
+            if not acez_monitor.streaming: acez_monitor.on_price(sym, now, last_close)  # REST mode: one sample per evaluation
+            event=acez_monitor.take(sym, now)
+            if event:
+                side, etype, mag = event
+                intents.append(('ACE-Z', side, ACEZ_QTY_FACTOR, f"{etype} {mag:.2f}%", mag, etype))
+                if AFTERBURNER_ENABLED: cadence.ignite(sym, now, f'ACE-Z {etype}')
+        if AFTERBURNER_ENABLED: cadence.observe(sym, row, now)
 
+        # ===== Signal / Filter =====
+        if not filters_ok(row, htf.htf_map(sym, row) if HTF_ENABLED else {}):
+            metrics.inc('skips')
+            if verbose: print(f'[FILTER] {sym} HOLD (filter not passed)')
+        else:
+            signal=signal_of(row)
+            if signal!='HOLD':
+                intents.append(('SIGNAL', 'LONG' if signal=='BUY' else 'SHORT', Decimal('1'), signal, 0.0, signal))
+        return intents
+
+    def candidates(sym: str, row: dict, intents: List[tuple]) -> List[Candidate]:
+        if not intents: return []
+        mark=price_state.mark(sym) or Decimal(str(row['close']))
+        filters=filter_registry.get(sym)
+        return [Candidate(sym, kind, side, factor, note, row, mark, filters, mag, event) for kind, side, factor, note, mag, event in intents]
+
+    def place(c: Candidate, now: float):
+        try:
+            if c.kind=='ACE-Z': print(f"[ACE-Z] {c.symbol} {c.note} -> {c.side} qty={c.qty} conf={c.confidence:.2f}")
+            else: print(f"[SIGNAL] {c.symbol} {c.note} | mark={c.mark} qty={c.qty} conf={c.confidence:.2f}")
+            open_entry(client, c.symbol, c.kind, c.side, c.qty, c.mark, c.row.get('atr'), c.filters)
+            if c.kind=='ACE-Z':
+                st=state.get(c.symbol, c.side)
+                with st.lock: st.acez_last_fire_ts=now
+        except Exception as e: print(f'[{c.kind}][WARN] place order failed:', c.symbol, e)
+
+    def execute_cycle(cands: List[Candidate], now: float):
+        """Portfolio stage: size and admit the whole cycle's candidates at once, then place the admitted
+        entries one after another in rank order (the order stage is the one serialized stage)."""
+        if not cands: return
+        with metrics.timer('stage{name="sizing"}'):
+            orders=portfolio.plan(client, cands, now, SYMBOLS, kline_store.closes)
+        if not orders: return
+        with metrics.timer('stage{name="order"}'):
+            for c in orders: place(c, now)
+
+    def scan_symbol(sym: str, row: dict, now: float, verbose: bool = True):
+        with metrics.timer('stage{name="evaluate"}'): intents=evaluate_symbol(sym, row, now, verbose)
+        execute_cycle(candidates(sym, row, intents), now)
+
+    if getattr(cfg,'MARKET_DATA_MODE','rest')=='ws':
+        run_stream(client, kline_store, scan_symbol, market_transport(client), cadence=cadence if AFTERBURNER_ENABLED else None)
+        return
+
+    scheduler=SymbolScheduler(getattr(cfg,'SCAN_WORKERS',8))
+
+    def fetch_and_evaluate(sym: str):
+        cadence.mark_scanned(sym, loop_start)
+        limiter.acquire(klines_weight(kline_store.fetch_limit(sym)))
+        with metrics.timer('stage{name="klines"}'): row=kline_store.update(sym)
+        if row is None: return None
+        with metrics.timer('stage{name="evaluate"}'): return row, evaluate_symbol(sym, row, loop_start)
+
+    period=getattr(cfg,'LOOP_SECONDS',1)  # quiet-symbol scan period; afterburner symbols get period/factor
     while True:
-        loop_start=time.time()
+        loop_start=clock(); wall_start=time.time(); weight_mark=limiter.mark()
+        due=cadence.due(SYMBOLS, loop_start, period) if AFTERBURNER_ENABLED else SYMBOLS
         try:
-            for sym in SYMBOLS:
-                df=get_klines(client, sym, cfg.INTERVAL)
-                df=add_indicators(df)
-                last_close=df.iloc[-1]['close'] if not df.empty else None
-                print(f"[LOOP] {sym} at {time.strftime('%X')} last close={last_close}")
-
-                if ACEZ_ENABLED and last_close is not None:
-                    price_window[sym].append((loop_start,float(last_close)))
-                    event=detect_collapse_spike(price_window[sym], loop_start, ACEZ_WINDOW_SEC, ACEZ_DROP_PCT, ACEZ_SPIKE_PCT)
-                    if event:
-                        etype, mag = event
-                        side='LONG' if etype=='COLLAPSE' else 'SHORT'
-                        if count_open_positions()<MAX_OPEN_POS and can_open_new_side(client,sym,side):
-                            try:
-                                last_row=df.iloc[-1]; mark=Decimal(str(last_row['close']))
-                                filters=filters_map[sym]
-                                base_qty=compute_risk_based_qty(client, filters, Decimal('0'), sym, Decimal('1')) * ACEZ_QTY_FACTOR
-                                qty=adjust_qty_for_exchange(base_qty, filters['step'], filters['min_notional'], mark)
-                                print(f"[ACE-Z] {sym} {etype} {mag:.2f}% -> {side} qty={qty}")
-                                place_entry_market(client,sym,'BUY' if side=='LONG' else 'SELL',qty,cfg.HEDGE_MODE)
-                                acez_last_fire_ts[sym][side]=loop_start
-                            except Exception as e: print('[ACE-Z][WARN] place order failed:', sym, e)
-
-                # ===== Signal / Filter =====
-                if not market_filters_ok(df, {}):
-                    print(f'[FILTER] {sym} HOLD (filter not passed)')
-                else:
-                    signal=pick_signal(df)
-                    mark=Decimal(str(df.iloc[-1]['close']))
-                    if signal!='HOLD':
-                        side='LONG' if signal=='BUY' else 'SHORT'
-                        if count_open_positions()<MAX_OPEN_POS and can_open_new_side(client,sym,side):
-                            filters=filters_map[sym]
-                            base_qty=compute_risk_based_qty(client, filters, Decimal('0'), sym, Decimal('1'))
-                            qty=adjust_qty_for_exchange(base_qty, filters['step'], filters['min_notional'], mark)
-                            print(f"[SIGNAL] {sym} {signal} | mark={mark} qty={qty}")
-                            if qty*mark>=filters['min_notional']:
-                                place_entry_market(client,sym,'BUY' if side=='LONG' else 'SELL',qty,cfg.HEDGE_MODE)
+            cands=[]
+            for sym, res in scheduler.map(fetch_and_evaluate, due):
+                if res is None: continue
+                row, intents = res
+                try: cands+=candidates(sym, row, intents)
+                except Exception as e: print('[ERROR]', sym, e)
+            execute_cycle(cands, loop_start)
+
+            if time.time()-last_telemetry>=getattr(cfg,'TELEMETRY_INTERVAL_SEC',1800):
+                append_telemetry(client); last_telemetry=time.time()
+            if time.time()-last_metrics_dump>=getattr(cfg,'METRICS_DUMP_SEC',300):
+                print('[METRICS]', metrics.dump_line()); last_metrics_dump=time.time()
 
         except KeyboardInterrupt:
             print('\n[EXIT] KeyboardInterrupt received. Gracefully shutting down...')
+            scheduler.shutdown()
             break
         except Exception as e:
             print('[ERROR]', e)
 
-        # sleep dynamic
-        sleep_sec=getattr(cfg,'LOOP_SECONDS',1)
-        time.sleep(sleep_sec)
+        metrics.observe('stage{name="cycle"}', time.time()-wall_start); profiler.tick()
+        # sleep dynamic: next deadline from the remaining weight budget and this cycle's cost
+        elapsed=time.time()-wall_start
+        sleep_sec=limiter.next_sleep(elapsed, limiter.spent_since(weight_mark), getattr(cfg,'LOOP_SECONDS',1))
+        if AFTERBURNER_ENABLED:
+            if len(due)==len(SYMBOLS): period=elapsed+sleep_sec  # re-derive the quiet period from full cycles only
+            sleep_sec=cadence.sleep_for(SYMBOLS, loop_start+elapsed, period)
+        sleep(sleep_sec)
+
+def market_transport(client):
+    """ws-mode feed: a recorded replay when MARKET_STREAM_REPLAY is set, else the client's own
+    (paper exchange), else the live Binance websocket."""
+    replay=getattr(cfg,'MARKET_STREAM_REPLAY',None)
+    if replay: return ReplayTransport(replay, getattr(cfg,'MARKET_STREAM_REPLAY_SPEED',0.0))
+    if hasattr(client,'market_transport'): return client.market_transport()
+    return BinanceWSTransport(cfg.TESTNET)
+
+def run_stream(client, kline_store, scan_symbol, transport=None, cadence=None):
+    """Event-driven mode: evaluate a symbol when its bar closes or a mark tick arrives.
+    Returns once a finite transport (replay) is done and its events are drained."""
+    for sym in SYMBOLS: kline_store.update(sym)  # REST bootstrap, then the stream keeps the buffer current
+    transport=transport or market_transport(client)
+    stream=MarketStream(kline_store, SYMBOLS, transport, cfg.INTERVAL)
+    if ACEZ_ENABLED:  # every kline/mark update on the stream thread; evaluate_symbol stops feeding it
+        stream.on_price.append(acez_monitor.on_price); acez_monitor.streaming = True
+    stream.start()
+    print(f"[BOOT] Streaming {len(stream.streams())} market streams")
+    min_gap=getattr(cfg,'WS_EVAL_MIN_INTERVAL_SEC',1.0)
+    last_eval: Dict[str,float] = {sym:0.0 for sym in SYMBOLS}
+    try:
+        while True:
+            ev=stream.next_event(timeout=1.0)
+            if ev is None:
+                if getattr(transport,'done',None) is not None and transport.done.is_set(): print('[STREAM] replay finished'); break
+                continue
+            kind, sym, ts = ev
+            try:
+                if kind=='gap':
+                    kline_store.update(sym); continue
+                gap=min_gap/cadence.factor if cadence is not None and cadence.bursting(sym, ts) else min_gap
+                if kind=='tick' and ts-last_eval[sym]<gap and not acez_monitor.pending(sym): continue
+                row=kline_store.last(sym)
+                if row is None: continue
+                last_eval[sym]=ts
+                scan_symbol(sym, row, ts, verbose=(kind=='bar'))
+            except Exception as e:
+                print('[ERROR]', sym, e)
+    except KeyboardInterrupt:
+        print('\n[EXIT] KeyboardInterrupt received. Gracefully shutting down...')
+    finally:
+        stream.stop()
 
 if __name__=='__main__':
     main()
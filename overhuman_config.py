@@ -6,8 +6,18 @@ TESTNET       = True
 SYMBOL        = "BTCUSDT"
 LEVERAGE      = 10
 HEDGE_MODE    = True
+ENSURE_SETTINGS = True  # check/apply leverage + position mode at boot (only mismatches are changed); False skips it
 INTERVAL      = "1m"
 LOOP_SECONDS  = 7  # FAST+PRECISION (rate limit aware)
+KLINE_BUFFER_SIZE = 300  # bars kept per symbol in the rolling kline store
+KLINE_ARCHIVE = True     # persist closed bars to the local columnar archive; warm start + REST gap backfill at boot
+KLINE_ARCHIVE_DIR = "kline_archive"  # point at a mounted volume on Railway so redeploys keep it
+KLINE_ARCHIVE_BACKFILL_MAX = 10080   # bars backfilled per symbol at boot (older gaps stay holes)
+MARKET_DATA_MODE = "rest"  # "rest" (poll every LOOP_SECONDS) or "ws" (kline + markPrice streams)
+MARK_PRICE_MAX_AGE_SEC = 5  # streamed mark older than this falls back to REST
+WS_EVAL_MIN_INTERVAL_SEC = 1.0  # min gap between tick-driven evaluations of one symbol
+MARKET_STREAM_REPLAY = None     # ws mode: recorded combined-stream JSONL to replay instead of connecting
+MARKET_STREAM_REPLAY_SPEED = 0.0  # replay pace: 0 = as fast as possible, 1.0 = recorded event times
 
 # --- Capital & Risk ---
 TARGET_MIN_EQUITY  = Decimal("1000")
@@ -32,11 +42,15 @@ MIN_VOL_PCT      = Decimal("0.045")
 VOL_BOOST_FACTOR = Decimal("1.10")
 DOJI_ATR_RATIO   = Decimal("0.12")
 
+FAST_FILTERS     = True  # evaluate filters/signal on floats (exact Decimal kept for qty/price quantization)
+
 # --- Multi-Timeframe ---
+HTF_ENABLED = True   # HTF bars are resampled from the base-interval buffer (no extra kline requests)
 HTF_INTERVALS = ["3m","5m","15m"]
 HTF_EMA_FAST = 8
 HTF_EMA_SLOW = 21
 HTF_EMA_CONFIRM = 50  # for 15m trend alignment (EMA50)
+HTF_MIN_BARS = 21     # HTF bars needed before a timeframe votes (KLINE_BUFFER_SIZE sets the warm-up)
 
 # ADX settings
 ADX_PERIOD = 14
@@ -53,10 +67,27 @@ ALLOW_PYRAMID = True
 MAX_PYRAMID_LEVELS = 2
 PYRAMID_MIN_MOMENTUM_ATR = Decimal("0.4")
 
+# --- Backtest ---
+BACKTEST_FEE_PCT = Decimal("0.04")  # taker fee per side, % of notional
+
+# --- Exchange info ---
+EXCHANGE_INFO_CACHE_FILE = "exchange_info_cache.json"  # warm-restart snapshot of symbol filters
+EXCHANGE_INFO_TTL_SEC = 6*3600
+EXCHANGE_INFO_REFRESH_SEC = 3600
+
 # --- Telemetry ---
 TELEMETRY_INTERVAL_SEC = 1800
 TELEMETRY_FILE = "telemetry.csv"
 TRADE_LOG_FILE = "trade_log.csv"
+LOG_FORMAT = "csv"          # "csv" or "parquet" (needs pyarrow; one part file per flush under <name>/)
+LOG_FLUSH_SEC = 5           # background writer flushes at least this often...
+LOG_BATCH_SIZE = 256        # ...or as soon as this many rows are queued
+LOG_ROTATE_BYTES = 50*1024*1024
+
+# --- Metrics / profiling ---
+METRICS_PORT = 0            # >0 serves Prometheus text on 127.0.0.1:<port>/metrics
+METRICS_DUMP_SEC = 300      # print p50/p99 per stage this often
+PROFILE_CYCLES = 0          # >0 runs cProfile over the first N loop cycles and writes profile.out
 
 # --- Loss streak protection ---
 LOSS_STREAK_LIMIT = 3         # after N losing trades take action
@@ -76,11 +107,50 @@ ENABLE_LOSS_STREAK_PROTECTION = True
 # --- Multi-Symbol ---
 SYMBOLS = ["BTCUSDT", "ETHUSDT", "SOLUSDT", "BNBUSDT"]
 MAX_OPEN_POSITIONS = 2   # เริ่มแบบคุมความเสี่ยง (ค่อยเพิ่มเมื่อทุนโต)
+PORTFOLIO_MAX_GROSS_EXPOSURE = 3.0  # open + new notional, as a multiple of equity
+PORTFOLIO_MAX_SIDE_EXPOSURE = 2.0   # long (or short) notional, as a multiple of equity
+PORTFOLIO_MAX_CORRELATION = 0.8     # skip an entry whose returns track a held/admitted same-direction bet closer than this
+PORTFOLIO_CORR_BARS = 60            # bars of returns behind that correlation
+SCAN_WORKERS = 8   # threads for the per-symbol fetch/indicator/filter stage
+HTTP_POOL_SIZE = 16         # keep-alive connections per host; >= SCAN_WORKERS + background refreshers
+HTTP_CONNECT_TIMEOUT = 3.05 # seconds to establish TCP/TLS
+HTTP_READ_TIMEOUT = 10.0    # seconds to wait for a response
+REQUEST_WEIGHT_PER_MIN = 2400  # exchange request-weight limit per minute (USD-M)
+RATE_LIMIT_HEADROOM = 0.8      # fraction of the weight limit the bot allows itself
+ORDER_LIMIT_PER_10S = 300      # order-count limits (X-MBX-ORDER-COUNT-10S / -1M)
+ORDER_LIMIT_PER_MIN = 1200
+ORDER_WEIGHT_RESERVE = 0.1     # share of the weight budget market data may not touch
+BATCH_ORDERS = True            # entry + TP + SL in one batchOrders request (False: bare market entry)
+MIN_LOOP_SECONDS = 2           # adaptive loop period bounds (LOOP_SECONDS is the nominal period)
+MAX_LOOP_SECONDS = 30
+POSITION_SNAPSHOT_TTL_SEC = 3  # one unfiltered positionRisk call serves every check within this window
+USER_DATA_STREAM = True        # fills/positions from the user-data websocket instead of polling
+POSITION_RESYNC_SEC = 300      # REST position resync while the user-data stream is live
+EQUITY_TTL_SEC = 5             # equity read-through cache when nothing refreshes it in the background
+EQUITY_MAX_STALE_SEC = 60      # hard bound: never size from a balance older than this
+EQUITY_POLL_SEC = 15           # background balance poll (balance events from the user-data stream also refresh it)
 
 # --- Afterburner ---
 AFTERBURNER_ENABLED = True
 AFTERBURNER_SCAN_FACTOR = 3
 AFTERBURNER_MAX_DURATION_SEC = 300
+AFTERBURNER_SPIKE_RATIO = 1.8     # vol_pct or ATR% at this multiple of the symbol's running baseline ignites a burst
+AFTERBURNER_WARMUP_SCANS = 20     # scans before a symbol's baseline is trusted
+
+# ===== Paper exchange (overhuman_paper.py) =====
+PAPER_BALANCE = 1000.0           # starting USDT wallet
+PAPER_LATENCY_MS = 0.0           # simulated per-call latency (0 = as fast as possible, deterministic)
+PAPER_JITTER_MS = 0.0            # +/- uniform jitter on top of the latency (seeded)
+PAPER_SLIPPAGE_BPS = 1.0         # market fills at mark +/- this
+PAPER_WEIGHT_LIMIT = None        # request weight per rolling minute before 429s (None = unlimited)
+PAPER_WS_BAR_SEC = 0.05          # ws mode: wall seconds per simulated bar (the stream drives the bot, not its sleep)
+
+# ===== Benchmarks (overhuman_bench.py) =====
+BENCH_FIXTURE_DIR = "bench_fixtures"        # kline CSVs replayed by every run (synthetic until `record` replaces them)
+BENCH_RESULTS_FILE = "bench_results.json"
+BENCH_BASELINE_FILE = "bench_baseline.json"
+BENCH_CYCLE_SYMBOLS = [4, 50, 200]          # universe sizes for the full main() cycle case
+BENCH_REGRESSION_PCT = 15.0                 # p50 slowdown vs the baseline that fails the comparison
 
 # --- ACE-Z Hunter ---
 ACEZ_ENABLED = True
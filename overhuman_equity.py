@@ -0,0 +1,69 @@
+import time, threading
+from decimal import Decimal
+from typing import Callable, Optional
+import overhuman_config as cfg
+from utils import d, retry
+from overhuman_ratelimit import limiter, WEIGHTS
+
+EQUITY_ASSETS        = ('USDT', 'FDUSD', 'BUSD')
+EQUITY_TTL_SEC       = getattr(cfg, 'EQUITY_TTL_SEC', 5)
+EQUITY_MAX_STALE_SEC = getattr(cfg, 'EQUITY_MAX_STALE_SEC', 60)
+EQUITY_POLL_SEC      = getattr(cfg, 'EQUITY_POLL_SEC', 15)
+
+class EquityCache:
+    """Account equity (wallet balance of the first stable asset) kept in memory for sizing.
+    Read-through with `ttl` when nothing refreshes it in the background; once balance events or
+    the poller feed it, reads serve the cached value until it is `max_stale` seconds old."""
+
+    def __init__(self, ttl: float = EQUITY_TTL_SEC, max_stale: float = EQUITY_MAX_STALE_SEC, clock: Callable[[], float] = time.time):
+        self.ttl = ttl; self.max_stale = max_stale; self.clock = clock
+        self.value: Optional[Decimal] = None; self.asset: Optional[str] = None
+        self.ts = 0.0        # local receipt time (clock()), what staleness is measured against
+        self.event_ts = 0.0  # exchange event time of the last stream update, only to drop out-of-order events
+        self.fed = False  # True once a poller or the user-data stream keeps it current
+        self._lock = threading.Lock()
+        self._thread = None; self._stop = threading.Event()
+
+    def set(self, value, asset: str = None):
+        self.value = d(value); self.asset = asset or self.asset; self.ts = self.clock()
+
+    def refresh(self, client) -> Decimal:
+        limiter.acquire(WEIGHTS['balance'])
+        bals = retry(lambda: client.futures_account_balance(), name='balance', weight=WEIGHTS['balance'], attempts=2,
+                     on_error=lambda e,i: print('[WARN] balance attempt',i,e))
+        for b in bals:
+            if b.get('asset') in EQUITY_ASSETS:
+                self.set(b.get('balance','0'), b['asset']); return self.value
+        raise RuntimeError('no stable-asset balance')
+
+    def get(self, client) -> Decimal:
+        age = self.clock() - self.ts
+        if self.value is not None and age < (self.max_stale if self.fed else self.ttl): return self.value
+        with self._lock:  # one in-flight refresh; concurrent readers reuse it
+            if self.value is not None and self.clock() - self.ts < (self.max_stale if self.fed else self.ttl): return self.value
+            try: return self.refresh(client)
+            except Exception as e: print('[WARN] equity refresh:', e)
+        if self.value is not None and self.clock() - self.ts < self.max_stale: return self.value
+        return cfg.TARGET_MIN_EQUITY
+
+    def on_balance(self, balances: list, ts: float):
+        """UserDataStream.on_balance hook: ACCOUNT_UPDATE 'B' rows ({'a': asset, 'wb': wallet balance}).
+        ts is the event time 'E': it only orders events, freshness is the local receipt time."""
+        if ts < self.event_ts: return
+        for b in balances:
+            if b.get('a') == self.asset or (self.asset is None and b.get('a') in EQUITY_ASSETS):
+                self.event_ts = ts; self.set(b.get('wb','0'), b['a']); self.fed = True; return
+
+    def start_poller(self, client, every: float = EQUITY_POLL_SEC):
+        if self._thread is not None: return
+        self.fed = every < self.max_stale
+        def _run():
+            while not self._stop.wait(every):
+                try: self.refresh(client)
+                except Exception as e: print('[WARN] equity poll:', e)
+        self._thread = threading.Thread(target=_run, name='equity-poller', daemon=True)
+        self._thread.start()
+
+    def stop(self): self._stop.set()
+
+equity = EquityCache()
@@ -0,0 +1,94 @@
+import os, json, time, threading
+from decimal import Decimal
+from typing import Dict, Optional
+import overhuman_config as cfg
+from utils import d, retry
+from overhuman_ratelimit import limiter
+
+EXCHANGE_INFO_CACHE_FILE  = getattr(cfg, 'EXCHANGE_INFO_CACHE_FILE', 'exchange_info_cache.json')
+EXCHANGE_INFO_TTL_SEC     = getattr(cfg, 'EXCHANGE_INFO_TTL_SEC', 6*3600)
+EXCHANGE_INFO_REFRESH_SEC = getattr(cfg, 'EXCHANGE_INFO_REFRESH_SEC', 3600)
+
+def parse_symbol_filters(sym: dict) -> Dict[str, str]:
+    """exchangeInfo symbol entry -> tick/step/min_notional/min_qty (strings, ready for JSON)."""
+    tick='0.1'; step='0.001'; min_notional='5'; min_qty='0.001'
+    for f in sym.get('filters', []):
+        t=f.get('filterType')
+        if t=='PRICE_FILTER': tick=f.get('tickSize', tick)
+        elif t=='LOT_SIZE': step=f.get('stepSize', step); min_qty=f.get('minQty', min_qty)
+        elif t in ('MIN_NOTIONAL',): min_notional=f.get('notional') or f.get('minNotional') or min_notional
+    return {'tick': tick, 'step': step, 'min_notional': min_notional, 'min_qty': min_qty}
+
+class FilterRegistry:
+    """Symbol filters from a single futures_exchange_info() download, indexed by symbol.
+    Persisted to a local snapshot so a warm restart inside the TTL needs no download. A symbol
+    missing from the snapshot (listed after it was taken) triggers one re-download before get() raises."""
+
+    def __init__(self, path: str = EXCHANGE_INFO_CACHE_FILE, ttl: float = EXCHANGE_INFO_TTL_SEC):
+        self.path = path; self.ttl = ttl
+        self._raw: Dict[str, Dict[str, str]] = {}
+        self._parsed: Dict[str, Dict[str, Decimal]] = {}
+        self.ts = 0.0; self.client = None
+        self._missing: set = set()  # symbols still absent after a re-download; cleared by the next fetch
+        self._lock = threading.Lock(); self._fetch_lock = threading.Lock()
+        self._thread = None; self._stop = threading.Event()
+
+    def _install(self, raw: Dict[str, Dict[str, str]], ts: float):
+        parsed = {s: {k: d(v) for k, v in f.items()} for s, f in raw.items()}
+        with self._lock: self._raw = raw; self._parsed = parsed; self.ts = ts
+
+    def load_snapshot(self) -> bool:
+        try:
+            with open(self.path) as f: snap = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if time.time() - snap.get('ts', 0) > self.ttl: return False
+        self._install(snap['symbols'], snap['ts'])
+        return True
+
+    def save_snapshot(self):
+        tmp = self.path + '.tmp'
+        try:
+            with open(tmp, 'w') as f: json.dump({'ts': self.ts, 'symbols': self._raw}, f)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print('[WARN] exchange info snapshot:', e)
+
+    def fetch(self, client):
+        self.client = client
+        limiter.acquire(1)
+        info = retry(lambda: client.futures_exchange_info(), name='exchange_info', weight=1, on_error=lambda e,i: print('[WARN] exchange info attempt',i,e))
+        self._install({s['symbol']: parse_symbol_filters(s) for s in info['symbols']}, time.time())
+        self._missing = set()
+        self.save_snapshot()
+
+    def load(self, client):
+        """Warm start from the snapshot when fresh, otherwise one download."""
+        self.client = client
+        if self._parsed and time.time() - self.ts < self.ttl: return
+        if not self.load_snapshot(): self.fetch(client)
+
+    def get(self, symbol: str) -> Dict[str, Decimal]:
+        f = self._parsed.get(symbol)
+        if f is None and self.client is not None and symbol not in self._missing:
+            with self._fetch_lock:
+                f = self._parsed.get(symbol)  # another thread may have refreshed meanwhile
+                if f is None and symbol not in self._missing:
+                    print('[INFO] exchange info: refreshing for', symbol)
+                    self.fetch(self.client); f = self._parsed.get(symbol)
+                    if f is None: self._missing.add(symbol)
+        if f is None: raise RuntimeError(f'Symbol not found: {symbol}')
+        return f
+
+    def start_background_refresh(self, client, every: float = EXCHANGE_INFO_REFRESH_SEC):
+        if self._thread is not None: return
+        def _run():
+            while not self._stop.wait(every):
+                try: self.fetch(client)
+                except Exception as e: print('[WARN] exchange info refresh:', e)
+        self._thread = threading.Thread(target=_run, name='exchange-info', daemon=True)
+        self._thread.start()
+
+    def stop(self): self._stop.set()
+
+filter_registry = FilterRegistry()
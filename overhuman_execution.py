@@ -1,65 +1,50 @@
-import time, csv, os
+import time, json, uuid
 from decimal import Decimal
-from typing import Dict, Tuple
-import pandas as pd
-from binance.enums import *
+from typing import Tuple
 from utils import d, round_step, retry
+from overhuman_stream import mark_price
+from overhuman_positions import positions
+from overhuman_ratelimit import limiter, WEIGHTS
+from overhuman_exchange_info import filter_registry
+from overhuman_logwriter import get_writer
+from overhuman_metrics import metrics
+from overhuman_state import state
 from overhuman_config import (BASE_SL_PCT, BASE_TP_PCT, ADAPT_TRIGGER_ATR, TP_EXPAND_FACTOR,
                               TRAIL_SL_LOCK_PCT, REARM_COOLDOWN_SEC, MAX_PYRAMID_LEVELS,
                               ALLOW_PYRAMID, MICRO_TP_TRIGGER_MINUTES, MICRO_TP_PCT,
                               TRADE_LOG_FILE, LOSS_STREAK_LIMIT, LOSS_STREAK_ACTION,
                               LOSS_STREAK_REDUCE_PCT, LOSS_STREAK_PAUSE_SEC)
 
-last_rearm_ts: Dict[str, float] = {'LONG':0.0,'SHORT':0.0}
-entry_ts: Dict[str, float] = {'LONG':0.0,'SHORT':0.0}
-pyramid_count: Dict[str,int] = {'LONG':0,'SHORT':0}
-active_trades: Dict[str, dict] = {'LONG':None, 'SHORT':None}
-loss_streak = 0
+# python-binance enum values (binance.enums costs the whole client import at startup)
+SIDE_BUY, SIDE_SELL = 'BUY', 'SELL'
+FUTURE_ORDER_TYPE_MARKET, FUTURE_ORDER_TYPE_STOP_MARKET, FUTURE_ORDER_TYPE_TAKE_PROFIT_MARKET = 'MARKET', 'STOP_MARKET', 'TAKE_PROFIT_MARKET'
+
+BRACKET_TYPES = ('TAKE_PROFIT_MARKET','STOP_MARKET','TAKE_PROFIT','STOP')
+DUPLICATE_CLIENT_ID = -4116  # leg already accepted by an earlier attempt of the same batch
 
 def _append_trade_log(row: dict):
-    write_header = not os.path.exists(TRADE_LOG_FILE)
-    try:
-        with open(TRADE_LOG_FILE, 'a', newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=list(row.keys()))
-            if write_header: writer.writeheader()
-            writer.writerow(row)
-    except Exception as e:
-        print('[WARN] trade log failed:', e)
+    get_writer(TRADE_LOG_FILE).write(row)
 
 def get_position_side_amt(client, symbol: str, side: str) -> Tuple[Decimal, Decimal]:
-    pos = client.futures_position_information(symbol=symbol)
-    for p in pos:
-        amt = d(p.get('positionAmt','0'))
-        entry = d(p.get('entryPrice','0'))
-        ps = p.get('positionSide') or ('LONG' if amt>0 else 'SHORT')
-        if side=='LONG' and ps=='LONG' and amt>0: return amt, entry
-        if side=='SHORT' and ps=='SHORT' and amt<0: return amt, entry
-    return Decimal('0'), Decimal('0')
+    return positions.side_amt(client, symbol, side)
 
 def can_open_new_side(client, symbol: str, side: str) -> bool:
     amt, _ = get_position_side_amt(client, symbol, side)
     return (amt == 0)
 
-def place_entry_market(client, symbol: str, direction: str, qty: Decimal, hedge_mode: bool):
+def _cid(tag: str) -> str:
+    return f"oh-{tag}-{uuid.uuid4().hex[:20]}"
+
+def _entry_order(symbol: str, direction: str, qty: Decimal, hedge_mode: bool) -> dict:
     params = dict(symbol=symbol,
                   side=SIDE_BUY if direction=='BUY' else SIDE_SELL,
                   type=FUTURE_ORDER_TYPE_MARKET,
-                  quantity=str(qty))
+                  quantity=str(qty), newOrderRespType='RESULT')
     if hedge_mode:
         params['positionSide'] = 'LONG' if direction=='BUY' else 'SHORT'
-    print(f"[ENTRY] {direction} qty={qty}")
-    res = retry(lambda: client.futures_create_order(**params), on_error=lambda e,i: print('[WARN] entry attempt',i,e))
-    # record active trade for simple post-exit logging
-    try:
-        mark = d(client.futures_mark_price(symbol=symbol)['markPrice'])
-        side = 'LONG' if direction=='BUY' else 'SHORT'
-        active_trades[side] = {'entry_ts': time.time(), 'qty': d(qty), 'entry_price': mark, 'side': side}
-    except Exception:
-        pass
-    return res
+    return params
 
-def place_brackets(client, symbol: str, side: str, entry_price: Decimal, tp_pct: Decimal, sl_pct: Decimal, filters, hedge_mode: bool):
-    tick = filters['tick']
+def _bracket_orders(symbol: str, side: str, entry_price: Decimal, tp_pct: Decimal, sl_pct: Decimal, tick: Decimal, hedge_mode: bool):
     if side=='LONG':
         tp_price = (entry_price*(Decimal('1')+tp_pct/Decimal('100'))).quantize(tick)
         sl_price = (entry_price*(Decimal('1')-sl_pct/Decimal('100'))).quantize(tick)
@@ -68,30 +53,120 @@ def place_brackets(client, symbol: str, side: str, entry_price: Decimal, tp_pct:
         tp_price = (entry_price*(Decimal('1')-tp_pct/Decimal('100'))).quantize(tick)
         sl_price = (entry_price*(Decimal('1')+sl_pct/Decimal('100'))).quantize(tick)
         exit_side = SIDE_BUY
-
+    # string values only: batchOrders goes out as JSON, so closePosition must be 'true', not True
     tp = dict(symbol=symbol, side=exit_side, type=FUTURE_ORDER_TYPE_TAKE_PROFIT_MARKET,
-              stopPrice=str(tp_price), closePosition=True, workingType='CONTRACT_PRICE')
+              stopPrice=str(tp_price), closePosition='true', workingType='CONTRACT_PRICE', newClientOrderId=_cid('tp'))
     sl = dict(symbol=symbol, side=exit_side, type=FUTURE_ORDER_TYPE_STOP_MARKET,
-              stopPrice=str(sl_price), closePosition=True, workingType='CONTRACT_PRICE')
+              stopPrice=str(sl_price), closePosition='true', workingType='CONTRACT_PRICE', newClientOrderId=_cid('sl'))
     if hedge_mode:
         tp['positionSide'] = side; sl['positionSide'] = side
+    return tp, sl
 
-    tp_res = retry(lambda: client.futures_create_order(**tp), on_error=lambda e,i: print('[WARN] tp attempt',i,e))
-    sl_res = retry(lambda: client.futures_create_order(**sl), on_error=lambda e,i: print('[WARN] sl attempt',i,e))
-    print(f"[TP/SL] {side} TP={tp['stopPrice']} SL={sl['stopPrice']}")
-    return tp_res, sl_res
+def _record_entry(client, symbol: str, side: str, qty: Decimal, res, ref_price: Decimal = None):
+    # record active trade for simple post-exit logging; RESULT responses carry the fill price
+    try:
+        price = d((res or {}).get('avgPrice') or 0)
+        if price == 0: price = ref_price if ref_price else mark_price(client, symbol)
+        state.open_trade(symbol, side, d(qty), price)
+    except Exception:
+        pass
 
-def cancel_side_brackets(client, symbol: str, side: str):
-    orders = retry(lambda: client.futures_get_open_orders(symbol=symbol), on_error=lambda e,i: print('[WARN] fetch orders',i,e))
-    for o in orders:
-        typ = o.get('type'); ps = o.get('positionSide')
-        if ps and ps != side: continue
-        if typ in ('TAKE_PROFIT_MARKET','STOP_MARKET','TAKE_PROFIT','STOP'):
+def place_entry_market(client, symbol: str, direction: str, qty: Decimal, hedge_mode: bool):
+    params = _entry_order(symbol, direction, qty, hedge_mode)
+    print(f"[ENTRY] {direction} qty={qty}")
+    limiter.acquire(1, 'order')
+    res = retry(lambda: client.futures_create_order(**params), name='order', weight=1, on_error=lambda e,i: print('[WARN] entry attempt',i,e))
+    positions.invalidate()
+    metrics.inc('entries')
+    _record_entry(client, symbol, 'LONG' if direction=='BUY' else 'SHORT', qty, res)
+    return res
+
+def _submit_batch(client, orders, what: str):
+    """One batchOrders request (max 5 legs) -> [(ok, result_or_error)] in leg order.
+    Every leg carries a newClientOrderId, so a retry after a lost response cannot double-place:
+    legs that landed the first time come back as duplicates and count as accepted."""
+    limiter.acquire(WEIGHTS['batch_order'], 'order', orders=len(orders))
+    res = retry(lambda: client.futures_place_batch_order(batchOrders=orders), name='batch_order', weight=WEIGHTS['batch_order'],
+                on_error=lambda e,i: print('[WARN]', what, 'batch attempt', i, e))
+    legs = []
+    for o, r in zip(orders, res):
+        if isinstance(r, dict) and 'orderId' in r: legs.append((True, r))
+        elif isinstance(r, dict) and r.get('code') == DUPLICATE_CLIENT_ID: legs.append((True, {'clientOrderId': o.get('newClientOrderId')}))
+        else: legs.append((False, r))
+    return legs
+
+def _cancel_batch(client, symbol: str, order_ids=(), client_ids=()):
+    """Cancel by orderId and/or clientOrderId, 10 per request."""
+    for key, ids in (('orderIdList', list(order_ids)), ('origClientOrderIdList', list(client_ids))):
+        for i in range(0, len(ids), 10):
+            chunk = json.dumps(ids[i:i+10], separators=(',', ':'))
+            limiter.acquire(WEIGHTS['cancel'], 'order')
             try:
-                retry(lambda: client.futures_cancel_order(symbol=symbol, orderId=o['orderId']), on_error=lambda e,i: print('[WARN] cancel attempt',i,e))
+                res = retry(lambda: client.futures_cancel_orders(symbol=symbol, **{key: chunk}), name='cancel', weight=WEIGHTS['cancel'],
+                            on_error=lambda e,n: print('[WARN] cancel attempt',n,e))
+                for r in res or []:
+                    if isinstance(r, dict) and 'orderId' not in r: print('[WARN] cancel leg:', r.get('msg'))
             except Exception as e:
                 print('[WARN] cancel:', e)
 
+def _flatten(client, symbol: str, side: str, qty: Decimal, hedge_mode: bool):
+    params = dict(symbol=symbol, side=SIDE_SELL if side=='LONG' else SIDE_BUY, type=FUTURE_ORDER_TYPE_MARKET, quantity=str(qty))
+    if hedge_mode: params['positionSide'] = side
+    else: params['reduceOnly'] = 'true'
+    limiter.acquire(1, 'order')
+    return retry(lambda: client.futures_create_order(**params), name='order', weight=1, on_error=lambda e,i: print('[WARN] rollback attempt',i,e))
+
+def place_entry_with_brackets(client, symbol: str, direction: str, qty: Decimal, ref_price: Decimal,
+                              tp_pct: Decimal, sl_pct: Decimal, filters, hedge_mode: bool):
+    """Market entry + TP + SL in a single batchOrders request, brackets priced off ref_price.
+    Rejected entry -> accepted brackets are cancelled. Rejected bracket -> the entry is closed
+    at market and the other bracket cancelled, so no position is left without its stop. If that
+    close fails too, the entry is kept: recorded in state and given a fresh TP/SL pair."""
+    side = 'LONG' if direction=='BUY' else 'SHORT'
+    tick = (filters or filter_registry.get(symbol))['tick']
+    entry = _entry_order(symbol, direction, qty, hedge_mode); entry['newClientOrderId'] = _cid('in')
+    tp, sl = _bracket_orders(symbol, side, ref_price, tp_pct, sl_pct, tick, hedge_mode)
+    print(f"[ENTRY] {direction} qty={qty} TP={tp['stopPrice']} SL={sl['stopPrice']} (batch)")
+    (e_ok, e_res), (tp_ok, tp_res), (sl_ok, sl_res) = _submit_batch(client, [entry, tp, sl], 'entry')
+    positions.invalidate()
+    accepted = [o['newClientOrderId'] for o, ok in ((tp, tp_ok), (sl, sl_ok)) if ok]
+    if not e_ok:
+        _cancel_batch(client, symbol, client_ids=accepted)
+        raise RuntimeError(f"entry rejected: {e_res}")
+    metrics.inc('entries')
+    if not (tp_ok and sl_ok):
+        print('[WARN] bracket rejected, rolling back entry:', tp_res if not tp_ok else sl_res)
+        _cancel_batch(client, symbol, client_ids=accepted)
+        metrics.inc('rollbacks')
+        try: _flatten(client, symbol, side, qty, hedge_mode)
+        except Exception as e:  # the entry is live and unprotected: track it and put a stop under it
+            positions.invalidate(); metrics.inc('rollback_failures')
+            print(f"[ERROR] !!! {symbol} {side} rollback failed ({e}) - position stays open, placing standalone TP/SL")
+            _record_entry(client, symbol, side, qty, e_res, ref_price)
+            try: tp_res, sl_res = place_brackets(client, symbol, side, ref_price, tp_pct, sl_pct, filters, hedge_mode)
+            except Exception as e2: tp_res = sl_res = {'msg': str(e2)}
+            if not (isinstance(sl_res, dict) and 'orderId' in sl_res): print(f"[ERROR] !!! {symbol} {side} is open WITHOUT a stop loss:", sl_res)
+            return e_res, tp_res, sl_res
+        positions.invalidate()
+        raise RuntimeError(f"bracket rejected, {side} entry rolled back")
+    _record_entry(client, symbol, side, qty, e_res, ref_price)
+    return e_res, tp_res, sl_res
+
+def place_brackets(client, symbol: str, side: str, entry_price: Decimal, tp_pct: Decimal, sl_pct: Decimal, filters, hedge_mode: bool):
+    tick = (filters or filter_registry.get(symbol))['tick']
+    tp, sl = _bracket_orders(symbol, side, entry_price, tp_pct, sl_pct, tick, hedge_mode)
+    (tp_ok, tp_res), (sl_ok, sl_res) = _submit_batch(client, [tp, sl], 'tp/sl')
+    if not (tp_ok and sl_ok):
+        print('[WARN] tp/sl leg rejected:', tp_res if not tp_ok else sl_res)
+    print(f"[TP/SL] {side} TP={tp['stopPrice']} SL={sl['stopPrice']}")
+    return tp_res, sl_res
+
+def cancel_side_brackets(client, symbol: str, side: str):
+    orders = retry(lambda: client.futures_get_open_orders(symbol=symbol), name='open_orders', weight=1, on_error=lambda e,i: print('[WARN] fetch orders',i,e))
+    ids = [o['orderId'] for o in orders
+           if o.get('type') in BRACKET_TYPES and not (o.get('positionSide') and o.get('positionSide') != side)]
+    _cancel_batch(client, symbol, order_ids=ids)
+
 def calc_atr_sl_tp(entry_price: Decimal, atr: Decimal, side: str):
     if atr is None or atr == 0:
         return d(BASE_SL_PCT), d(BASE_TP_PCT), Decimal('0')
@@ -110,12 +185,12 @@ def calc_atr_sl_tp(entry_price: Decimal, atr: Decimal, side: str):
 
 def maybe_micro_tp(client, symbol: str, side: str, amt: Decimal, entry: Decimal, hedge_mode: bool):
     if amt == 0 or entry == 0: return False
-    ts = entry_ts.get(side,0.0)
+    ts = state.get(symbol, side).entry_ts
     if ts == 0.0: return False
     held_minutes = (time.time() - ts)/60.0
     if held_minutes < MICRO_TP_TRIGGER_MINUTES: return False
     try:
-        mark = d(client.futures_mark_price(symbol=symbol)['markPrice'])
+        mark = mark_price(client, symbol)
     except Exception:
         return False
     if side == 'LONG':
@@ -128,9 +203,10 @@ def maybe_micro_tp(client, symbol: str, side: str, amt: Decimal, entry: Decimal,
         if hedge_mode: params['positionSide'] = side
         try:
             print(f"[MICRO-TP] closing {side} small profit {unreal_pct:.3f}% after {held_minutes:.1f}m")
-            retry(lambda: client.futures_create_order(**params), on_error=lambda e,i: print('[WARN] micro-tp attempt',i,e))
-            entry_ts[side] = 0.0; pyramid_count[side] = 0
-            # treat as closed trade -> log exit
+            limiter.acquire(1, 'order')
+            retry(lambda: client.futures_create_order(**params), name='order', weight=1, on_error=lambda e,i: print('[WARN] micro-tp attempt',i,e))
+            positions.invalidate()
+            # treat as closed trade -> log exit (clears the side's state)
             _handle_trade_exit(client, symbol, side, mark)
             return True
         except Exception as e:
@@ -138,35 +214,31 @@ def maybe_micro_tp(client, symbol: str, side: str, amt: Decimal, entry: Decimal,
     return False
 
 def _handle_trade_exit(client, symbol, side, exit_price):
-    global loss_streak
-    at = active_trades.get(side)
+    at = state.close_trade(symbol, side)
     if not at:
         return
     try:
-        entry_price = d(at.get('entry_price',0))
-        qty = d(at.get('qty',0))
+        entry_price = d(at['entry_price'])
+        qty = d(at['qty'])
         pnl = (exit_price - entry_price)/entry_price * Decimal('100') if side=='LONG' else (entry_price - exit_price)/entry_price * Decimal('100')
-        row = {'ts': int(time.time()), 'side': side, 'entry_price': str(entry_price), 'exit_price': str(exit_price), 'qty': str(qty), 'pnl_pct': float(pnl)}
+        row = {'ts': int(time.time()), 'symbol': symbol, 'side': side, 'entry_price': str(entry_price), 'exit_price': str(exit_price), 'qty': str(qty), 'pnl_pct': float(pnl)}
         _append_trade_log(row)
-        # update loss streak
-        if pnl < 0:
-            loss_streak += 1
-        else:
-            loss_streak = 0
-        active_trades[side] = None
+        metrics.inc('trades')
+        state.record_result(pnl)  # update loss streak
     except Exception as e:
         print('[WARN] handle exit failed', e)
 
 def maybe_rearm_adaptive(client, symbol: str, side: str, entry: Decimal, df, filters, hedge_mode: bool):
-    now = time.time()
-    if now - last_rearm_ts[side] < REARM_COOLDOWN_SEC: return
+    now = time.time(); st = state.get(symbol, side)
+    if now - st.last_rearm_ts < REARM_COOLDOWN_SEC: return
     last = df.iloc[-1]
     mark = d(last['close'])
-    atr = d(last['atr']) if not pd.isna(last['atr']) else d(0)
+    atr = d(last['atr']) if last['atr'] == last['atr'] else d(0)
     if atr == 0: return
     moved = (mark - entry) if side=='LONG' else (entry - mark)
     if moved <= 0: return
     if moved < d(ADAPT_TRIGGER_ATR) * atr: return
+    if not st.claim('last_rearm_ts', now, REARM_COOLDOWN_SEC): return  # another worker is re-arming this side
     try:
         cancel_side_brackets(client, symbol, side)
     except Exception as e:
@@ -174,5 +246,4 @@ def maybe_rearm_adaptive(client, symbol: str, side: str, entry: Decimal, df, fil
     new_tp_pct = d(BASE_TP_PCT) * d(TP_EXPAND_FACTOR)
     new_sl_pct = max(Decimal('0.05'), d(TRAIL_SL_LOCK_PCT))
     place_brackets(client, symbol, side, entry, d(new_tp_pct), d(new_sl_pct), filters, hedge_mode)
-    last_rearm_ts[side] = now
     print(f"[ADAPT] {side} expanded TP to {float(new_tp_pct):.2f}% & trailed SL to {float(new_sl_pct):.2f}%")
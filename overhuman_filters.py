@@ -1,13 +1,17 @@
-import pandas as pd
+from __future__ import annotations  # frame annotations only; the row-level filters never import pandas
 from decimal import Decimal
+from typing import TYPE_CHECKING
 from utils import d
 from overhuman_config import (MIN_VOL_PCT, DOJI_ATR_RATIO, VOL_BOOST_FACTOR,
                               BB_WIDTH_MIN, MIN_ADX, HTF_VOTE_THRESHOLD)
 
-from overhuman_indicators import add_indicators
+from overhuman_indicators import last_row
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 def market_filters_ok(df: pd.DataFrame, htf_map) -> bool:
-    last = df.iloc[-1]
+    last = last_row(df)
     atr = d(last.get('atr',0))
     vol_pct = d(last.get('vol_pct',0))
     vol_mean = d(last.get('vol_mean',0))
@@ -27,10 +31,10 @@ def market_filters_ok(df: pd.DataFrame, htf_map) -> bool:
     htf_votes = 0
     total_htf = 0
     for interval, htf_df in htf_map.items():
-        if htf_df is None or htf_df.empty:
+        if htf_df is None or getattr(htf_df, 'empty', False):
             continue
         total_htf += 1
-        hlast = htf_df.iloc[-1]
+        hlast = last_row(htf_df)
         if hlast['ema_fast'] > hlast['ema_slow']:
             htf_votes += 1
         elif hlast['ema_fast'] < hlast['ema_slow']:
@@ -38,7 +42,8 @@ def market_filters_ok(df: pd.DataFrame, htf_map) -> bool:
     if total_htf >= 2 and abs(htf_votes) < HTF_VOTE_THRESHOLD:
         return False
     # ADX
-    if pd.isna(last.get('adx')):
+    adx = last.get('adx')
+    if adx is None or adx != adx:
         return False
     if d(last.get('adx',0)) < d(MIN_ADX):
         if d(last.get('volume',0)) < (vol_mean * d(VOL_BOOST_FACTOR)):
@@ -46,7 +51,7 @@ def market_filters_ok(df: pd.DataFrame, htf_map) -> bool:
     return True
 
 def pick_signal(df: pd.DataFrame) -> str:
-    last = df.iloc[-1]
+    last = last_row(df)
     bias_up = last['ema_fast'] > last['ema_slow']
     bias_down = last['ema_fast'] < last['ema_slow']
     close = d(last['close'])
@@ -57,3 +62,84 @@ def pick_signal(df: pd.DataFrame) -> str:
     if buy: return 'BUY'
     if sell: return 'SELL'
     return 'HOLD'
+
+# ===== Float fast path (thresholds resolved once; Decimal stays in sizing/quantization) =====
+_FAST = {}
+
+def refresh_fast_thresholds():
+    """Re-resolve the float thresholds; call after config overrides change them."""
+    _FAST.update(min_vol_pct=float(MIN_VOL_PCT), doji=float(DOJI_ATR_RATIO), vol_boost=float(VOL_BOOST_FACTOR),
+                 bb_width_min=float(BB_WIDTH_MIN), min_adx=float(MIN_ADX), htf_vote=HTF_VOTE_THRESHOLD,
+                 buy_mult=1.0 + 0.0010, sell_mult=1.0 - 0.0010)
+
+refresh_fast_thresholds()
+
+def market_filters_ok_fast(df, htf_map) -> bool:
+    """market_filters_ok on native floats. A NaN input fails the filter where the Decimal path raises."""
+    last = last_row(df); f = _FAST
+    atr = float(last.get('atr',0) or 0); vol_pct = float(last.get('vol_pct',0) or 0)
+    vol_need = float(last.get('vol_mean',0) or 0) * f['vol_boost']
+    volume = float(last.get('volume',0) or 0)
+    if atr == 0 or vol_pct == 0 or atr != atr or vol_pct != vol_pct:
+        return False
+    if not vol_pct >= f['min_vol_pct']: return False
+    if not float(last.get('high',0)) - float(last.get('low',0)) >= atr * f['doji']: return False
+    if not volume >= vol_need: return False
+    if not float(last.get('bb_width',1.0)) >= f['bb_width_min']: return False
+    htf_votes = 0; total_htf = 0
+    for interval, htf_df in htf_map.items():
+        if htf_df is None or getattr(htf_df, 'empty', False): continue
+        total_htf += 1
+        hlast = last_row(htf_df)
+        if hlast['ema_fast'] > hlast['ema_slow']: htf_votes += 1
+        elif hlast['ema_fast'] < hlast['ema_slow']: htf_votes -= 1
+    if total_htf >= 2 and abs(htf_votes) < f['htf_vote']: return False
+    adx = last.get('adx')
+    if adx is None or adx != adx: return False
+    if adx < f['min_adx'] and volume < vol_need: return False
+    return True
+
+def pick_signal_fast(df) -> str:
+    last = last_row(df); f = _FAST
+    ef = last['ema_fast']; es = last['ema_slow']; slope = last['ema_slope']; rsi = last['rsi']; close = last['close']
+    if ef > es and slope > 0 and rsi > 51 and close > es * f['buy_mult']: return 'BUY'
+    if ef < es and slope < 0 and rsi < 49 and close < es * f['sell_mult']: return 'SELL'
+    return 'HOLD'
+
+def check_fast_equivalence(df: pd.DataFrame, start: int = 0) -> list:
+    """Compare the float path with the Decimal path on every row of an indicator frame.
+    Returns mismatching row positions (a Decimal-path exception counts as a failed filter)."""
+    bad = []
+    for i in range(start, len(df)):
+        row = df.iloc[i]
+        try: ref_ok = market_filters_ok(row, {})
+        except Exception: ref_ok = False
+        ref = pick_signal(row) if ref_ok else 'HOLD'
+        got = pick_signal_fast(row) if market_filters_ok_fast(row, {}) else 'HOLD'
+        if ref != got: bad.append(i)
+    return bad
+
+# ===== Vectorized (whole-column) versions for backtests =====
+def market_filters_mask(df: pd.DataFrame, htf_votes: pd.DataFrame = None, min_vol_pct=MIN_VOL_PCT, doji_atr_ratio=DOJI_ATR_RATIO,
+                        vol_boost_factor=VOL_BOOST_FACTOR, bb_width_min=BB_WIDTH_MIN, min_adx=MIN_ADX) -> pd.Series:
+    """market_filters_ok for every row at once. htf_votes (optional) has 'votes' and 'total' columns
+    aligned to df; NaN indicator rows never pass."""
+    atr = df['atr']; vol_pct = df['vol_pct']; vol_need = df['vol_mean'] * float(vol_boost_factor)
+    rng = df['high'] - df['low']
+    ok = atr.notna() & vol_pct.notna() & (atr != 0) & (vol_pct != 0)
+    ok &= vol_pct >= float(min_vol_pct)
+    ok &= rng >= atr * float(doji_atr_ratio)
+    ok &= df['volume'] >= vol_need
+    ok &= df['bb_width'] >= float(bb_width_min)  # NaN fails, as in the scalar paths
+    if htf_votes is not None:
+        ok &= (htf_votes['total'] < 2) | (htf_votes['votes'].abs() >= HTF_VOTE_THRESHOLD)
+    ok &= df['adx'].notna()
+    ok &= ~((df['adx'] < float(min_adx)) & (df['volume'] < vol_need))
+    return ok
+
+def signal_vector(df: pd.DataFrame) -> pd.Series:
+    """pick_signal for every row: +1 BUY, -1 SELL, 0 HOLD."""
+    margin = 0.0010
+    buy = (df['ema_fast'] > df['ema_slow']) & (df['ema_slope'] > 0) & (df['rsi'] > 51) & (df['close'] > df['ema_slow'] * (1 + margin))
+    sell = (df['ema_fast'] < df['ema_slow']) & (df['ema_slope'] < 0) & (df['rsi'] < 49) & (df['close'] < df['ema_slow'] * (1 - margin))
+    return buy.astype('int8') - (sell & ~buy).astype('int8')
@@ -0,0 +1,78 @@
+import threading
+from typing import Dict, List, Optional
+import overhuman_config as cfg
+from overhuman_klines import interval_ms
+
+HTF_INTERVALS   = getattr(cfg, 'HTF_INTERVALS', ['3m','5m','15m'])
+HTF_EMA_FAST    = getattr(cfg, 'HTF_EMA_FAST', 8)
+HTF_EMA_SLOW    = getattr(cfg, 'HTF_EMA_SLOW', 21)
+HTF_EMA_CONFIRM = getattr(cfg, 'HTF_EMA_CONFIRM', 50)
+HTF_MIN_BARS    = getattr(cfg, 'HTF_MIN_BARS', HTF_EMA_SLOW)
+
+class _Frame:
+    """One symbol x one higher timeframe: the forming bucket plus committed EMA state."""
+    __slots__ = ('ms', 'bucket', 'o', 'h', 'l', 'c', 'v', 'bars', 'ema_fast', 'ema_slow', 'ema_confirm')
+
+    def __init__(self, ms: int):
+        self.ms = ms; self.bucket = None; self.o = self.h = self.l = self.c = self.v = 0.0
+        self.bars = 0; self.ema_fast = None; self.ema_slow = None; self.ema_confirm = None
+
+    @staticmethod
+    def _ema(prev, x: float, span: int) -> float:
+        a = 2.0 / (span + 1)
+        return x if prev is None else prev*(1 - a) + x*a
+
+    def _commit(self):
+        self.ema_fast = self._ema(self.ema_fast, self.c, HTF_EMA_FAST)
+        self.ema_slow = self._ema(self.ema_slow, self.c, HTF_EMA_SLOW)
+        self.ema_confirm = self._ema(self.ema_confirm, self.c, HTF_EMA_CONFIRM)
+        self.bars += 1; self.bucket = None
+
+    def add(self, ot: int, base_ms: int, o: float, h: float, l: float, c: float, v: float):
+        b = ot - ot % self.ms
+        if self.bucket is not None and b != self.bucket: self._commit()  # a base bar was missed at the boundary
+        if self.bucket is None:
+            self.bucket = b; self.o, self.h, self.l, self.c, self.v = o, h, l, c, v
+        else:
+            self.h = max(self.h, h); self.l = min(self.l, l); self.c = c; self.v += v
+        if ot + base_ms >= b + self.ms: self._commit()  # last base bar of the bucket closed it
+
+    def row(self, close: Optional[float] = None) -> dict:
+        """Latest HTF values; the forming bucket (or `close`) is applied on top without committing."""
+        c = close if close is not None else (self.c if self.bucket is not None else None)
+        if c is None:
+            return {'close': None, 'ema_fast': self.ema_fast, 'ema_slow': self.ema_slow, 'ema_confirm': self.ema_confirm, 'bars': self.bars}
+        return {'close': c, 'ema_fast': self._ema(self.ema_fast, c, HTF_EMA_FAST), 'ema_slow': self._ema(self.ema_slow, c, HTF_EMA_SLOW),
+                'ema_confirm': self._ema(self.ema_confirm, c, HTF_EMA_CONFIRM), 'bars': self.bars}
+
+class HTFEngine:
+    """Builds higher-timeframe bars by resampling the closed base bars KlineStore already holds
+    (register on_bar as a KlineStore.on_close hook) and keeps their EMAs incrementally, so the
+    HTF confirmation in market_filters_ok costs no extra kline requests."""
+
+    def __init__(self, intervals: List[str] = HTF_INTERVALS, base_interval: str = cfg.INTERVAL, min_bars: int = HTF_MIN_BARS):
+        self.base_ms = interval_ms(base_interval)
+        self.intervals = [i for i in intervals if interval_ms(i) > self.base_ms and interval_ms(i) % self.base_ms == 0]
+        self.min_bars = min_bars
+        self._frames: Dict[str, Dict[str, _Frame]] = {}
+        self._last: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def on_bar(self, symbol: str, row: dict):
+        ot = int(row['open_time'])
+        if ot <= self._last.get(symbol, -1): return  # replays after a buffer reset
+        frames = self._frames.get(symbol)
+        if frames is None:
+            with self._lock:
+                frames = self._frames.setdefault(symbol, {i: _Frame(interval_ms(i)) for i in self.intervals})
+        for f in frames.values():
+            f.add(ot, self.base_ms, row['open'], row['high'], row['low'], row['close'], row['volume'])
+        self._last[symbol] = ot
+
+    def htf_map(self, symbol: str, row: Optional[dict] = None) -> Dict[str, dict]:
+        """{interval: row} for timeframes with at least min_bars committed bars; `row` (the latest
+        base row, possibly forming) supplies the current price for the forming HTF bar."""
+        frames = self._frames.get(symbol)
+        if not frames: return {}
+        close = row['close'] if row is not None else None
+        return {i: f.row(close) for i, f in frames.items() if f.bars >= self.min_bars}
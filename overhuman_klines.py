@@ -0,0 +1,128 @@
+import time, threading, collections
+from typing import Callable, Deque, Dict, List, Optional
+import overhuman_config as cfg
+from overhuman_indicators import StreamingIndicators
+
+KLINE_COLUMNS = ['open_time','open','high','low','close','volume','close_time','quote_volume','trades','taker_buy_base','taker_buy_quote','ignore']
+KLINE_BUFFER_SIZE = getattr(cfg, 'KLINE_BUFFER_SIZE', 300)
+_UNIT_MS = {'m': 60_000, 'h': 3_600_000, 'd': 86_400_000, 'w': 604_800_000}
+
+def interval_ms(interval: str) -> int:
+    return int(interval[:-1]) * _UNIT_MS[interval[-1]]
+
+def parse_kline(k) -> tuple:
+    """Raw REST/WS kline -> (open_time, open, high, low, close, volume, close_time)."""
+    return (int(k[0]), float(k[1]), float(k[2]), float(k[3]), float(k[4]), float(k[5]), int(k[6]))
+
+class _Series:
+    __slots__ = ('rows', 'ind', 'last_open', 'forming', 'lock')
+
+    def __init__(self, capacity: int):
+        self.rows: Deque[dict] = collections.deque(maxlen=capacity)
+        self.ind = StreamingIndicators(); self.last_open = -1; self.forming: Optional[dict] = None
+        self.lock = threading.Lock()
+
+class KlineStore:
+    """Rolling per-symbol kline buffer. Bootstraps with one full fetch, then pulls only the
+    bars that are new or still forming and advances the indicators incrementally."""
+
+    def __init__(self, client, interval: str = cfg.INTERVAL, capacity: int = KLINE_BUFFER_SIZE,
+                 clock: Optional[Callable[[], int]] = None):
+        self.client = client; self.interval = interval; self.capacity = capacity
+        self.clock = clock or (lambda: int(time.time()*1000))  # exchange time in ms (paper exchanges run on their own clock)
+        self.step_ms = interval_ms(interval)
+        self._series: Dict[str, _Series] = {}
+        self._lock = threading.Lock()
+        self.on_close: List[Callable[[str, dict], None]] = []  # called with (symbol, row) per committed bar
+
+    def _closed(self, symbol: str, row: dict):
+        for fn in self.on_close:
+            try: fn(symbol, row)
+            except Exception as e: print('[WARN] kline close hook:', symbol, e)
+
+    def _get(self, symbol: str) -> _Series:
+        s = self._series.get(symbol)
+        if s is None:
+            with self._lock:
+                s = self._series.setdefault(symbol, _Series(self.capacity))
+        return s
+
+    def reset(self, symbol: str):
+        with self._lock: self._series[symbol] = _Series(self.capacity)
+
+    def fetch_limit(self, symbol: str, now_ms: Optional[int] = None) -> int:
+        s = self._series.get(symbol)
+        if s is None or not s.rows: return self.capacity
+        now_ms = now_ms if now_ms is not None else self.clock()
+        return min(self.capacity, max(2, (now_ms - s.last_open)//self.step_ms + 2))
+
+    def update(self, symbol: str) -> Optional[dict]:
+        """Fetch only what changed since the last call and return the latest indicator row."""
+        limit = self.fetch_limit(symbol)
+        kl = self.client.futures_klines(symbol=symbol, interval=self.interval, limit=limit)
+        if kl and self._series.get(symbol) is not None and self._series[symbol].rows:
+            first_open = int(kl[0][0]); s = self._series[symbol]
+            if first_open > s.last_open + self.step_ms or limit >= self.capacity:
+                # missed bars (clock skew / long stall) -> rebuild from a full window
+                self.reset(symbol)
+                if limit < self.capacity:
+                    kl = self.client.futures_klines(symbol=symbol, interval=self.interval, limit=self.capacity)
+        return self.ingest(symbol, kl)
+
+    def _commit(self, s: _Series, symbol: str, bar: tuple):
+        if bar[0] <= s.last_open: return
+        row = s.ind.push(bar); s.rows.append(row); s.last_open = bar[0]
+        self._closed(symbol, row)
+
+    def seed(self, symbol: str, bars: List[tuple]) -> Optional[dict]:
+        """Commit already-parsed closed bars (oldest first), e.g. a warm start from KlineArchive.tail();
+        the next update() then only fetches what is newer."""
+        s = self._get(symbol)
+        with s.lock:
+            for bar in bars: self._commit(s, symbol, bar)
+            return s.rows[-1] if s.rows else None
+
+    def ingest(self, symbol: str, klines: List) -> Optional[dict]:
+        """Apply raw klines (oldest first). All but the last are closed; the last one is the forming bar."""
+        s = self._get(symbol)
+        with s.lock:
+            for k in klines[:-1]: self._commit(s, symbol, parse_kline(k))
+            if klines:
+                bar = parse_kline(klines[-1])
+                if bar[0] > s.last_open: s.forming = s.ind.peek(bar)
+            return s.forming if s.forming is not None and s.forming['open_time'] > s.last_open else (s.rows[-1] if s.rows else None)
+
+    def apply_bar(self, symbol: str, bar: tuple, closed: bool) -> Optional[dict]:
+        """Apply one streamed bar. Returns None when the bar does not follow the buffer (gap) so the
+        caller can backfill over REST with update()."""
+        s = self._get(symbol)
+        with s.lock:
+            if bar[0] <= s.last_open: return s.rows[-1] if s.rows else None
+            if s.rows and bar[0] > s.last_open + self.step_ms: return None
+            if closed:
+                self._commit(s, symbol, bar); s.forming = None
+                return s.rows[-1]
+            s.forming = s.ind.peek(bar)
+            return s.forming
+
+    def last(self, symbol: str) -> Optional[dict]:
+        s = self._series.get(symbol)
+        if s is None: return None
+        if s.forming is not None and s.forming['open_time'] > s.last_open: return s.forming
+        return s.rows[-1] if s.rows else None
+
+    def closes(self, symbol: str, n: int) -> List[float]:
+        """Last n committed closes, oldest first (portfolio correlation)."""
+        s = self._series.get(symbol)
+        if s is None: return []
+        rows = s.rows
+        return [rows[j]['close'] for j in range(max(0, len(rows) - n), len(rows))]
+
+    def frame(self, symbol: str):
+        """Materialize the buffer (closed bars + forming bar) as a DataFrame; for analysis, not the hot path."""
+        import pandas as pd
+        s = self._get(symbol)
+        with s.lock:
+            rows = list(s.rows)
+            if s.forming is not None and s.forming['open_time'] > s.last_open: rows.append(s.forming)
+        return pd.DataFrame(rows)
@@ -0,0 +1,118 @@
+import os, csv, time, queue, atexit, threading
+from typing import Dict, List, Optional
+import overhuman_config as cfg
+
+LOG_FORMAT        = getattr(cfg, 'LOG_FORMAT', 'csv')
+LOG_FLUSH_SEC     = getattr(cfg, 'LOG_FLUSH_SEC', 5)
+LOG_BATCH_SIZE    = getattr(cfg, 'LOG_BATCH_SIZE', 256)
+LOG_ROTATE_BYTES  = getattr(cfg, 'LOG_ROTATE_BYTES', 50*1024*1024)
+LOG_QUEUE_MAX     = getattr(cfg, 'LOG_QUEUE_MAX', 100_000)
+
+class BatchWriter:
+    """Queue-backed record writer. write() never touches disk; a daemon thread flushes batches
+    every flush_sec or batch_size rows. CSV files rotate at rotate_bytes, or when rows carry a column
+    the existing header lacks. Parquet writes one part file per flush into a <name>/ directory, so
+    finished parts stay readable while the bot runs."""
+
+    def __init__(self, path: str, fmt: str = LOG_FORMAT, flush_sec: float = LOG_FLUSH_SEC,
+                 batch_size: int = LOG_BATCH_SIZE, rotate_bytes: int = LOG_ROTATE_BYTES):
+        if fmt == 'parquet':
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                print('[WARN] pyarrow not installed, logging', path, 'as CSV'); fmt = 'csv'
+        self.path = path; self.fmt = fmt; self.flush_sec = flush_sec
+        self.batch_size = batch_size; self.rotate_bytes = rotate_bytes
+        self.dropped = 0; self.written = 0
+        self._q: 'queue.Queue[dict]' = queue.Queue(maxsize=LOG_QUEUE_MAX)
+        self._fields: Optional[List[str]] = None
+        self._io_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f'log-{os.path.basename(path)}', daemon=True)
+        self._thread.start()
+
+    def write(self, row: dict):
+        try: self._q.put_nowait(row)
+        except queue.Full: self.dropped += 1
+
+    def _drain(self) -> List[dict]:
+        batch = []
+        while True:
+            try: batch.append(self._q.get_nowait())
+            except queue.Empty: return batch
+
+    def _run(self):
+        pending: List[dict] = []; last = time.time()
+        while not self._stop.is_set():
+            try: pending.append(self._q.get(timeout=min(1.0, self.flush_sec)))
+            except queue.Empty: pass
+            if len(pending) >= self.batch_size or (pending and time.time() - last >= self.flush_sec):
+                pending += self._drain()
+                self._write(pending); pending = []; last = time.time()
+        self._write(pending + self._drain())
+
+    def flush(self):
+        """Synchronously write whatever is queued (shutdown / tests)."""
+        self._write(self._drain())
+
+    def close(self):
+        self._stop.set(); self._thread.join(timeout=5)
+
+    # ----- sinks -----
+    def _write(self, rows: List[dict]):
+        if not rows: return
+        with self._io_lock:
+            try:
+                if self.fmt == 'parquet': self._write_parquet(rows)
+                else: self._write_csv(rows)
+                self.written += len(rows)
+            except Exception as e:
+                print('[WARN] log write failed:', self.path, e)
+
+    def _rotate_csv(self, force: bool = False):
+        if os.path.exists(self.path) and (force or os.path.getsize(self.path) >= self.rotate_bytes):
+            stem, ext = os.path.splitext(self.path)
+            dst = f"{stem}.{time.strftime('%Y%m%d-%H%M%S')}{ext}"; n = 1
+            while os.path.exists(dst): dst = f"{stem}.{time.strftime('%Y%m%d-%H%M%S')}-{n}{ext}"; n += 1
+            os.replace(self.path, dst)
+            self._fields = None
+
+    def _write_csv(self, rows: List[dict]):
+        self._rotate_csv()
+        new_file = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        if self._fields is None:
+            if not new_file:
+                with open(self.path, newline='') as f: self._fields = next(csv.reader(f), None)
+            if not self._fields: self._fields = list(rows[0].keys()); new_file = True
+        missing = {k for r in rows for k in r}.difference(self._fields)
+        if missing:  # schema grew: keep the old file intact under a rotated name rather than drop the new columns
+            print('[LOG] header change in', self.path, '- rotating for', sorted(missing))
+            self._rotate_csv(force=True); new_file = True
+            self._fields = list(dict.fromkeys(k for r in rows for k in r))
+        with open(self.path, 'a', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=self._fields, extrasaction='ignore')
+            if new_file: writer.writeheader()
+            writer.writerows(rows)
+
+    def _write_parquet(self, rows: List[dict]):
+        import pyarrow as pa, pyarrow.parquet as pq
+        stem = os.path.splitext(self.path)[0]
+        os.makedirs(stem, exist_ok=True)
+        name = f"{os.path.basename(stem)}-{time.strftime('%Y%m%d-%H%M%S')}-{self.written}.parquet"
+        pq.write_table(pa.Table.from_pylist(rows), os.path.join(stem, name))
+
+_writers: Dict[str, BatchWriter] = {}
+_writers_lock = threading.Lock()
+
+def get_writer(path: str, fmt: str = None) -> BatchWriter:
+    w = _writers.get(path)
+    if w is None:
+        with _writers_lock:
+            w = _writers.get(path)
+            if w is None:
+                w = _writers[path] = BatchWriter(path, fmt or getattr(cfg, 'LOG_FORMAT', LOG_FORMAT))
+    return w
+
+@atexit.register
+def close_all():
+    for w in list(_writers.values()): w.close()
@@ -0,0 +1,130 @@
+import time, json, bisect, threading, contextlib
+from typing import Dict, List, Optional, Tuple
+
+# latency bucket upper bounds in seconds (1ms .. 30s, roughly x2 per step)
+BUCKETS = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0]
+
+class Histogram:
+    """Cumulative-bucket latency histogram (Prometheus layout) with interpolated quantiles."""
+    __slots__ = ('counts', 'count', 'sum', 'max')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1); self.count = 0; self.sum = 0.0; self.max = 0.0
+
+    def observe(self, v: float):
+        self.counts[bisect.bisect_left(BUCKETS, v)] += 1
+        self.count += 1; self.sum += v
+        if v > self.max: self.max = v
+
+    def quantile(self, q: float) -> float:
+        if not self.count: return 0.0
+        rank = q * self.count; seen = 0
+        for i, c in enumerate(self.counts):
+            if seen + c >= rank and c:
+                lo = BUCKETS[i-1] if i > 0 else 0.0
+                hi = BUCKETS[i] if i < len(BUCKETS) else self.max
+                return min(lo + (hi - lo) * (rank - seen) / c, self.max)
+            seen += c
+        return self.max
+
+class Metrics:
+    """Process-wide counters and latency histograms. Counters keep the old dict interface
+    (metrics['entries'] += 1); labelled series are keyed 'name{label="v"}'."""
+
+    def __init__(self, counters: Tuple[str, ...] = ('trades', 'entries', 'skips')):
+        self._counters: Dict[str, float] = {c: 0 for c in counters}
+        self._hists: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    # dict-style counters
+    def __getitem__(self, key: str): return self._counters.get(key, 0)
+    def __setitem__(self, key: str, value):
+        with self._lock: self._counters[key] = value
+    def __contains__(self, key: str): return key in self._counters
+
+    def inc(self, key: str, n: float = 1):
+        with self._lock: self._counters[key] = self._counters.get(key, 0) + n
+
+    def observe(self, key: str, seconds: float):
+        with self._lock:
+            h = self._hists.get(key)
+            if h is None: h = self._hists[key] = Histogram()
+            h.observe(seconds)
+
+    @contextlib.contextmanager
+    def timer(self, key: str):
+        t0 = time.perf_counter()
+        try: yield
+        finally: self.observe(key, time.perf_counter() - t0)
+
+    def summary(self) -> Dict[str, dict]:
+        with self._lock:
+            return {k: {'count': h.count, 'p50_ms': h.quantile(0.5)*1000, 'p99_ms': h.quantile(0.99)*1000,
+                        'max_ms': h.max*1000, 'sum_s': h.sum} for k, h in self._hists.items()}
+
+    def counters(self) -> Dict[str, float]:
+        with self._lock: return dict(self._counters)
+
+    def render_prometheus(self, prefix: str = 'overhuman_') -> str:
+        out: List[str] = []
+        for k, v in sorted(self.counters().items()):
+            name, labels = _split(k)
+            out.append(f'{prefix}{name}{labels} {v}')
+        with self._lock: hists = {k: (list(h.counts), h.count, h.sum) for k, h in self._hists.items()}
+        for k, (counts, count, total) in sorted(hists.items()):
+            name, labels = _split(k)
+            inner = labels[1:-1] + ',' if labels else ''
+            acc = 0
+            for ub, c in zip(BUCKETS + [float('inf')], counts):
+                acc += c
+                le = '+Inf' if ub == float('inf') else repr(ub)
+                out.append(f'{prefix}{name}_seconds_bucket{{{inner}le="{le}"}} {acc}')
+            out.append(f'{prefix}{name}_seconds_sum{labels} {total}')
+            out.append(f'{prefix}{name}_seconds_count{labels} {count}')
+        return '\n'.join(out) + '\n'
+
+    def dump_line(self) -> str:
+        parts = [f"{k} p50={v['p50_ms']:.1f}ms p99={v['p99_ms']:.1f}ms n={v['count']}" for k, v in sorted(self.summary().items())]
+        return ' | '.join(parts)
+
+    def dump_json(self, path: str):
+        with open(path, 'w') as f: json.dump({'ts': int(time.time()), 'counters': self.counters(), 'latency': self.summary()}, f, indent=1)
+
+def _split(key: str) -> Tuple[str, str]:
+    i = key.find('{')
+    return (key, '') if i < 0 else (key[:i], key[i:])
+
+metrics = Metrics()
+
+def serve_metrics(port: int, host: str = '127.0.0.1'):
+    """Expose metrics.render_prometheus() on http://host:port/metrics from a daemon thread."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    class _H(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = metrics.render_prometheus().encode() if self.path.startswith('/metrics') else b''
+            self.send_response(200 if body else 404)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4'); self.end_headers()
+            self.wfile.write(body)
+        def log_message(self, *args): pass
+    srv = ThreadingHTTPServer((host, port), _H)
+    threading.Thread(target=srv.serve_forever, name='metrics-http', daemon=True).start()
+    return srv
+
+class CycleProfiler:
+    """cProfile over the first `cycles` loop iterations, then writes pstats to `path` and prints the top entries."""
+
+    def __init__(self, cycles: int, path: str = 'profile.out'):
+        self.left = cycles; self.path = path; self._prof = None
+        if cycles > 0:
+            import cProfile
+            self._prof = cProfile.Profile(); self._prof.enable()
+
+    def tick(self):
+        if self._prof is None: return
+        self.left -= 1
+        if self.left > 0: return
+        import pstats, io
+        self._prof.disable(); self._prof.dump_stats(self.path)
+        buf = io.StringIO(); pstats.Stats(self._prof, stream=buf).sort_stats('cumulative').print_stats(20)
+        print('[PROFILE] written to', self.path); print(buf.getvalue())
+        self._prof = None
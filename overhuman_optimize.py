@@ -0,0 +1,113 @@
+# overhuman_optimize.py - grid search over config knobs on all cores
+import os, time, shutil, tempfile, itertools, argparse
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+import numpy as np
+import pandas as pd
+from overhuman_backtest import (load_universe, prepare, signals, simulate, summarize, default_params,
+                                PARAM_KEYS, INDICATOR_KEYS)
+from overhuman_klines import interval_ms
+import overhuman_config as cfg
+
+SHARED_COLUMNS = ['open_time','open','high','low','close','volume','rsi','ema_fast','ema_slow','ema_slope',
+                  'atr','vol_pct','vol_mean','bb_width','adx']
+SWEEP_KEYS = PARAM_KEYS + INDICATOR_KEYS  # what the backtest actually reads (no ACE-Z, no sizing)
+
+def parse_range(spec: str) -> Tuple[str, List[float]]:
+    """'KEY=a:b:step' (inclusive) or 'KEY=v1,v2,...' -> (KEY, values). KEY must be one of SWEEP_KEYS:
+    anything else would not change the simulation and only produce duplicate rows."""
+    key, vals = spec.split('=', 1); key = key.strip()
+    if key not in SWEEP_KEYS: raise ValueError(f"unknown grid key {key!r}; the backtest reads {', '.join(SWEEP_KEYS)}")
+    if ':' in vals:
+        a, b, st = (float(x) for x in vals.split(':'))
+        n = int(round((b - a) / st)) + 1
+        return key, [round(a + i*st, 10) for i in range(n)]
+    return key, [float(v) for v in vals.split(',')]
+
+def expand_grid(ranges: Dict[str, List[float]]) -> List[dict]:
+    keys = list(ranges)
+    return [dict(zip(keys, combo)) for combo in itertools.product(*(ranges[k] for k in keys))]
+
+def _group_key(params: dict) -> Tuple:
+    return tuple(int(params.get(k, getattr(cfg, k))) for k in INDICATOR_KEYS)
+
+# ===== Shared indicator store =====
+def build_shared(frames: Dict[str, pd.DataFrame], groups: List[Tuple], root: str) -> Dict[Tuple, Dict[str, str]]:
+    """Indicator columns once per distinct indicator-window tuple, saved as (ncols, nrows) .npy so
+    workers memory-map them (page cache shared, nothing pickled per task)."""
+    out = {}
+    for gi, g in enumerate(groups):
+        gp = dict(zip(INDICATOR_KEYS, g)); out[g] = {}
+        for sym, df in frames.items():
+            ind = prepare(df, gp)
+            path = os.path.join(root, f'g{gi}_{sym}.npy')
+            np.save(path, np.vstack([ind[c].to_numpy(dtype='float64') for c in SHARED_COLUMNS]))
+            out[g][sym] = path
+    return out
+
+_MAPS: Dict[str, dict] = {}
+
+def _columns(path: str) -> dict:
+    cols = _MAPS.get(path)
+    if cols is None:
+        mm = np.load(path, mmap_mode='r')
+        cols = {c: pd.Series(mm[i], copy=False) for i, c in enumerate(SHARED_COLUMNS)}
+        _MAPS[path] = cols
+    return cols
+
+def _run_combo(task) -> dict:
+    params, paths, bar_ms = task
+    p = default_params(); p.update(params)
+    trades = []
+    for sym, path in paths.items():
+        trades += simulate(_columns(path), signals(_columns(path), p), p, bar_ms, sym)
+    return {**params, **summarize(pd.DataFrame(trades, columns=['exit_time','pnl_pct']))}
+
+def optimize(frames: Dict[str, pd.DataFrame], ranges: Dict[str, List[float]], interval: str = cfg.INTERVAL,
+             workers: int = None, rank_by: str = 'net_pct', min_trades: int = 1) -> pd.DataFrame:
+    """Run every combination of `ranges` over `frames` on a process pool; returns the ranked table."""
+    unknown = [k for k in ranges if k not in SWEEP_KEYS]
+    if unknown: raise ValueError(f"unknown grid key(s) {unknown}; the backtest reads {', '.join(SWEEP_KEYS)}")
+    combos = expand_grid(ranges)
+    columns = list(ranges) + list(summarize(pd.DataFrame()))
+    if not combos: return pd.DataFrame(columns=columns)
+    groups = sorted({_group_key(c) for c in combos})
+    root = tempfile.mkdtemp(prefix='overhuman_opt_')
+    try:
+        t0 = time.time(); shared = build_shared(frames, groups, root)
+        print(f'[OPT] {len(combos)} combos, {len(groups)} indicator set(s) prepared in {time.time()-t0:.2f}s')
+        bar_ms = interval_ms(interval)
+        tasks = [(c, shared[_group_key(c)], bar_ms) for c in combos]
+        workers = workers or os.cpu_count() or 1
+        t0 = time.time()
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            rows = list(pool.map(_run_combo, tasks, chunksize=max(1, len(tasks) // (workers * 8))))
+        print(f'[OPT] swept on {workers} workers in {time.time()-t0:.2f}s')
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    table = pd.DataFrame(rows, columns=columns)
+    table = table[table['trades'] >= min_trades] if min_trades else table
+    return table.sort_values(rank_by, ascending=(rank_by == 'max_dd_pct')).reset_index(drop=True)
+
+def main():
+    ap = argparse.ArgumentParser(description='Grid search strategy knobs over historical klines.')
+    ap.add_argument('paths', nargs='+', help='files, globs or directories of klines (CSV/Parquet or kline archive dirs)')
+    ap.add_argument('--grid', action='append', required=True, metavar='KEY=a:b:step|v1,v2',
+                    help='parameter range, e.g. ADAPT_TRIGGER_ATR=0.3:0.6:0.05 or MIN_ADX=14,18,22')
+    ap.add_argument('--interval', default=cfg.INTERVAL)
+    ap.add_argument('--workers', type=int, default=None)
+    ap.add_argument('--rank', default='net_pct', choices=['net_pct','profit_factor','win_rate','avg_pct','max_dd_pct'])
+    ap.add_argument('--min-trades', type=int, default=30)
+    ap.add_argument('--top', type=int, default=20)
+    ap.add_argument('--out', default='optimize_results.csv')
+    args = ap.parse_args()
+    try: ranges = dict(parse_range(g) for g in args.grid)
+    except ValueError as e: ap.error(str(e))
+    frames = load_universe(args.paths)
+    table = optimize(frames, ranges, args.interval, args.workers, args.rank, args.min_trades)
+    table.to_csv(args.out, index=False)
+    print(table.head(args.top).to_string())
+    print(f'[OPT] {len(table)} ranked rows written to {args.out}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,444 @@
+"""In-process paper exchange: the subset of the python-binance futures Client the bot uses, driven by
+recorded (or synthetic) klines, with configurable latency / weight limit, market fills, TP/SL stop
+matching and user-data events.
+
+    python overhuman_paper.py --symbols 100 --cycles 200              # synthetic data, deterministic
+    python overhuman_paper.py data/BTCUSDT_1m.csv data/ETHUSDT_1m.csv --latency-ms 20
+"""
+import os, json, time, random, argparse, tempfile, threading, collections
+from typing import Callable, Dict, List, Optional
+import overhuman_config as cfg
+from overhuman_klines import interval_ms
+from overhuman_ratelimit import WEIGHTS, klines_weight
+
+PAPER_BALANCE      = getattr(cfg, 'PAPER_BALANCE', 1000.0)
+PAPER_LATENCY_MS   = getattr(cfg, 'PAPER_LATENCY_MS', 0.0)
+PAPER_JITTER_MS    = getattr(cfg, 'PAPER_JITTER_MS', 0.0)
+PAPER_FEE_PCT      = getattr(cfg, 'PAPER_FEE_PCT', getattr(cfg, 'BACKTEST_FEE_PCT', 0.04))
+PAPER_SLIPPAGE_BPS = getattr(cfg, 'PAPER_SLIPPAGE_BPS', 1.0)
+PAPER_WEIGHT_LIMIT = getattr(cfg, 'PAPER_WEIGHT_LIMIT', None)  # per rolling minute; None = unlimited
+
+STOP_TYPES = ('STOP_MARKET', 'TAKE_PROFIT_MARKET')
+
+class PaperAPIError(Exception):
+    """Shaped like binance.exceptions.BinanceAPIException: status_code, code, message (+ response for 429s)."""
+
+    def __init__(self, code: int, message: str, status_code: int = 400, retry_after: Optional[float] = None):
+        super().__init__(f'APIError(code={code}): {message}')
+        self.code = code; self.message = message; self.status_code = status_code
+        self.response = type('Resp', (), {'headers': {'Retry-After': str(retry_after)}})() if retry_after else None
+
+def synthetic_klines(n: int, seed: int = 0, start_price: float = 100.0, interval: str = cfg.INTERVAL,
+                     start_ms: int = 1_700_000_000_000) -> List[list]:
+    """Random-walk klines with volatility regimes, in the raw REST layout (strings for prices)."""
+    rng = random.Random(seed); step = interval_ms(interval); p = start_price; vol = 0.002; out = []
+    for i in range(n):
+        if rng.random() < 0.02: vol = rng.choice([0.001, 0.002, 0.004, 0.008])
+        o = p; c = o * (1 + rng.gauss(0, vol))
+        h = max(o, c) * (1 + abs(rng.gauss(0, vol/2))); l = min(o, c) * (1 - abs(rng.gauss(0, vol/2)))
+        v = rng.uniform(50, 150) * (1 + 200*vol)
+        ot = start_ms + i*step
+        out.append([ot, f'{o:.4f}', f'{h:.4f}', f'{l:.4f}', f'{c:.4f}', f'{v:.3f}', ot + step - 1, '0', 0, '0', '0', '0'])
+        p = c
+    return out
+
+def klines_from_csv(path: str) -> List[list]:
+    from overhuman_backtest import load_klines
+    df = load_klines(path); step = None
+    if len(df) > 1: step = int(df['open_time'].iloc[1] - df['open_time'].iloc[0])
+    return [[int(r.open_time), repr(r.open), repr(r.high), repr(r.low), repr(r.close), repr(r.volume),
+             int(r.open_time) + (step or 60_000) - 1, '0', 0, '0', '0', '0'] for r in df.itertuples()]
+
+class _Transport:
+    """Feeds a MarketStream / UserDataStream from exchange callbacks instead of a websocket."""
+
+    def __init__(self, listeners: list):
+        self._listeners = listeners; self._fn = None
+
+    def start(self, streams: List[str], on_message: Callable[[dict], None]):
+        wanted = set(streams)
+        self._fn = lambda msg: on_message(msg) if msg.get('stream') in wanted else None
+        self._listeners.append(self._fn)
+
+    def stop(self):
+        if self._fn in self._listeners: self._listeners.remove(self._fn)
+
+class PaperExchange:
+    """Every symbol steps through its klines together; bar `i` is the forming bar and its close is the
+    mark. advance() reveals the next bar, triggers stop orders against its high/low (SL before TP when
+    both are inside one bar, like the backtester) and emits kline / markPrice / user-data messages.
+    Positions are hedge-mode (LONG/SHORT) or one-way (BOTH) depending on change_position_mode."""
+
+    def __init__(self, klines: Dict[str, List[list]], start: int = 300, interval: str = cfg.INTERVAL,
+                 balance: float = PAPER_BALANCE, latency_ms: float = PAPER_LATENCY_MS, jitter_ms: float = PAPER_JITTER_MS,
+                 weight_limit: Optional[int] = PAPER_WEIGHT_LIMIT, fee_pct: float = PAPER_FEE_PCT,
+                 slippage_bps: float = PAPER_SLIPPAGE_BPS, seed: int = 0,
+                 tick: str = '0.0001', step: str = '0.001', min_notional: str = '5', leverage: int = 20):
+        self.raw = klines; self.symbols = list(klines)
+        self.bars = {s: [(float(k[1]), float(k[2]), float(k[3]), float(k[4])) for k in kl] for s, kl in klines.items()}
+        self.n = min(len(kl) for kl in klines.values())
+        self.i = min(start, self.n - 1); self.interval = interval; self.step_ms = interval_ms(interval)
+        self.wallet = float(balance); self.fee_pct = float(fee_pct); self.slip = slippage_bps / 10_000.0
+        self.latency = latency_ms / 1000.0; self.jitter = jitter_ms / 1000.0; self.rng = random.Random(seed)
+        self.weight_limit = weight_limit; self._weights = collections.deque()
+        self.filters = {'tick': tick, 'step': step, 'min_notional': min_notional}
+        self.hedge = True
+        self.leverage = {s: int(leverage) for s in self.symbols}
+        self.pos: Dict[tuple, List[float]] = {}          # (symbol, 'LONG'|'SHORT'|'BOTH') -> [amt, entry]
+        self.orders: Dict[int, dict] = {}                # open stop orders by orderId
+        self.fills: List[dict] = []
+        self.calls = collections.Counter(); self.rejects = collections.Counter()
+        self.user_listeners: list = []; self.market_listeners: list = []
+        self._next_id = 1
+        self._lock = threading.RLock()
+
+    # ----- clock -----
+    @property
+    def exhausted(self) -> bool: return self.i >= self.n - 1
+
+    def clock_ms(self) -> int:
+        """Exchange time: inside the forming bar (for KlineStore.fetch_limit)."""
+        return int(self.raw[self.symbols[0]][self.i][0]) + self.step_ms // 2
+
+    def mark(self, symbol: str) -> float: return self.bars[symbol][self.i][3]
+
+    def advance(self, n: int = 1):
+        for _ in range(n):
+            if self.exhausted: return
+            events = []
+            with self._lock:
+                self.i += 1
+                for sym in self.symbols: events += self._match_stops(sym)
+            self._emit_market()
+            for e in events: self._emit(self.user_listeners, e)
+
+    # ----- plumbing -----
+    def _call(self, name: str, weight: int = 1):
+        self.calls[name] += 1
+        if self.weight_limit:
+            now = time.monotonic()
+            with self._lock:
+                while self._weights and now - self._weights[0][0] > 60: self._weights.popleft()
+                used = sum(w for _, w in self._weights)
+                if used + weight > self.weight_limit:
+                    raise PaperAPIError(-1003, 'Too many requests; paper weight limit.', 429, retry_after=60 - (now - self._weights[0][0]))
+                self._weights.append((now, weight))
+        if self.latency or self.jitter:
+            time.sleep(max(0.0, self.latency + self.rng.uniform(-self.jitter, self.jitter)))
+
+    def _sym(self, symbol: str):
+        if symbol not in self.bars: raise PaperAPIError(-1121, 'Invalid symbol.')
+
+    @staticmethod
+    def _emit(listeners: list, msg: dict):
+        for fn in list(listeners):
+            try: fn(msg)
+            except Exception as e: print('[PAPER][WARN] listener:', e)
+
+    def _ts(self) -> int: return self.clock_ms()
+
+    # ----- market data -----
+    def futures_klines(self, symbol: str, interval: str = None, limit: int = 500, startTime: int = None, **kw):
+        self._call('klines', klines_weight(limit)); self._sym(symbol)
+        if startTime is not None:
+            lo = next((j for j, k in enumerate(self.raw[symbol][:self.i + 1]) if k[0] >= startTime), self.i + 1)
+            return self.raw[symbol][lo:min(lo + limit, self.i + 1)]
+        return self.raw[symbol][max(0, self.i + 1 - limit):self.i + 1]
+
+    def futures_mark_price(self, symbol: str = None, **kw):
+        self._call('mark', WEIGHTS['mark'])
+        if symbol is None: return [{'symbol': s, 'markPrice': repr(self.mark(s))} for s in self.symbols]
+        self._sym(symbol)
+        return {'symbol': symbol, 'markPrice': repr(self.mark(symbol)), 'time': self._ts()}
+
+    def futures_exchange_info(self, **kw):
+        self._call('exchange_info', 1)
+        f = self.filters
+        return {'symbols': [{'symbol': s, 'filters': [{'filterType': 'PRICE_FILTER', 'tickSize': f['tick']},
+                                                      {'filterType': 'LOT_SIZE', 'stepSize': f['step'], 'minQty': f['step']},
+                                                      {'filterType': 'MIN_NOTIONAL', 'notional': f['min_notional']}]} for s in self.symbols]}
+
+    def _emit_market(self):
+        if not self.market_listeners: return
+        for sym in self.symbols:
+            for j, closed in ((self.i - 1, True), (self.i, False)):
+                k = self.raw[sym][j]; low = sym.lower()
+                self._emit(self.market_listeners, {'stream': f'{low}@kline_{self.interval}', 'data': {'e': 'kline', 'E': self._ts(), 's': sym,
+                           'k': {'t': k[0], 'T': k[6], 'o': k[1], 'h': k[2], 'l': k[3], 'c': k[4], 'v': k[5], 'x': closed}}})
+            self._emit(self.market_listeners, {'stream': f'{sym.lower()}@markPrice@1s', 'data': {'e': 'markPriceUpdate', 'E': self._ts(), 's': sym, 'p': repr(self.mark(sym))}})
+
+    def market_transport(self) -> _Transport: return _Transport(self.market_listeners)
+
+    def user_transport(self) -> _Transport: return _Transport(self.user_listeners)
+
+    # ----- account -----
+    def futures_account_balance(self, **kw):
+        self._call('balance', WEIGHTS['balance'])
+        return [{'asset': 'USDT', 'balance': f'{self.wallet:.8f}', 'availableBalance': f'{self.wallet:.8f}'}]
+
+    def futures_position_information(self, symbol: str = None, **kw):
+        self._call('positions', WEIGHTS['positions'])
+        with self._lock:  # like the venue: a row per symbol and side, flat ones included
+            return [{'symbol': s, 'positionSide': ps, 'positionAmt': repr(p[0]), 'entryPrice': repr(p[1]),
+                     'markPrice': repr(self.mark(s)), 'unRealizedProfit': repr((self.mark(s) - p[1]) * p[0]),
+                     'leverage': str(self.leverage[s])}
+                    for s in self.symbols if symbol is None or s == symbol
+                    for ps in (('LONG', 'SHORT') if self.hedge else ('BOTH',))
+                    for p in (self.pos.get((s, ps), (0.0, 0.0)),)]
+
+    def futures_change_leverage(self, symbol: str, leverage: int, **kw):
+        self._call('leverage', 1); self._sym(symbol)
+        self.leverage[symbol] = int(leverage)
+        return {'symbol': symbol, 'leverage': leverage}
+
+    def futures_change_position_mode(self, dualSidePosition, **kw):
+        self._call('position_mode', 1)
+        if (str(dualSidePosition).lower() == 'true') == self.hedge: raise PaperAPIError(-4059, 'No need to change position side.')
+        self.hedge = str(dualSidePosition).lower() == 'true'
+        return {'code': 200, 'msg': 'success'}
+
+    def futures_get_position_mode(self, **kw):
+        self._call('position_mode', 1)
+        return {'dualSidePosition': self.hedge}
+
+    # ----- orders -----
+    def _ps(self, o: dict) -> str:
+        if not self.hedge: return 'BOTH'
+        ps = o.get('positionSide')
+        if ps not in ('LONG', 'SHORT'): raise PaperAPIError(-4061, "Order's position side does not match user's setting.")
+        return ps
+
+    def _new_order(self, o: dict) -> dict:
+        sym = o['symbol']; self._sym(sym)
+        typ = o['type']; side = o['side']; ps = self._ps(o)
+        oid = self._next_id; self._next_id += 1
+        cid = o.get('newClientOrderId') or f'paper-{oid}'
+        close_pos = str(o.get('closePosition', '')).lower() == 'true'
+        reduce = str(o.get('reduceOnly', '')).lower() == 'true'
+        qty = float(o.get('quantity') or 0)
+        base = {'orderId': oid, 'clientOrderId': cid, 'symbol': sym, 'type': typ, 'origType': typ, 'side': side, 'positionSide': ps,
+                'closePosition': close_pos, 'reduceOnly': reduce, 'origQty': repr(qty), 'updateTime': self._ts()}
+        if typ == 'MARKET':
+            if close_pos: raise PaperAPIError(-1106, "Parameter 'closePosition' sent when not required.")
+            if qty <= 0: raise PaperAPIError(-4003, 'Quantity less than or equal to zero.')
+            events = self._fill(sym, ps, side, qty, self.mark(sym), base, reduce or None)
+            return dict(base, status='FILLED', executedQty=repr(qty), avgPrice=events[0]['data']['o']['ap'] if events else '0'), events
+        if typ in STOP_TYPES:
+            stop = float(o['stopPrice']); m = self.mark(sym)
+            up = (typ == 'TAKE_PROFIT_MARKET') == (side == 'SELL')  # triggers when price rises to stop
+            if (up and m >= stop) or (not up and m <= stop): raise PaperAPIError(-2021, 'Order would immediately trigger.')
+            rec = dict(base, status='NEW', stopPrice=repr(stop), executedQty='0', avgPrice='0', _stop=stop, _up=up, _qty=qty)
+            self.orders[oid] = rec
+            return {k: v for k, v in rec.items() if not k.startswith('_')}, []
+        raise PaperAPIError(-1116, 'Invalid orderType.')
+
+    def _fill(self, sym: str, ps: str, side: str, qty: float, ref: float, order: dict, reduce=None, exact: bool = False) -> List[dict]:
+        """Apply a fill at ref (+/- slippage unless exact) and return the user-data events it produces."""
+        sign = 1.0 if side == 'BUY' else -1.0
+        price = ref if exact else ref * (1 + sign*self.slip)
+        key = (sym, ps); amt, entry = self.pos.get(key, [0.0, 0.0])
+        if ps == 'LONG': closing = side == 'SELL'
+        elif ps == 'SHORT': closing = side == 'BUY'
+        else: closing = amt != 0 and (amt > 0) != (sign > 0)
+        if reduce and (not closing or amt == 0): raise PaperAPIError(-2022, 'ReduceOnly Order is rejected.')
+        realized = 0.0
+        if closing:
+            qty = min(qty, abs(amt)) if (reduce or ps != 'BOTH') else qty
+            closed = min(qty, abs(amt)); direction = 1.0 if amt > 0 else -1.0
+            realized = (price - entry) * closed * direction
+            rest = qty - closed; amt += sign*closed
+            if rest > 0: amt, entry = sign*rest, price  # one-way flip
+            elif amt == 0: entry = 0.0
+        else:
+            new = amt + sign*qty
+            entry = (entry*abs(amt) + price*qty) / abs(new) if new else 0.0; amt = new
+        if qty <= 0: return []
+        fee = price * qty * self.fee_pct / 100.0
+        self.wallet += realized - fee
+        if amt == 0: self.pos.pop(key, None)
+        else: self.pos[key] = [amt, entry]
+        self.fills.append({'i': self.i, 'symbol': sym, 'positionSide': ps, 'side': side, 'qty': qty, 'price': price,
+                           'realized': realized, 'fee': fee, 'type': order['type']})
+        if amt == 0: self._cancel_close_orders(sym, ps)
+        ts = self._ts()
+        return [{'stream': 'userData', 'data': {'e': 'ORDER_TRADE_UPDATE', 'E': ts, 'o': {
+                    's': sym, 'c': order['clientOrderId'], 'S': side, 'o': 'MARKET', 'ot': order['origType'], 'X': 'FILLED', 'x': 'TRADE',
+                    'i': order['orderId'], 'q': repr(qty), 'z': repr(qty), 'ap': repr(price), 'L': repr(price), 'ps': ps,
+                    'R': order['reduceOnly'], 'cp': order['closePosition'], 'rp': repr(realized), 'n': repr(fee)}}},
+                {'stream': 'userData', 'data': {'e': 'ACCOUNT_UPDATE', 'E': ts, 'a': {'m': 'ORDER',
+                    'B': [{'a': 'USDT', 'wb': f'{self.wallet:.8f}', 'cw': f'{self.wallet:.8f}'}],
+                    'P': [{'s': sym, 'pa': repr(amt), 'ep': repr(entry), 'ps': ps}]}}}]
+
+    def _cancel_close_orders(self, sym: str, ps: str):
+        # closePosition stops have nothing left to close once the side is flat
+        for oid in [k for k, o in self.orders.items() if o['symbol'] == sym and o['positionSide'] == ps and o['closePosition']]:
+            del self.orders[oid]
+
+    def _match_stops(self, sym: str) -> List[dict]:
+        o_, h, l, c = self.bars[sym][self.i]
+        events = []
+        # stops (adverse) before take-profits when both sit inside one bar
+        for rec in sorted((r for r in self.orders.values() if r['symbol'] == sym), key=lambda r: r['type'] != 'STOP_MARKET'):
+            if rec['orderId'] not in self.orders: continue
+            stop = rec['_stop']
+            hit = h >= stop if rec['_up'] else l <= stop
+            if not hit: continue
+            del self.orders[rec['orderId']]
+            px = max(o_, stop) if rec['_up'] else min(o_, stop)  # gap through the stop fills at the open
+            amt = self.pos.get((sym, rec['positionSide']), [0.0, 0.0])[0]
+            qty = abs(amt) if rec['closePosition'] else rec['_qty']
+            if qty <= 0: continue
+            try: events += self._fill(sym, rec['positionSide'], rec['side'], qty, px, rec, True, exact=True)
+            except PaperAPIError: pass
+        return events
+
+    def futures_create_order(self, **params):
+        self._call('order', WEIGHTS['order'])
+        with self._lock: res, events = self._new_order(params)
+        for e in events: self._emit(self.user_listeners, e)
+        return res
+
+    def futures_place_batch_order(self, batchOrders, **kw):
+        self._call('batch_order', WEIGHTS['batch_order'])
+        orders = json.loads(batchOrders) if isinstance(batchOrders, str) else batchOrders
+        if len(orders) > 5: raise PaperAPIError(-1102, 'batchOrders must have at most 5 orders.')
+        out = []; events = []
+        with self._lock:
+            for o in orders:
+                try:
+                    res, ev = self._new_order(dict(o)); out.append(res); events += ev
+                except PaperAPIError as e:
+                    self.rejects[e.code] += 1; out.append({'code': e.code, 'msg': e.message})
+        for e in events: self._emit(self.user_listeners, e)
+        return out
+
+    def futures_get_open_orders(self, symbol: str = None, **kw):
+        self._call('open_orders', WEIGHTS['open_orders'] if symbol else 40)
+        with self._lock:
+            return [{k: v for k, v in o.items() if not k.startswith('_')} for o in self.orders.values() if symbol is None or o['symbol'] == symbol]
+
+    def _cancel(self, symbol: str, oid=None, cid=None) -> dict:
+        with self._lock:
+            for k, o in self.orders.items():
+                if o['symbol'] == symbol and (k == oid or (cid is not None and o['clientOrderId'] == cid)):
+                    del self.orders[k]
+                    return dict({k2: v for k2, v in o.items() if not k2.startswith('_')}, status='CANCELED')
+        raise PaperAPIError(-2011, 'Unknown order sent.')
+
+    def futures_cancel_order(self, symbol: str, orderId=None, origClientOrderId=None, **kw):
+        self._call('cancel', WEIGHTS['cancel'])
+        return self._cancel(symbol, int(orderId) if orderId is not None else None, origClientOrderId)
+
+    def futures_cancel_orders(self, symbol: str, orderIdList=None, origClientOrderIdList=None, **kw):
+        self._call('cancel', WEIGHTS['cancel'])
+        ids = json.loads(orderIdList) if isinstance(orderIdList, str) else (orderIdList or [])
+        cids = json.loads(origClientOrderIdList) if isinstance(origClientOrderIdList, str) else (origClientOrderIdList or [])
+        out = []
+        for oid, cid in [(int(i), None) for i in ids] + [(None, c) for c in cids]:
+            try: out.append(self._cancel(symbol, oid, cid))
+            except PaperAPIError as e: out.append({'code': e.code, 'msg': e.message})
+        return out
+
+    # ----- reporting -----
+    def summary(self) -> dict:
+        realized = sum(f['realized'] for f in self.fills); fees = sum(f['fee'] for f in self.fills)
+        return {'bars_stepped': self.i, 'symbols': len(self.symbols), 'calls': dict(self.calls), 'fills': len(self.fills),
+                'open_positions': len(self.pos), 'open_orders': len(self.orders), 'rejects': dict(self.rejects),
+                'realized': round(realized, 4), 'fees': round(fees, 4), 'wallet': round(self.wallet, 4)}
+
+def run_bot(exchange: PaperExchange, cycles: int, log_prefix: str = 'paper_', speedup: float = 1000.0,
+            cycle_s: Optional[list] = None):
+    """Run commander main() against the paper exchange; each loop sleep advances one bar. The local rate
+    limiter is widened by `speedup` since bars go by faster than wall time (set weight_limit on the
+    exchange to exercise 429 handling instead). cycle_s, when given, collects each loop's wall time
+    (the first one includes boot and the kline bootstrap). With MARKET_DATA_MODE='ws' main() never sleeps:
+    a driver thread advances one bar every PAPER_WS_BAR_SEC once the market stream has subscribed."""
+    import overhuman_commander_ultra as cu, overhuman_execution as ex, overhuman_telemetry as tel
+    from overhuman_exchange_info import filter_registry
+    from overhuman_ratelimit import limiter
+    if speedup: limiter.scale(speedup)
+    cu.SYMBOLS = list(exchange.symbols)
+    cfg.KLINE_ARCHIVE = False  # synthetic / replayed bars stay out of the live archive
+    ex.TRADE_LOG_FILE = log_prefix + os.path.basename(cfg.TRADE_LOG_FILE)
+    tel.TELEMETRY_FILE = log_prefix + os.path.basename(cfg.TELEMETRY_FILE)
+    filter_registry.path = os.path.join(tempfile.gettempdir(), 'overhuman_paper_exchange_info.json')  # keep the live snapshot intact
+    filter_registry.fetch(exchange)
+    n = [0]; mark = [0.0]
+    def _sleep(sec):
+        if cycle_s is not None: cycle_s.append(time.perf_counter() - mark[0])
+        n[0] += 1
+        if n[0] >= cycles or exchange.exhausted: raise KeyboardInterrupt
+        exchange.advance(); mark[0] = time.perf_counter()
+    stop = threading.Event()
+    if getattr(cfg, 'MARKET_DATA_MODE', 'rest') == 'ws':
+        import _thread
+        bar_sec = getattr(cfg, 'PAPER_WS_BAR_SEC', 0.05)
+        def _drive():
+            while not exchange.market_listeners:
+                if stop.wait(0.01): return
+            mark[0] = time.perf_counter()
+            while not stop.wait(bar_sec):
+                try: _sleep(0)
+                except KeyboardInterrupt: _thread.interrupt_main(); return
+        threading.Thread(target=_drive, name='paper-ws-driver', daemon=True).start()
+    t0 = mark[0] = time.perf_counter()
+    try: cu.main(client=exchange, sleep=_sleep, clock=lambda: exchange.clock_ms()/1000.0)
+    except KeyboardInterrupt: pass
+    finally: stop.set()
+    return n[0], time.perf_counter() - t0
+
+def main():
+    ap = argparse.ArgumentParser(description='Run the bot against the in-process paper exchange')
+    ap.add_argument('paths', nargs='*', help='kline CSV/Parquet files (symbol taken from the file name); synthetic data when omitted')
+    ap.add_argument('--symbols', type=int, default=20, help='number of synthetic symbols')
+    ap.add_argument('--bars', type=int, default=1000, help='synthetic bars per symbol')
+    ap.add_argument('--start', type=int, default=300, help='bar index the run starts from (history before it is the warm-up)')
+    ap.add_argument('--cycles', type=int, default=200)
+    ap.add_argument('--latency-ms', type=float, default=PAPER_LATENCY_MS)
+    ap.add_argument('--jitter-ms', type=float, default=PAPER_JITTER_MS)
+    ap.add_argument('--weight-limit', type=int, default=PAPER_WEIGHT_LIMIT)
+    ap.add_argument('--seed', type=int, default=0)
+    ap.add_argument('--json', action='store_true', help='print the summary as JSON')
+    ap.add_argument('--settled', action='store_true', help='account already at the configured leverage / position mode')
+    ap.add_argument('--ws', action='store_true', help="MARKET_DATA_MODE='ws': the paper market stream drives evaluation")
+    ap.add_argument('--boot-bench', type=int, metavar='RUNS', help='time RUNS cold starts (fresh interpreters, one cycle each)')
+    args = ap.parse_args()
+    if args.boot_bench: return boot_bench(args)
+    if args.paths:
+        from overhuman_backtest import symbol_from_path
+        data = {symbol_from_path(p): klines_from_csv(p) for p in args.paths}
+    else:
+        data = {f'SYN{j:03d}USDT': synthetic_klines(args.bars, seed=args.seed*100_003 + j, start_price=10.0 + j) for j in range(args.symbols)}
+    cfg.USER_DATA_STREAM = True; cfg.MARKET_DATA_MODE = 'ws' if args.ws else 'rest'
+    exchange = PaperExchange(data, start=args.start, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                             weight_limit=args.weight_limit, seed=args.seed, leverage=cfg.LEVERAGE if args.settled else 20)
+    if args.settled: exchange.hedge = bool(cfg.HEDGE_MODE)
+    cycles, elapsed = run_bot(exchange, args.cycles)
+    from overhuman_metrics import metrics
+    from overhuman_commander_ultra import BOOT
+    out = dict(exchange.summary(), cycles=cycles, elapsed_s=round(elapsed, 3), cycles_per_s=round(cycles/elapsed, 2) if elapsed else None,
+               boot={k: round(v, 4) for k, v in BOOT.items()})
+    if args.json: print(json.dumps(out, indent=1))
+    else:
+        print('[PAPER]', ' '.join(f'{k}={v}' for k, v in out.items() if k != 'calls'))
+        print('[PAPER] calls', out['calls']); print('[METRICS]', metrics.dump_line())
+
+def boot_bench(args):
+    """Cold-start timing: each run is a fresh interpreter (import cost included) doing one cycle."""
+    import subprocess, statistics, sys
+    argv = [sys.executable, os.path.abspath(__file__), *args.paths, '--symbols', str(args.symbols), '--bars', str(args.bars),
+            '--start', str(args.start), '--cycles', '1', '--latency-ms', str(args.latency_ms), '--jitter-ms', str(args.jitter_ms),
+            '--seed', str(args.seed), '--json'] + (['--settled'] if args.settled else [])
+    walls, boots = [], []
+    for _ in range(args.boot_bench):
+        t0 = time.perf_counter()
+        res = subprocess.run(argv, capture_output=True, text=True, check=True)
+        walls.append(time.perf_counter() - t0)
+        boots.append(json.loads(res.stdout[res.stdout.index('\n{') + 1:] if not res.stdout.startswith('{') else res.stdout)['boot'])
+    out = {'runs': len(walls), 'wall_s': round(statistics.median(walls), 3),
+           'boot': {k: round(statistics.median(b.get(k, 0.0) for b in boots), 4) for k in boots[0]}}
+    if args.json: print(json.dumps(out, indent=1))
+    else: print(f"[BOOT] {out['runs']} runs, median wall {out['wall_s']}s,", ' '.join(f'{k}={v}' for k, v in out['boot'].items()))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+from decimal import Decimal, ROUND_UP
+from typing import Callable, Dict, Iterable, List, Optional
+import numpy as np
+import overhuman_config as cfg
+from utils import d, round_step
+from overhuman_state import state
+from overhuman_positions import positions
+from overhuman_equity import equity
+from overhuman_metrics import metrics
+
+RISK_PER_TRADE_PCT            = float(getattr(cfg, 'RISK_PER_TRADE_PCT', 0.5))
+MIN_RISK_PCT                  = float(getattr(cfg, 'MIN_RISK_PCT', 0.1))
+MAX_RISK_PCT                  = float(getattr(cfg, 'MAX_RISK_PCT', 3.0))
+BASE_SL_PCT                   = float(getattr(cfg, 'BASE_SL_PCT', 0.35))
+CONFIDENCE_MIN                = float(getattr(cfg, 'CONFIDENCE_MIN', 0.6))
+CONFIDENCE_MAX                = float(getattr(cfg, 'CONFIDENCE_MAX', 1.6))
+ENABLE_DYNAMIC_SIZING         = getattr(cfg, 'ENABLE_DYNAMIC_SIZING', True)
+ENABLE_LOSS_STREAK_PROTECTION = getattr(cfg, 'ENABLE_LOSS_STREAK_PROTECTION', True)
+LOSS_STREAK_LIMIT             = getattr(cfg, 'LOSS_STREAK_LIMIT', 3)
+LOSS_STREAK_ACTION            = getattr(cfg, 'LOSS_STREAK_ACTION', 'reduce')
+LOSS_STREAK_REDUCE_PCT        = float(getattr(cfg, 'LOSS_STREAK_REDUCE_PCT', 0.5))
+LOSS_STREAK_PAUSE_SEC         = getattr(cfg, 'LOSS_STREAK_PAUSE_SEC', 600)
+MAX_OPEN_POSITIONS            = getattr(cfg, 'MAX_OPEN_POSITIONS', 2)
+PORTFOLIO_MAX_GROSS_EXPOSURE  = getattr(cfg, 'PORTFOLIO_MAX_GROSS_EXPOSURE', 3.0)
+PORTFOLIO_MAX_SIDE_EXPOSURE   = getattr(cfg, 'PORTFOLIO_MAX_SIDE_EXPOSURE', 2.0)
+PORTFOLIO_MAX_CORRELATION     = getattr(cfg, 'PORTFOLIO_MAX_CORRELATION', 0.8)
+PORTFOLIO_CORR_BARS           = getattr(cfg, 'PORTFOLIO_CORR_BARS', 60)
+ACEZ_DROP_PCT                 = float(getattr(cfg, 'ACEZ_DROP_PCT', 1.0))
+ACEZ_SPIKE_PCT                = float(getattr(cfg, 'ACEZ_SPIKE_PCT', 1.0))
+ACEZ_SL_ATR_MULT              = float(getattr(cfg, 'ACEZ_TP_SL_ATR_MULT', (0.6, 0.8))[1])
+
+class Candidate:
+    """One entry intent of the cycle. plan() fills qty / score / confidence on the ones it keeps.
+    event is what fired it: 'COLLAPSE' / 'SPIKE' for ACE-Z, 'BUY' / 'SELL' for signals; note is display only."""
+    __slots__ = ('symbol', 'kind', 'side', 'factor', 'note', 'row', 'mark', 'filters', 'magnitude', 'event', 'qty', 'score', 'confidence')
+
+    def __init__(self, symbol: str, kind: str, side: str, factor, note: str, row: dict, mark: Decimal, filters: Dict,
+                 magnitude: float = 0.0, event: str = ''):
+        self.symbol = symbol; self.kind = kind; self.side = side; self.factor = factor; self.note = note
+        self.row = row; self.mark = mark; self.filters = filters; self.magnitude = magnitude; self.event = event
+        self.qty: Optional[Decimal] = None; self.score = 0.0; self.confidence = 1.0
+
+def _col(cands: List[Candidate], key: str) -> np.ndarray:
+    return np.array([c.row.get(key, np.nan) for c in cands], dtype=float)
+
+class PortfolioRisk:
+    """Sizes every candidate of a cycle in one vectorized pass, then admits them strongest-first
+    (score per unit of ATR%) against open slots, per-side / gross exposure caps and a return-correlation
+    cap against what is already held or admitted. The loss-streak protection scales or pauses new risk."""
+
+    def __init__(self, max_open: int = MAX_OPEN_POSITIONS, max_gross: float = PORTFOLIO_MAX_GROSS_EXPOSURE,
+                 max_side: float = PORTFOLIO_MAX_SIDE_EXPOSURE, max_corr: float = PORTFOLIO_MAX_CORRELATION,
+                 corr_bars: int = PORTFOLIO_CORR_BARS):
+        self.max_open = max_open; self.max_gross = max_gross; self.max_side = max_side
+        self.max_corr = max_corr; self.corr_bars = corr_bars
+        self.pause_until = 0.0; self._paused_at = 0
+
+    def streak_scale(self, now: float) -> float:
+        """Risk multiplier from the account loss streak: 1, LOSS_STREAK_REDUCE_PCT, or 0 while paused."""
+        n = state.loss_streak
+        if not ENABLE_LOSS_STREAK_PROTECTION or n < LOSS_STREAK_LIMIT:
+            self._paused_at = 0; return 1.0
+        if LOSS_STREAK_ACTION == 'pause':
+            if n != self._paused_at:  # every further loss restarts the pause
+                self._paused_at = n; self.pause_until = now + LOSS_STREAK_PAUSE_SEC
+                print(f'[RISK] loss streak {n} -> pausing entries for {LOSS_STREAK_PAUSE_SEC}s')
+            return 0.0 if now < self.pause_until else 1.0
+        return LOSS_STREAK_REDUCE_PCT
+
+    def size(self, cands: List[Candidate], equity_value: float, scale: float = 1.0) -> np.ndarray:
+        """Target notional per candidate; sets score and confidence."""
+        mark = np.array([float(c.mark) for c in cands]); atr = _col(cands, 'atr')
+        atr = np.where(atr > 0, atr, np.nan)
+        atr_pct = atr / mark * 100.0
+        acez = np.array([c.kind == 'ACE-Z' for c in cands])
+        # signal strength: EMA separation in ATRs weighted by trend strength; ACE-Z: move size vs its trigger
+        trend = np.abs(_col(cands, 'ema_fast') - _col(cands, 'ema_slow')) / atr * (_col(cands, 'adx') / 25.0)
+        mag = np.array([c.magnitude for c in cands], dtype=float)
+        trigger = np.array([ACEZ_SPIKE_PCT if c.event == 'SPIKE' else ACEZ_DROP_PCT for c in cands])
+        score = np.nan_to_num(np.where(acez, mag / trigger, trend), nan=1.0)
+        conf = np.clip(score, CONFIDENCE_MIN, CONFIDENCE_MAX) if ENABLE_DYNAMIC_SIZING else np.ones(len(cands))
+        # stop distance as the brackets will place it: ACE-Z at its ATR multiple, signals per calc_atr_sl_tp
+        sl_pct = np.where(acez & np.isfinite(atr_pct), atr_pct * ACEZ_SL_ATR_MULT, np.fmax(atr_pct, BASE_SL_PCT))
+        risk_pct = np.clip(RISK_PER_TRADE_PCT * conf, MIN_RISK_PCT, MAX_RISK_PCT) * scale
+        factor = np.array([float(c.factor) for c in cands])
+        notional = np.minimum(equity_value * risk_pct / sl_pct, equity_value * MAX_RISK_PCT) * factor
+        for c, s, k in zip(cands, score, conf): c.score = float(s); c.confidence = float(k)
+        return notional
+
+    def _corr(self, symbols: List[str], closes: Optional[Callable[[str], List[float]]]) -> Dict[str, Dict[str, float]]:
+        if closes is None or self.max_corr >= 1: return {}
+        series = {s: np.asarray(closes(s, self.corr_bars + 1), dtype=float) for s in symbols}
+        series = {s: np.diff(np.log(v)) for s, v in series.items() if len(v) == self.corr_bars + 1 and np.all(v > 0)}
+        if len(series) < 2: return {}
+        names = list(series)
+        with np.errstate(invalid='ignore', divide='ignore'): m = np.corrcoef(np.vstack([series[s] for s in names]))
+        return {a: {b: m[i, j] for j, b in enumerate(names)} for i, a in enumerate(names)}
+
+    def plan(self, client, cands: List[Candidate], now: float, symbols: Optional[Iterable[str]] = None,
+             closes: Optional[Callable[[str], List[float]]] = None) -> List[Candidate]:
+        """Candidates to place this cycle, with qty set, in placement order."""
+        if not cands: return []
+        scale = self.streak_scale(now)
+        if scale <= 0:
+            metrics.inc('portfolio_skips{reason="loss_streak"}', len(cands)); return []
+        eq = float(equity.get(client))
+        notional = self.size(cands, eq, scale)
+        atr_pct = _col(cands, 'atr') / np.array([float(c.mark) for c in cands]) * 100.0
+        rank = np.array([c.score for c in cands]) / np.fmax(np.nan_to_num(atr_pct, nan=BASE_SL_PCT), 0.01)
+        held = positions.get(client)
+        wanted = set(symbols) if symbols is not None else None
+        slots = self.max_open - sum(1 for (s, _) in held if wanted is None or s in wanted)
+        side_exp = {'LONG': 0.0, 'SHORT': 0.0}
+        for (s, side), (amt, entry) in held.items(): side_exp[side] = side_exp.get(side, 0.0) + abs(float(amt)) * float(entry)
+        gross = sum(side_exp.values())
+        book = [(s, side) for (s, side) in held]
+        corr = self._corr(sorted({c.symbol for c in cands} | {s for s, _ in book}), closes)
+        out, skipped = [], {}
+        for i in np.argsort(-rank, kind='stable'):
+            c = cands[i]; f = c.filters
+            reason = None
+            if slots <= 0: reason = 'slots'
+            elif (c.symbol, c.side) in book: reason = 'open'  # held or already admitted this cycle
+            else:
+                sign = 1.0 if c.side == 'LONG' else -1.0
+                for s, side in book:
+                    rho = corr.get(c.symbol, {}).get(s)
+                    if rho is not None and rho * sign * (1.0 if side == 'LONG' else -1.0) > self.max_corr:
+                        reason = 'correlation'; break
+            take = 0.0
+            if reason is None:
+                take = min(notional[i], self.max_side*eq - side_exp.get(c.side, 0.0), self.max_gross*eq - gross)
+                if not take > 0 or take < float(f['min_notional']): reason = 'exposure'
+            if reason:
+                skipped[reason] = skipped.get(reason, 0) + 1; metrics.inc(f'portfolio_skips{{reason="{reason}"}}'); continue
+            qty = round_step(d(take) / c.mark, f['step'])
+            if qty < f['min_qty']: qty = f['min_qty']
+            if qty*c.mark < f['min_notional']: qty = (f['min_notional']/c.mark).quantize(f['step'], rounding=ROUND_UP)
+            c.qty = qty; out.append(c)
+            book.append((c.symbol, c.side)); slots -= 1
+            side_exp[c.side] = side_exp.get(c.side, 0.0) + float(qty*c.mark); gross += float(qty*c.mark)
+        if skipped: print(f'[PORTFOLIO] {len(out)}/{len(cands)} admitted, skipped', ' '.join(f'{k}={v}' for k, v in skipped.items()))
+        return out
+
+portfolio = PortfolioRisk()
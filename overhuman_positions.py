@@ -0,0 +1,71 @@
+import time, threading
+from decimal import Decimal
+from typing import Dict, Iterable, Optional, Tuple
+import overhuman_config as cfg
+from utils import d, retry
+from overhuman_ratelimit import limiter, WEIGHTS
+
+POSITION_SNAPSHOT_TTL_SEC = getattr(cfg, 'POSITION_SNAPSHOT_TTL_SEC', 3)
+POSITION_RESYNC_SEC       = getattr(cfg, 'POSITION_RESYNC_SEC', 300)
+_ZERO = (Decimal('0'), Decimal('0'))
+
+class PositionSnapshot:
+    """All open positions from one unfiltered futures_position_information call, cached for a TTL.
+    Keyed by (symbol, 'LONG'|'SHORT'); call invalidate() after our own orders fill.
+    While a user-data stream is live (set_live) the stream writes updates through apply() and
+    reads are pure memory; REST only resyncs every POSITION_RESYNC_SEC."""
+
+    def __init__(self, ttl: float = POSITION_SNAPSHOT_TTL_SEC):
+        self.ttl = ttl
+        self._pos: Dict[Tuple[str,str], Tuple[Decimal,Decimal]] = {}
+        self._ts = 0.0; self.live = False
+        self._lock = threading.Lock()
+
+    def _parse(self, rows) -> Dict[Tuple[str,str], Tuple[Decimal,Decimal]]:
+        out = {}
+        for p in rows:
+            amt = d(p.get('positionAmt','0'))
+            if amt == 0: continue
+            ps = p.get('positionSide') or ('LONG' if amt>0 else 'SHORT')
+            if ps=='LONG' and amt>0: out[(p['symbol'],'LONG')] = (amt, d(p.get('entryPrice','0')))
+            elif ps=='SHORT' and amt<0: out[(p['symbol'],'SHORT')] = (amt, d(p.get('entryPrice','0')))
+        return out
+
+    def refresh(self, client) -> Dict[Tuple[str,str], Tuple[Decimal,Decimal]]:
+        limiter.acquire(WEIGHTS['positions'])
+        rows = retry(lambda: client.futures_position_information(), name='positions', weight=WEIGHTS['positions'], on_error=lambda e,i: print('[WARN] positions attempt',i,e))
+        self._pos = self._parse(rows); self._ts = time.time()
+        return self._pos
+
+    def get(self, client) -> Dict[Tuple[str,str], Tuple[Decimal,Decimal]]:
+        ttl = POSITION_RESYNC_SEC if self.live else self.ttl
+        if time.time() - self._ts < ttl: return self._pos
+        with self._lock:  # one in-flight refresh; concurrent readers reuse its result
+            if time.time() - self._ts < ttl: return self._pos
+            return self.refresh(client)
+
+    def side_amt(self, client, symbol: str, side: str) -> Tuple[Decimal, Decimal]:
+        return self.get(client).get((symbol, side), _ZERO)
+
+    def open_count(self, client, symbols: Optional[Iterable[str]] = None) -> int:
+        pos = self.get(client)
+        if symbols is None: return len(pos)
+        wanted = set(symbols)
+        return sum(1 for (s,_) in pos if s in wanted)
+
+    def apply(self, symbol: str, side: str, amt: Decimal, entry: Decimal):
+        """Stream update for one (symbol, side); amt 0 removes it. Copy-on-write so readers never see a dict mid-update."""
+        with self._lock:
+            pos = dict(self._pos)
+            if amt == 0: pos.pop((symbol, side), None)
+            else: pos[(symbol, side)] = (amt, entry)
+            self._pos = pos
+
+    def set_live(self, live: bool):
+        self.live = live
+        if not live: self._ts = 0.0
+
+    def invalidate(self):
+        if not self.live: self._ts = 0.0  # live: the fill arrives as an ACCOUNT_UPDATE
+
+positions = PositionSnapshot()
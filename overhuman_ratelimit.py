@@ -0,0 +1,179 @@
+import time, threading
+import overhuman_config as cfg
+
+REQUEST_WEIGHT_PER_MIN = getattr(cfg, 'REQUEST_WEIGHT_PER_MIN', 2400)
+RATE_LIMIT_HEADROOM    = getattr(cfg, 'RATE_LIMIT_HEADROOM', 0.8)
+ORDER_LIMIT_PER_10S    = getattr(cfg, 'ORDER_LIMIT_PER_10S', 300)
+ORDER_LIMIT_PER_MIN    = getattr(cfg, 'ORDER_LIMIT_PER_MIN', 1200)
+ORDER_WEIGHT_RESERVE   = getattr(cfg, 'ORDER_WEIGHT_RESERVE', 0.1)
+MIN_LOOP_SECONDS       = getattr(cfg, 'MIN_LOOP_SECONDS', 2)
+MAX_LOOP_SECONDS       = getattr(cfg, 'MAX_LOOP_SECONDS', 30)
+
+# call weights on /fapi (positionRisk without symbol, order endpoints, ...)
+WEIGHTS = {'positions': 5, 'order': 1, 'batch_order': 5, 'cancel': 1, 'open_orders': 1, 'mark': 1, 'balance': 5}
+
+def klines_weight(limit: int) -> int:
+    """USD-M /fapi/v1/klines weight by limit."""
+    if limit < 100: return 1
+    if limit < 500: return 2
+    if limit <= 1000: return 5
+    return 10
+
+class WeightBudget:
+    """Token bucket over a per-window allowance, shared by every worker thread."""
+
+    def __init__(self, per_minute: float = REQUEST_WEIGHT_PER_MIN, headroom: float = RATE_LIMIT_HEADROOM, window: float = 60.0):
+        self.capacity = float(per_minute) * headroom
+        self.rate = self.capacity / window
+        self.tokens = self.capacity
+        self._ts = time.monotonic()
+        self._cond = threading.Condition()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._ts) * self.rate)
+        self._ts = now
+
+    def available(self) -> float:
+        with self._cond:
+            self._refill(); return self.tokens
+
+    def try_acquire(self, weight: float = 1, reserve: float = 0.0) -> bool:
+        with self._cond:
+            self._refill()
+            if self.tokens - weight >= reserve:
+                self.tokens -= weight; return True
+            return False
+
+    def acquire(self, weight: float = 1, reserve: float = 0.0):
+        """Block until `weight` tokens are available without dipping below `reserve`."""
+        weight = min(weight, self.capacity - reserve)
+        with self._cond:
+            while True:
+                self._refill()
+                if self.tokens - weight >= reserve:
+                    self.tokens -= weight; return
+                self._cond.wait((weight + reserve - self.tokens) / self.rate)
+
+    def drain_to(self, tokens: float):
+        """Clamp local tokens down to what the exchange says is left."""
+        with self._cond:
+            self._refill(); self.tokens = min(self.tokens, max(0.0, tokens))
+
+class RateLimiter:
+    """Request-weight and order-count limiter. Local token buckets gate every call, and
+    the X-MBX-USED-WEIGHT-1M / X-MBX-ORDER-COUNT-* response headers pull them back to what the
+    exchange has counted. Part of the weight is kept for orders so market data cannot starve exits.
+    A 429/418 blocks everything until its Retry-After passes."""
+
+    def __init__(self, per_minute: float = REQUEST_WEIGHT_PER_MIN, headroom: float = RATE_LIMIT_HEADROOM):
+        self.limit = float(per_minute); self.headroom = headroom
+        self.weight = WeightBudget(per_minute, headroom)
+        self.orders_10s = WeightBudget(ORDER_LIMIT_PER_10S, headroom, window=10.0)
+        self.orders_1m = WeightBudget(ORDER_LIMIT_PER_MIN, headroom)
+        self.reserve = self.weight.capacity * ORDER_WEIGHT_RESERVE
+        self.used_weight = 0; self.used_ts = 0.0
+        self.consumed = 0.0; self.server_consumed = 0.0  # monotonic counters; diff them per cycle
+        self.ban_until = 0.0
+        self._lock = threading.Lock()
+
+    def scale(self, factor: float):
+        """Multiply every budget (paper runs step exchange time faster than the wall clock)."""
+        self.weight = WeightBudget(self.limit*factor, self.headroom)
+        self.orders_10s = WeightBudget(ORDER_LIMIT_PER_10S*factor, self.headroom, window=10.0)
+        self.orders_1m = WeightBudget(ORDER_LIMIT_PER_MIN*factor, self.headroom)
+        self.reserve = self.weight.capacity * ORDER_WEIGHT_RESERVE
+
+    # ----- gating -----
+    def _wait_ban(self):
+        wait = self.ban_until - time.time()
+        if wait > 0: time.sleep(wait)
+
+    def acquire(self, weight: float = 1, kind: str = 'data', orders: int = 1):
+        self._wait_ban()
+        if kind == 'order':
+            self.orders_10s.acquire(orders); self.orders_1m.acquire(orders)
+            self.weight.acquire(weight)
+        else:
+            self.weight.acquire(weight, reserve=self.reserve)
+        with self._lock: self.consumed += weight
+
+    # ----- exchange feedback -----
+    def attach(self, client):
+        """Observe every HTTP response of a python-binance client (requests session hook)."""
+        session = getattr(client, 'session', None)
+        if session is not None and hasattr(session, 'hooks'):
+            session.hooks.setdefault('response', []).append(self._on_response)
+        return client
+
+    def _on_response(self, resp, *args, **kwargs):
+        try: self.observe(resp.headers, resp.status_code)
+        except Exception: pass
+        return resp
+
+    def used(self) -> int:
+        """Exchange-reported weight for the current minute (resets on the minute boundary)."""
+        if int(time.time() // 60) != int(self.used_ts // 60): return 0
+        return self.used_weight
+
+    def observe(self, headers, status: int = 200):
+        h = {k.lower(): v for k, v in headers.items()}
+        used = h.get('x-mbx-used-weight-1m')
+        if used is not None:
+            used = int(used); now = time.time()
+            with self._lock:
+                prev = self.used()
+                self.server_consumed += max(0, used - prev)
+                self.used_weight = used; self.used_ts = now
+            self.weight.drain_to(self.weight.capacity - used)
+        oc = h.get('x-mbx-order-count-10s')
+        if oc is not None: self.orders_10s.drain_to(self.orders_10s.capacity - int(oc))
+        oc = h.get('x-mbx-order-count-1m')
+        if oc is not None: self.orders_1m.drain_to(self.orders_1m.capacity - int(oc))
+        if status in (418, 429):
+            self.penalize(float(h.get('retry-after') or (120 if status == 418 else 60)))
+
+    def penalize(self, seconds: float):
+        with self._lock: self.ban_until = max(self.ban_until, time.time() + seconds)
+        self.weight.drain_to(0)
+        print(f'[RATE][WARN] rate limited, backing off {seconds:.0f}s')
+
+    def backoff_for(self, exc) -> float:
+        """Retry delay for a 429/418 exception (Retry-After when the response carries one)."""
+        resp = getattr(exc, 'response', None)
+        ra = resp.headers.get('Retry-After') if resp is not None and hasattr(resp, 'headers') else None
+        status = getattr(exc, 'status_code', 429)
+        secs = float(ra) if ra else (120.0 if status == 418 else 60.0)
+        self.penalize(secs)
+        return secs
+
+    # ----- loop pacing -----
+    def mark(self) -> tuple:
+        return (self.consumed, self.server_consumed)
+
+    def spent_since(self, mark: tuple) -> float:
+        """Weight used since mark(): gated calls or the exchange's count, whichever saw more."""
+        return max(self.consumed - mark[0], self.server_consumed - mark[1])
+
+    def utilization(self) -> float:
+        return max(self.used(), self.weight.capacity - self.weight.available()) / self.weight.capacity
+
+    def next_sleep(self, elapsed: float, cycle_weight: float, base: float,
+                   min_period: float = MIN_LOOP_SECONDS, max_period: float = MAX_LOOP_SECONDS) -> float:
+        """Seconds to sleep before the next cycle. The period is the longer of the sustainable
+        one (cycle weight against the per-minute allowance) and a headroom-scaled target: fast
+        under 50% utilization, back to `base` at 80%, stretched to the minute reset above 90%."""
+        now = time.time()
+        if self.ban_until > now: return self.ban_until - now
+        sustainable = 60.0 * cycle_weight / (self.weight.capacity - self.reserve) if cycle_weight > 0 else 0.0
+        u = self.utilization()
+        if u < 0.5: target = min_period
+        elif u < 0.8: target = min_period + (base - min_period) * (u - 0.5) / 0.3
+        elif u < 0.9: target = base
+        else:
+            target = max(base, 60.0 - now % 60)
+            print(f'[RATE] weight at {u*100:.0f}% of budget, slowing to {target:.1f}s')
+        period = min(max(target, sustainable, min_period), max_period)
+        return max(0.0, period - elapsed)
+
+limiter = RateLimiter()
@@ -1,21 +1,18 @@
 from decimal import Decimal
 from typing import Dict
 from utils import d, round_step
+from overhuman_stream import mark_price
+from overhuman_equity import equity
 from overhuman_config import (TARGET_MIN_EQUITY, RISK_PER_TRADE_PCT, BASE_SL_PCT,
                               MAX_RISK_PCT, MIN_RISK_PCT, CONFIDENCE_MIN, CONFIDENCE_MAX)
 
 def account_equity(client) -> Decimal:
-    try:
-        bals = client.futures_account_balance()
-        for b in bals:
-            if b.get('asset') in ('USDT','FDUSD','BUSD'):
-                return d(b.get('balance','0'))
-    except Exception:
-        pass
-    return TARGET_MIN_EQUITY
+    """Cached wallet balance (see overhuman_equity); TARGET_MIN_EQUITY when it cannot be fetched."""
+    return equity.get(client)
 
-def compute_risk_based_qty(client, filters: Dict, sl_distance: Decimal, symbol: str, confidence: Decimal) -> Decimal:
-    """Compute qty using base risk scaled by confidence (Decimal). Ensures result obeys min/max risk caps."""
+def compute_risk_based_qty(client, filters: Dict, sl_distance: Decimal, symbol: str, confidence: Decimal, price: Decimal = None) -> Decimal:
+    """Compute qty using base risk scaled by confidence (Decimal). Ensures result obeys min/max risk caps.
+    Pass `price` when the caller already has the mark; with a fed equity cache this makes no requests."""
     equity = account_equity(client)
     base_risk_pct = d(RISK_PER_TRADE_PCT)
     # scale risk by confidence (bounded)
@@ -27,7 +24,7 @@ def compute_risk_based_qty(client, filters: Dict, sl_distance: Decimal, symbol:
     if risk_pct > d(MAX_RISK_PCT):
         risk_pct = d(MAX_RISK_PCT)
     risk_cap = equity * (risk_pct/Decimal('100'))
-    price = d(client.futures_mark_price(symbol=symbol)['markPrice'])
+    price = price if price else mark_price(client, symbol)
     if sl_distance and sl_distance > 0:
         sl_pct = (sl_distance / price) * Decimal('100')
         if sl_pct <= 0:
@@ -0,0 +1,85 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Tuple, Any
+import overhuman_config as cfg
+
+SCAN_WORKERS = getattr(cfg, 'SCAN_WORKERS', 8)
+AFTERBURNER_SCAN_FACTOR      = getattr(cfg, 'AFTERBURNER_SCAN_FACTOR', 3)
+AFTERBURNER_MAX_DURATION_SEC = getattr(cfg, 'AFTERBURNER_MAX_DURATION_SEC', 300)
+AFTERBURNER_SPIKE_RATIO      = getattr(cfg, 'AFTERBURNER_SPIKE_RATIO', 1.8)
+AFTERBURNER_WARMUP_SCANS     = getattr(cfg, 'AFTERBURNER_WARMUP_SCANS', 20)
+
+class SymbolScheduler:
+    """Runs the per-symbol fetch -> indicators -> filters stage on a bounded thread pool.
+    Results come back in input order so the caller can serialize order placement."""
+
+    def __init__(self, workers: int = SCAN_WORKERS):
+        self.workers = max(1, int(workers))
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='scan')
+
+    def map(self, fn: Callable[[str], Any], symbols: Iterable[str]) -> List[Tuple[str, Any]]:
+        """fn(symbol) for every symbol; a failing symbol is logged and skipped, not fatal for the cycle."""
+        symbols = list(symbols)
+        if self.workers == 1 or len(symbols) <= 1:
+            futs = None
+        else:
+            futs = [(s, self._pool.submit(fn, s)) for s in symbols]
+        out = []
+        for i, s in enumerate(symbols):
+            try:
+                out.append((s, fn(s) if futs is None else futs[i][1].result()))
+            except Exception as e:
+                print('[ERROR]', s, e)
+        return out
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+class BurstCadence:
+    """Per-symbol scan cadence ("afterburner"). Quiet symbols are scanned once per loop period;
+    a symbol whose vol_pct or ATR% jumps to spike_ratio x its own running baseline, or that fires
+    ACE-Z, is scanned `factor` times as often for up to `duration` seconds."""
+
+    def __init__(self, factor: float = AFTERBURNER_SCAN_FACTOR, duration: float = AFTERBURNER_MAX_DURATION_SEC,
+                 spike_ratio: float = AFTERBURNER_SPIKE_RATIO, warmup: int = AFTERBURNER_WARMUP_SCANS):
+        self.factor = max(1.0, float(factor)); self.duration = duration
+        self.spike_ratio = spike_ratio; self.warmup = warmup
+        self._last: Dict[str, float] = {}
+        self._until: Dict[str, float] = {}
+        self._base: Dict[str, List[float]] = {}  # symbol -> [ema vol_pct, ema atr%, samples]
+        self._lock = threading.Lock()
+
+    def bursting(self, symbol: str, now: float) -> bool:
+        return self._until.get(symbol, 0.0) > now
+
+    def ignite(self, symbol: str, now: float, reason: str):
+        with self._lock:
+            if self.bursting(symbol, now): return  # duration counts from the first trigger, not extended
+            self._until[symbol] = now + self.duration
+        print(f'[AFTERBURNER] {symbol} {reason} -> scan x{self.factor:g} for {self.duration:.0f}s')
+
+    def observe(self, symbol: str, row: dict, now: float) -> bool:
+        """Update the symbol's volatility baseline from an indicator row; ignite on a spike."""
+        vol = row.get('vol_pct'); atr = row.get('atr'); close = row.get('close')
+        if vol is None or atr is None or not close or vol != vol or atr != atr: return False
+        atr_pct = atr / close * 100.0
+        b = self._base.get(symbol)
+        if b is None: b = self._base[symbol] = [vol, atr_pct, 0]
+        spike = b[2] >= self.warmup and (vol >= self.spike_ratio*b[0] or atr_pct >= self.spike_ratio*b[1])
+        b[0] += 0.05*(vol - b[0]); b[1] += 0.05*(atr_pct - b[1]); b[2] += 1
+        if spike: self.ignite(symbol, now, f'vol spike {vol:.3f}% / atr {atr_pct:.3f}%')
+        return spike
+
+    def interval(self, symbol: str, period: float, now: float) -> float:
+        return period / self.factor if self.bursting(symbol, now) else period
+
+    def due(self, symbols: Iterable[str], now: float, period: float) -> List[str]:
+        # 5% slack so a symbol that is due a few ms after the wake-up is not pushed a whole interval
+        return [s for s in symbols if now - self._last.get(s, 0.0) >= 0.95*self.interval(s, period, now)]
+
+    def mark_scanned(self, symbol: str, now: float): self._last[symbol] = now
+
+    def sleep_for(self, symbols: Iterable[str], now: float, period: float) -> float:
+        """Seconds until the next symbol is due."""
+        nxt = min((self._last.get(s, 0.0) + self.interval(s, period, now) for s in symbols), default=now + period)
+        return max(0.0, nxt - now)
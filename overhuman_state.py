@@ -0,0 +1,82 @@
+import time, threading
+from decimal import Decimal
+from typing import Dict, Iterator, Optional, Tuple
+
+_ZERO = Decimal('0')
+
+class SideState:
+    """Trade state of one (symbol, side). Fields are only written under `lock`; single-field reads
+    (cooldown pre-checks, telemetry) may skip it."""
+    __slots__ = ('symbol', 'side', 'entry_ts', 'entry_price', 'qty', 'pyramid', 'last_rearm_ts', 'acez_last_fire_ts', 'lock')
+
+    def __init__(self, symbol: str, side: str):
+        self.symbol = symbol; self.side = side
+        self.entry_ts = 0.0; self.entry_price = _ZERO; self.qty = _ZERO; self.pyramid = 0
+        self.last_rearm_ts = 0.0; self.acez_last_fire_ts = 0.0
+        self.lock = threading.Lock()
+
+    @property
+    def active(self) -> bool: return self.qty != 0
+
+    def claim(self, field: str, now: float, cooldown: float) -> bool:
+        """Stamp `field` with now if its cooldown has passed; check and write are one step, so of two
+        workers racing for the same re-arm / fire only one gets True."""
+        with self.lock:
+            if now - getattr(self, field) < cooldown: return False
+            setattr(self, field, now); return True
+
+    def as_dict(self) -> dict:
+        return {'symbol': self.symbol, 'side': self.side, 'entry_ts': self.entry_ts, 'entry_price': self.entry_price,
+                'qty': self.qty, 'pyramid': self.pyramid}
+
+class StateRegistry:
+    """Per-(symbol, side) trade state shared by execution, risk, telemetry and the user-data stream,
+    plus the account-wide loss streak. Safe to use from the scheduler workers and stream threads."""
+
+    def __init__(self):
+        self._states: Dict[Tuple[str, str], SideState] = {}
+        self._lock = threading.Lock()
+        self.loss_streak = 0
+
+    def get(self, symbol: str, side: str) -> SideState:
+        st = self._states.get((symbol, side))
+        if st is None:
+            with self._lock:
+                st = self._states.setdefault((symbol, side), SideState(symbol, side))
+        return st
+
+    def __iter__(self) -> Iterator[SideState]: return iter(list(self._states.values()))
+
+    def open_trade(self, symbol: str, side: str, qty: Decimal, price: Decimal, ts: Optional[float] = None):
+        """Record a fill; adding to an open side counts as a pyramid level and averages the entry."""
+        st = self.get(symbol, side)
+        with st.lock:
+            if st.active:
+                total = st.qty + qty
+                st.entry_price = (st.entry_price*st.qty + price*qty)/total if total else price
+                st.qty = total; st.pyramid += 1
+            else:
+                st.entry_ts = ts if ts is not None else time.time()
+                st.entry_price = price; st.qty = qty; st.pyramid = 0
+
+    def close_trade(self, symbol: str, side: str) -> Optional[dict]:
+        """Clear the side and return what was open, or None if nothing was (so only one exit path logs it)."""
+        st = self.get(symbol, side)
+        with st.lock:
+            if not st.active: return None
+            trade = st.as_dict()
+            st.entry_ts = 0.0; st.entry_price = _ZERO; st.qty = _ZERO; st.pyramid = 0
+            return trade
+
+    def record_result(self, pnl_pct) -> int:
+        with self._lock:
+            self.loss_streak = self.loss_streak + 1 if pnl_pct < 0 else 0
+            return self.loss_streak
+
+    def pyramid_total(self, side: str) -> int:
+        return sum(st.pyramid for st in self if st.side == side and st.active)
+
+    def open_sides(self) -> int:
+        return sum(1 for st in self if st.active)
+
+state = StateRegistry()
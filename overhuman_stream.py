@@ -0,0 +1,143 @@
+import json, time, queue, threading
+from decimal import Decimal
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import overhuman_config as cfg
+from utils import d
+
+MARK_PRICE_MAX_AGE_SEC = getattr(cfg, 'MARK_PRICE_MAX_AGE_SEC', 5)
+
+class PriceState:
+    """In-memory latest mark price per symbol, written by the stream and read by sizing/execution.
+    Each mark is stamped with its local receipt time (clock()), which max_age is measured against;
+    the exchange event time only drops updates that arrive out of order."""
+
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self.clock = clock
+        self._marks: Dict[str, Tuple[Decimal, float, float]] = {}  # symbol -> (price, received, event_ts)
+        self._lock = threading.Lock()
+
+    def set_mark(self, symbol: str, price, event_ts: Optional[float] = None):
+        with self._lock:
+            v = self._marks.get(symbol)
+            if event_ts is not None and v is not None and event_ts < v[2]: return
+            self._marks[symbol] = (d(price), self.clock(), event_ts if event_ts is not None else (v[2] if v else 0.0))
+
+    def mark(self, symbol: str, max_age: Optional[float] = MARK_PRICE_MAX_AGE_SEC) -> Optional[Decimal]:
+        v = self._marks.get(symbol)
+        if v is None: return None
+        if max_age is not None and self.clock() - v[1] > max_age: return None
+        return v[0]
+
+    def clear(self):
+        with self._lock: self._marks.clear()
+
+price_state = PriceState()
+
+def mark_price(client, symbol: str) -> Decimal:
+    """Streamed mark price when fresh, otherwise a single REST lookup."""
+    m = price_state.mark(symbol)
+    if m is not None: return m
+    return d(client.futures_mark_price(symbol=symbol)['markPrice'])
+
+# ===== Transports =====
+class BinanceWSTransport:
+    """python-binance ThreadedWebsocketManager on the USD-M combined stream endpoint."""
+
+    def __init__(self, testnet: bool = cfg.TESTNET):
+        self.testnet = testnet; self._twm = None
+
+    def start(self, streams: List[str], on_message: Callable[[dict], None]):
+        from binance import ThreadedWebsocketManager
+        self._twm = ThreadedWebsocketManager(testnet=self.testnet)
+        self._twm.start()
+        self._twm.start_futures_multiplex_socket(callback=on_message, streams=streams)
+
+    def stop(self):
+        if self._twm is not None: self._twm.stop(); self._twm = None
+
+class ReplayTransport:
+    """Offline stand-in: replays recorded combined-stream messages ({'stream':..., 'data':...})
+    from a list or a JSONL file. speed=0 replays as fast as possible, 1.0 honours event times."""
+
+    def __init__(self, messages, speed: float = 0.0):
+        self.messages = messages; self.speed = speed
+        self._thread = None; self._stop = threading.Event(); self.done = threading.Event()
+
+    def _iter(self) -> Iterable[dict]:
+        if isinstance(self.messages, str):
+            with open(self.messages) as f:
+                for line in f:
+                    if line.strip(): yield json.loads(line)
+        else:
+            yield from self.messages
+
+    def start(self, streams: List[str], on_message: Callable[[dict], None]):
+        wanted = set(streams)
+        def _run():
+            prev = None
+            for msg in self._iter():
+                if self._stop.is_set(): break
+                if msg.get('stream') not in wanted: continue
+                ts = msg.get('data', {}).get('E')
+                if self.speed and prev is not None and ts:
+                    time.sleep(max(0.0, (ts - prev)/1000.0/self.speed))
+                prev = ts or prev
+                on_message(msg)
+            self.done.set()
+        self._thread = threading.Thread(target=_run, name='replay-transport', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None: self._thread.join(timeout=2)
+
+# ===== Market stream =====
+class MarketStream:
+    """Subscribes kline + markPrice streams for every symbol, keeps KlineStore / PriceState current
+    and queues (kind, symbol, ts) events: 'bar' on kline close, 'tick' on mark price, 'gap' when a
+    REST backfill is needed. on_price hooks get (symbol, ts, price) for every kline and mark update."""
+
+    def __init__(self, store, symbols: List[str], transport, interval: str = cfg.INTERVAL, prices: PriceState = price_state):
+        self.store = store; self.symbols = list(symbols); self.transport = transport
+        self.interval = interval; self.prices = prices
+        self.events: 'queue.Queue[Tuple[str,str,float]]' = queue.Queue()
+        self._by_lower = {s.lower(): s for s in self.symbols}
+        self.on_price: List[Callable[[str, float, float], None]] = []
+
+    def _price(self, sym: str, ts: float, price: float):
+        for fn in self.on_price:
+            try: fn(sym, ts, price)
+            except Exception as e: print('[WS][WARN] price hook:', sym, e)
+
+    def streams(self) -> List[str]:
+        out = []
+        for s in self.symbols:
+            out += [f'{s.lower()}@kline_{self.interval}', f'{s.lower()}@markPrice@1s']
+        return out
+
+    def start(self): self.transport.start(self.streams(), self.on_message)
+
+    def stop(self): self.transport.stop()
+
+    def on_message(self, msg: dict):
+        data = msg.get('data', msg)
+        et = data.get('e')
+        if et == 'error':
+            print('[WS][WARN]', data.get('m')); return
+        sym = self._by_lower.get(str(data.get('s', '')).lower())
+        if sym is None: return
+        ts = data.get('E', time.time()*1000)/1000.0
+        if et == 'kline':
+            k = data['k']; closed = bool(k.get('x'))
+            bar = (int(k['t']), float(k['o']), float(k['h']), float(k['l']), float(k['c']), float(k['v']), int(k['T']))
+            self._price(sym, ts, bar[4])
+            if self.store.apply_bar(sym, bar, closed) is None: self.events.put(('gap', sym, ts))
+            elif closed: self.events.put(('bar', sym, ts))
+        elif et == 'markPriceUpdate':
+            self.prices.set_mark(sym, data['p'], ts)
+            self._price(sym, ts, float(data['p']))
+            self.events.put(('tick', sym, ts))
+
+    def next_event(self, timeout: float = 1.0) -> Optional[Tuple[str,str,float]]:
+        try: return self.events.get(timeout=timeout)
+        except queue.Empty: return None
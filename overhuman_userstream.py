@@ -0,0 +1,97 @@
+import time
+from decimal import Decimal
+from typing import Callable, List
+import overhuman_config as cfg
+from utils import d
+from overhuman_positions import positions
+from overhuman_metrics import metrics
+import overhuman_execution as ex
+from overhuman_state import state
+
+USER_STREAM_NAME = 'userData'  # pseudo stream name; lets ReplayTransport filter recorded user events
+
+class BinanceUserTransport:
+    """python-binance ThreadedWebsocketManager user-data socket (listen key create/keepalive handled by the library)."""
+
+    def __init__(self, testnet: bool = cfg.TESTNET):
+        self.testnet = testnet; self._twm = None
+
+    def start(self, streams: List[str], on_message: Callable[[dict], None]):
+        from binance import ThreadedWebsocketManager
+        from utils import get_api_keys
+        key, sec = get_api_keys()
+        self._twm = ThreadedWebsocketManager(api_key=key, api_secret=sec, testnet=self.testnet)
+        self._twm.start()
+        self._twm.start_futures_user_socket(callback=on_message)
+
+    def stop(self):
+        if self._twm is not None: self._twm.stop(); self._twm = None
+
+def _side(ps: str, amt: Decimal) -> str:
+    if ps in ('LONG', 'SHORT'): return ps
+    return 'LONG' if amt > 0 else 'SHORT'  # one-way mode: the sign says which side is open
+
+class UserDataStream:
+    """Applies ACCOUNT_UPDATE / ORDER_TRADE_UPDATE events to in-memory state as they arrive:
+    positions are written into the PositionSnapshot (which then stops polling), bracket / reduce-only
+    fills go through execution._handle_trade_exit, entry fills correct the recorded entry price.
+    Extra consumers can subscribe to on_fill(order) and on_balance(balances, event_ts)."""
+
+    def __init__(self, client, transport, snapshot=positions):
+        self.client = client; self.transport = transport; self.positions = snapshot
+        self.on_fill: List[Callable[[dict], None]] = []
+        self.on_balance: List[Callable[[list, float], None]] = []
+        self.last_event = 0.0
+
+    def start(self):
+        self.positions.refresh(self.client)  # baseline; the stream keeps it current from here
+        self.positions.set_live(True)
+        self.transport.start([USER_STREAM_NAME], self.on_message)
+
+    def stop(self):
+        self.transport.stop(); self.positions.set_live(False)
+
+    def on_message(self, msg: dict):
+        data = msg.get('data', msg)
+        et = data.get('e'); ts = data.get('E', time.time()*1000)/1000.0
+        self.last_event = ts
+        try:
+            if et == 'ACCOUNT_UPDATE': self._account(data.get('a', {}), ts)
+            elif et == 'ORDER_TRADE_UPDATE': self._order(data.get('o', {}))
+            elif et == 'listenKeyExpired':
+                print('[USER][WARN] listen key expired, falling back to position polling')
+                self.positions.set_live(False)
+            elif et == 'error':
+                print('[USER][WARN]', data.get('m')); self.positions.set_live(False)
+        except Exception as e:
+            print('[USER][WARN] event failed:', et, e)
+
+    def _account(self, a: dict, ts: float):
+        for p in a.get('P', []):
+            amt = d(p.get('pa', '0'))
+            ps = p.get('ps', 'BOTH')
+            if ps == 'BOTH' and amt == 0:
+                for side in ('LONG', 'SHORT'): self.positions.apply(p['s'], side, amt, d(p.get('ep', '0')))
+            else:
+                self.positions.apply(p['s'], _side(ps, amt), amt, d(p.get('ep', '0')))
+        if a.get('B'):
+            for fn in self.on_balance: fn(a['B'], ts)
+
+    def _order(self, o: dict):
+        if o.get('X') not in ('FILLED', 'PARTIALLY_FILLED') or o.get('x') != 'TRADE': return
+        for fn in self.on_fill: fn(o)
+        if o.get('X') != 'FILLED': return
+        buy = o.get('S') == 'BUY'; ps = o.get('ps')
+        if ps in ('LONG', 'SHORT'):  # hedge mode: the side a fill trades against its position decides, whatever the order type
+            side = ps; closing = (ps == 'LONG') != buy
+        else:                        # one-way mode: only the reduce-only / close-position flags (brackets set them) tell
+            closing = bool(o.get('ot') in ex.BRACKET_TYPES or o.get('R') or o.get('cp'))
+            side = ('SHORT' if buy else 'LONG') if closing else ('LONG' if buy else 'SHORT')
+        price = d(o.get('ap') or o.get('L') or '0')
+        if closing:
+            metrics.inc('exchange_exits')
+            ex._handle_trade_exit(self.client, o.get('s'), side, price)
+        else:
+            st = state.get(o.get('s'), side)
+            with st.lock:
+                if st.active and st.pyramid == 0 and price > 0: st.entry_price = price
@@ -0,0 +1,68 @@
+"""place_entry_with_brackets rollback paths against a stub batchOrders client."""
+import functools
+from decimal import Decimal
+import pytest
+import utils
+import overhuman_execution as ex
+from overhuman_metrics import metrics
+from overhuman_state import state
+
+FILTERS = {'tick': Decimal('0.01'), 'step': Decimal('0.001'), 'min_notional': Decimal('5'), 'min_qty': Decimal('0.001')}
+OK = {'orderId': 1}
+REJECTED = {'code': -2021, 'msg': 'Order would immediately trigger.'}
+
+class StubClient:
+    """Answers each batchOrders call from `batches` in turn; market orders fail when flatten_fails."""
+
+    def __init__(self, *batches, flatten_fails: bool = False):
+        self.batches = list(batches); self.flatten_fails = flatten_fails
+        self.placed, self.cancelled, self.created = [], [], []
+
+    def futures_place_batch_order(self, batchOrders):
+        self.placed.append(batchOrders)
+        return self.batches.pop(0)
+
+    def futures_cancel_orders(self, symbol, **ids):
+        self.cancelled.append(ids); return []
+
+    def futures_create_order(self, **params):
+        self.created.append(params)
+        if self.flatten_fails: raise RuntimeError('-1001 disconnected')
+        return {'orderId': 9, 'avgPrice': '100'}
+
+@pytest.fixture(autouse=True)
+def fast_retry(monkeypatch):
+    monkeypatch.setattr(ex, 'retry', functools.partial(utils.retry, base_delay=0, jitter=0))
+
+def enter(client, symbol):
+    return ex.place_entry_with_brackets(client, symbol, 'BUY', Decimal('0.5'), Decimal('100'), Decimal('1'), Decimal('0.5'), FILTERS, False)
+
+def test_entry_rejected_cancels_accepted_brackets():
+    client = StubClient([REJECTED, OK, OK])
+    with pytest.raises(RuntimeError, match='entry rejected'): enter(client, 'ENTRYUSDT')
+    tp, sl = client.placed[0][1:]
+    assert client.cancelled == [{'origClientOrderIdList': f'["{tp["newClientOrderId"]}","{sl["newClientOrderId"]}"]'}]
+    assert client.created == [] and not state.get('ENTRYUSDT', 'LONG').active
+
+@pytest.mark.parametrize('leg', ['tp', 'sl'])
+def test_bracket_rejected_flattens_entry(leg):
+    symbol = f'ROLL{leg.upper()}USDT'
+    client = StubClient([OK, REJECTED, OK] if leg == 'tp' else [OK, OK, REJECTED])
+    before = metrics['rollbacks']
+    with pytest.raises(RuntimeError, match='rolled back'): enter(client, symbol)
+    kept = client.placed[0][2 if leg == 'tp' else 1]
+    assert client.cancelled == [{'origClientOrderIdList': f'["{kept["newClientOrderId"]}"]'}]
+    assert client.created == [{'symbol': symbol, 'side': 'SELL', 'type': 'MARKET', 'quantity': '0.5', 'reduceOnly': 'true'}]
+    assert metrics['rollbacks'] == before + 1 and not state.get(symbol, 'LONG').active
+
+def test_failed_rollback_keeps_entry_and_places_stop():
+    client = StubClient([{'orderId': 1, 'avgPrice': '100.2'}, OK, REJECTED], [OK, OK], flatten_fails=True)
+    failures = metrics['rollback_failures']
+    e_res, tp_res, sl_res = enter(client, 'STUCKUSDT')
+    assert len(client.created) == 5  # every flatten attempt was made
+    assert metrics['rollback_failures'] == failures + 1
+    st = state.get('STUCKUSDT', 'LONG')
+    assert st.active and st.qty == Decimal('0.5') and st.entry_price == Decimal('100.2')
+    tp, sl = client.placed[1]
+    assert (tp['type'], sl['type']) == ('TAKE_PROFIT_MARKET', 'STOP_MARKET') and sl['stopPrice'] == '99.50'
+    assert sl_res == OK
@@ -0,0 +1,52 @@
+"""Float fast path and vectorized filters against the Decimal baseline (market_filters_ok / pick_signal)."""
+from decimal import InvalidOperation
+import numpy as np
+import pandas as pd
+import pytest
+from overhuman_filters import (market_filters_ok, pick_signal, market_filters_ok_fast, pick_signal_fast,
+                               market_filters_mask, signal_vector)
+from overhuman_indicators import add_indicators
+from overhuman_paper import synthetic_klines
+from overhuman_klines import parse_kline
+
+NAN_COLUMNS = ['atr', 'vol_pct', 'vol_mean', 'bb_width', 'adx', 'rsi', 'ema_fast', 'ema_slow', 'ema_slope']
+
+def frame(seed: int, nan_rows: int = 0) -> pd.DataFrame:
+    bars = [parse_kline(k) for k in synthetic_klines(600, seed=seed, start_price=20.0 + seed)]
+    df = add_indicators(pd.DataFrame(bars, columns=['open_time', 'open', 'high', 'low', 'close', 'volume', 'close_time']))
+    rng = np.random.default_rng(seed)
+    for i, col in zip(rng.integers(60, len(df), nan_rows), rng.choice(NAN_COLUMNS, nan_rows)):
+        df.loc[i, col] = np.nan
+    return df
+
+def decimal_decision(row) -> str:
+    try: ok = market_filters_ok(row, {})
+    except (InvalidOperation, TypeError): ok = False  # the Decimal path raises on NaN where the fast path fails the filter
+    return pick_signal(row) if ok else 'HOLD'
+
+def fast_decision(row) -> str:
+    return pick_signal_fast(row) if market_filters_ok_fast(row, {}) else 'HOLD'
+
+@pytest.mark.parametrize('seed,nan_rows', [(0, 0), (1, 0), (2, 40), (3, 120)])
+def test_fast_path_matches_decimal(seed, nan_rows):
+    df = frame(seed, nan_rows)
+    rows = [df.iloc[i] for i in range(len(df))]
+    ref = [decimal_decision(r) for r in rows]
+    assert [fast_decision(r) for r in rows] == ref
+    assert any(x != 'HOLD' for x in ref)  # the frames exercise both signals, not only HOLD
+    assert [fast_decision(r.to_dict()) for r in rows] == ref  # KlineStore rows are plain dicts
+
+@pytest.mark.parametrize('seed,nan_rows', [(4, 0), (5, 80)])
+def test_vectorized_matches_decimal(seed, nan_rows):
+    df = frame(seed, nan_rows)
+    ref = np.array([{'BUY': 1, 'SELL': -1, 'HOLD': 0}[decimal_decision(df.iloc[i])] for i in range(len(df))])
+    got = (signal_vector(df) * market_filters_mask(df).astype('int8')).to_numpy()
+    assert np.array_equal(got, ref)
+
+def test_nan_bb_width_fails_every_path():
+    df = frame(6)
+    i = next(j for j in range(len(df)) if fast_decision(df.iloc[j]) != 'HOLD')
+    df.loc[i, 'bb_width'] = np.nan
+    row = df.iloc[i]
+    assert decimal_decision(row) == 'HOLD' and fast_decision(row) == 'HOLD'
+    assert not market_filters_mask(df).iloc[i]
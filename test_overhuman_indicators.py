@@ -0,0 +1,55 @@
+"""Batch, streaming and pandas-facade indicators against the pandas reference, within EQUIVALENCE_TOL."""
+import numpy as np
+import pandas as pd
+import pytest
+from overhuman_indicators import (INDICATOR_COLUMNS, EQUIVALENCE_TOL, StreamingIndicators, add_indicators,
+                                  add_indicators_reference, compute_indicators, _max_err)
+from overhuman_config import ATR_WINDOW, VOL_WINDOW, BB_WINDOW, ADX_PERIOD
+from overhuman_klines import parse_kline
+from overhuman_paper import synthetic_klines
+
+COLUMNS = ['open_time', 'open', 'high', 'low', 'close', 'volume', 'close_time']
+BARS = [[parse_kline(k) for k in synthetic_klines(400, seed=j, start_price=10.0 + 40*j)] for j in range(3)]
+ARR = np.array(BARS, dtype=float)  # symbols x bars x COLUMNS
+
+@pytest.fixture(scope='module')
+def reference():
+    return [add_indicators_reference(pd.DataFrame(b, columns=COLUMNS)) for b in BARS]
+
+def assert_close(got: np.ndarray, want: np.ndarray, what: str):
+    assert np.array_equal(np.isnan(got), np.isnan(want)), f'{what}: NaN positions differ'
+    assert _max_err(got, want) <= EQUIVALENCE_TOL, f'{what}: {_max_err(got, want):.2e}'
+
+def test_warm_up_is_nan_in_reference(reference):
+    ref = reference[0]
+    warm_up = {'rsi': 14, 'ema_slope': 2, 'atr': ATR_WINDOW - 1, 'vol_pct': VOL_WINDOW, 'vol_mean': 29,
+               'bb_width': BB_WINDOW - 1, 'adx': 2*ADX_PERIOD - 1}
+    for col, warm in warm_up.items():
+        assert ref[col].iloc[:warm].isna().all() and ref[col].iloc[warm:].notna().all(), col
+
+@pytest.mark.parametrize('col', INDICATOR_COLUMNS)
+def test_batch_matches_reference(reference, col):
+    batch = compute_indicators(ARR[..., 2], ARR[..., 3], ARR[..., 4], ARR[..., 5])
+    for j, ref in enumerate(reference):
+        assert_close(batch[col][j], ref[col].to_numpy(), f'2-D batch {col} #{j}')
+        single = compute_indicators(ARR[j, :, 2], ARR[j, :, 3], ARR[j, :, 4], ARR[j, :, 5])
+        assert_close(single[col], ref[col].to_numpy(), f'1-D {col} #{j}')
+
+@pytest.mark.parametrize('col', INDICATOR_COLUMNS)
+def test_streaming_matches_reference(reference, col):
+    for j, ref in enumerate(reference):
+        si = StreamingIndicators(); rows = [si.push(bar) for bar in BARS[j]]
+        assert_close(np.array([r[col] for r in rows]), ref[col].to_numpy(), f'streaming {col} #{j}')
+
+def test_facade_matches_reference_and_leaves_input(reference):
+    df = pd.DataFrame(BARS[1], columns=COLUMNS); before = df.copy()
+    out = add_indicators(df)
+    pd.testing.assert_frame_equal(df, before)
+    for col in INDICATOR_COLUMNS: assert_close(out[col].to_numpy(), reference[1][col].to_numpy(), f'facade {col}')
+
+def test_peek_matches_push():
+    si = StreamingIndicators()
+    for bar in BARS[2][:-1]: si.push(bar)
+    peeked = si.peek(BARS[2][-1]); pushed = si.push(BARS[2][-1])
+    assert peeked.keys() == pushed.keys()
+    assert all(peeked[k] == pushed[k] or (peeked[k] != peeked[k] and pushed[k] != pushed[k]) for k in peeked)
@@ -0,0 +1,15 @@
+"""PortfolioRisk.size scoring: ACE-Z moves are scored against the trigger of their event type."""
+from decimal import Decimal
+import overhuman_portfolio as pf
+
+ROW = {'atr': 1.0, 'ema_fast': 100.0, 'ema_slow': 100.0, 'adx': 25.0}
+
+def acez(event: str, note: str = 'fired') -> pf.Candidate:
+    return pf.Candidate('AAAUSDT', 'ACE-Z', 'SHORT' if event == 'SPIKE' else 'LONG', Decimal('1'), note, ROW,
+                        Decimal('100'), {}, magnitude=3.0, event=event)
+
+def test_acez_score_uses_event_trigger(monkeypatch):
+    monkeypatch.setattr(pf, 'ACEZ_DROP_PCT', 1.0); monkeypatch.setattr(pf, 'ACEZ_SPIKE_PCT', 2.0)
+    cands = [acez('SPIKE'), acez('COLLAPSE'), acez('COLLAPSE', note='SPIKE-like wording')]
+    pf.PortfolioRisk().size(cands, 1000.0)
+    assert [c.score for c in cands] == [1.5, 3.0, 3.0]  # the display note never changes sizing
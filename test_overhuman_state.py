@@ -0,0 +1,18 @@
+"""SideState.claim: the cooldown check and the stamp are atomic across worker threads."""
+import threading
+from overhuman_state import SideState
+
+def test_claim_admits_one_racer():
+    st = SideState('AAAUSDT', 'LONG'); start = threading.Barrier(16); wins = []
+    def race():
+        start.wait(); wins.append(st.claim('last_rearm_ts', 1000.0, 60.0))
+    threads = [threading.Thread(target=race) for _ in range(16)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    assert wins.count(True) == 1 and st.last_rearm_ts == 1000.0
+
+def test_claim_respects_cooldown():
+    st = SideState('AAAUSDT', 'SHORT')
+    assert st.claim('acez_last_fire_ts', 100.0, 30.0)
+    assert not st.claim('acez_last_fire_ts', 129.0, 30.0) and st.acez_last_fire_ts == 100.0
+    assert st.claim('acez_last_fire_ts', 130.0, 30.0) and st.acez_last_fire_ts == 130.0
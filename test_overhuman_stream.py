@@ -0,0 +1,52 @@
+"""MarketStream driven offline from ReplayTransport: KlineStore updates, bar/tick/gap dispatch, mark freshness."""
+from decimal import Decimal
+from overhuman_klines import KlineStore, parse_kline
+from overhuman_paper import synthetic_klines
+from overhuman_stream import MarketStream, PriceState, ReplayTransport
+
+SYM = 'AAAUSDT'
+RAW = synthetic_klines(130, seed=7, interval='1m')
+SEEDED = 100
+
+def kline_msg(k, closed: bool, ts: int) -> dict:
+    return {'stream': f'{SYM.lower()}@kline_1m', 'data': {'e': 'kline', 'E': ts, 's': SYM,
+            'k': {'t': k[0], 'T': k[6], 'o': k[1], 'h': k[2], 'l': k[3], 'c': k[4], 'v': k[5], 'x': closed}}}
+
+def mark_msg(price: str, ts: int) -> dict:
+    return {'stream': f'{SYM.lower()}@markPrice@1s', 'data': {'e': 'markPriceUpdate', 'E': ts, 's': SYM, 'p': price}}
+
+def replay(messages, clock):
+    store = KlineStore(None, '1m'); store.seed(SYM, [parse_kline(k) for k in RAW[:SEEDED]])
+    prices = PriceState(clock=clock); seen = []
+    transport = ReplayTransport(messages)
+    stream = MarketStream(store, [SYM], transport, '1m', prices)
+    stream.on_price.append(lambda sym, ts, price: seen.append((sym, price)))
+    stream.start(); assert transport.done.wait(5)
+    events = []
+    while (ev := stream.next_event(timeout=0)) is not None: events.append(ev)
+    return store, prices, events, seen
+
+def test_replay_updates_store_and_dispatches():
+    msgs = []
+    for j in range(SEEDED, 110):
+        close_ms = RAW[j][6] + 1
+        msgs += [kline_msg(RAW[j], False, close_ms - 30_000), kline_msg(RAW[j], True, close_ms), mark_msg(RAW[j][4], close_ms)]
+    msgs.append(kline_msg(RAW[120], True, RAW[120][6] + 1))  # ten bars missing -> REST backfill
+    msgs.append({'stream': 'zzzusdt@markPrice@1s', 'data': {'e': 'markPriceUpdate', 'E': 0, 's': 'ZZZUSDT', 'p': '1'}})  # not subscribed
+    store, prices, events, seen = replay(msgs, clock=lambda: 1000.0)
+
+    assert [kind for kind, _, _ in events] == ['bar', 'tick'] * 10 + ['gap']
+    assert events[0] == ('bar', SYM, (RAW[SEEDED][6] + 1) / 1000.0)
+    assert store.last(SYM)['open_time'] == RAW[109][0]
+    assert store.closes(SYM, 10) == [float(k[4]) for k in RAW[100:110]]
+    ref = KlineStore(None, '1m'); ref.seed(SYM, [parse_kline(k) for k in RAW[:110]])
+    assert store.last(SYM) == ref.last(SYM)  # streamed bars advance the indicators like seeded ones
+    assert len(seen) == 31 and seen[-1] == (SYM, float(RAW[120][4]))
+    assert prices.mark(SYM) == Decimal(RAW[109][4])
+
+def test_mark_freshness_uses_receipt_time():
+    now = [5_000_000.0]  # local clock far ahead of the recorded event times (skew / simulated time)
+    _, prices, _, _ = replay([mark_msg('101.5', 2_000), mark_msg('99.0', 1_000)], clock=lambda: now[0])
+    assert prices.mark(SYM) == Decimal('101.5')  # older event arrived late and is dropped
+    now[0] += 4.0; assert prices.mark(SYM, max_age=5) == Decimal('101.5')
+    now[0] += 2.0; assert prices.mark(SYM, max_age=5) is None  # max_age counts from when it was received
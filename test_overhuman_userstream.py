@@ -0,0 +1,80 @@
+"""UserDataStream fills replayed through ReplayTransport in hedge and one-way mode: state, loss streak, trade log."""
+from decimal import Decimal
+import pytest
+import overhuman_execution as ex
+import overhuman_userstream as us
+from overhuman_positions import PositionSnapshot
+from overhuman_state import StateRegistry
+from overhuman_stream import ReplayTransport
+
+SYM = 'AAAUSDT'
+
+class StubClient:
+    def futures_position_information(self): return []
+
+def order(side: str, otype: str, ps: str, price: str, qty: str = '0.5', reduce: bool = False, close: bool = False) -> dict:
+    return {'stream': us.USER_STREAM_NAME, 'data': {'e': 'ORDER_TRADE_UPDATE', 'E': 1_700_000_000_000, 'o': {
+        's': SYM, 'S': side, 'o': otype, 'ot': otype, 'X': 'FILLED', 'x': 'TRADE', 'ps': ps,
+        'ap': price, 'L': price, 'q': qty, 'z': qty, 'R': reduce, 'cp': close}}}
+
+def account(amt: str, entry: str, ps: str) -> dict:
+    return {'stream': us.USER_STREAM_NAME, 'data': {'e': 'ACCOUNT_UPDATE', 'E': 1_700_000_000_000,
+            'a': {'P': [{'s': SYM, 'pa': amt, 'ep': entry, 'ps': ps}]}}}
+
+@pytest.fixture
+def env(monkeypatch):
+    """Fresh state registry and position snapshot; trade-log rows collected instead of written."""
+    reg = StateRegistry(); rows = []
+    monkeypatch.setattr(us, 'state', reg); monkeypatch.setattr(ex, 'state', reg)
+    monkeypatch.setattr(ex, '_append_trade_log', rows.append)
+    return reg, rows
+
+def replay(messages) -> PositionSnapshot:
+    snap = PositionSnapshot(); transport = ReplayTransport(messages)
+    stream = us.UserDataStream(StubClient(), transport, snap)
+    stream.start(); assert transport.done.wait(5)
+    return snap
+
+def ps(hedge: bool, side: str) -> str:
+    return side if hedge else 'BOTH'
+
+@pytest.mark.parametrize('hedge', [True, False])
+def test_entry_fill_corrects_entry_price(env, hedge):
+    reg, rows = env
+    reg.open_trade(SYM, 'LONG', Decimal('0.5'), Decimal('100'))  # as execution records it off the reference price
+    snap = replay([order('BUY', 'MARKET', ps(hedge, 'LONG'), '100.5'), account('0.5', '100.5', ps(hedge, 'LONG'))])
+    st = reg.get(SYM, 'LONG')
+    assert st.active and st.entry_price == Decimal('100.5') and st.qty == Decimal('0.5')
+    assert not reg.get(SYM, 'SHORT').active and rows == [] and reg.loss_streak == 0
+    assert snap.side_amt(None, SYM, 'LONG') == (Decimal('0.5'), Decimal('100.5'))
+
+@pytest.mark.parametrize('hedge', [True, False])
+def test_take_profit_fill_logs_win(env, hedge):
+    reg, rows = env
+    reg.loss_streak = 2; reg.open_trade(SYM, 'LONG', Decimal('0.5'), Decimal('100'))
+    replay([order('SELL', 'TAKE_PROFIT_MARKET', ps(hedge, 'LONG'), '101', close=True), account('0', '0', ps(hedge, 'LONG'))])
+    assert not reg.get(SYM, 'LONG').active and reg.loss_streak == 0
+    assert [(r['symbol'], r['side'], r['entry_price'], r['exit_price'], r['qty'], r['pnl_pct']) for r in rows] == \
+           [(SYM, 'LONG', '100', '101', '0.5', 1.0)]
+
+@pytest.mark.parametrize('hedge', [True, False])
+def test_stop_loss_fill_on_short_counts_loss(env, hedge):
+    reg, rows = env
+    reg.open_trade(SYM, 'SHORT', Decimal('0.5'), Decimal('100'))
+    replay([order('BUY', 'STOP_MARKET', ps(hedge, 'SHORT'), '102', close=True)])
+    assert not reg.get(SYM, 'SHORT').active and reg.loss_streak == 1
+    assert [(r['side'], r['exit_price'], r['pnl_pct']) for r in rows] == [('SHORT', '102', -2.0)]
+
+@pytest.mark.parametrize('hedge', [True, False])
+def test_manual_market_close(env, hedge):
+    reg, rows = env
+    reg.open_trade(SYM, 'LONG', Decimal('0.5'), Decimal('100'))
+    # hedge mode: a SELL against the LONG position closes it; one-way: only reduce-only marks a close
+    replay([order('SELL', 'MARKET', ps(hedge, 'LONG'), '99.5', reduce=not hedge)])
+    assert not reg.get(SYM, 'LONG').active and not reg.get(SYM, 'SHORT').active and reg.loss_streak == 1
+    assert [(r['side'], r['exit_price'], r['pnl_pct']) for r in rows] == [('LONG', '99.5', -0.5)]
+
+def test_hedge_short_entry_is_not_a_close(env):
+    reg, rows = env
+    replay([order('SELL', 'MARKET', 'SHORT', '100')])  # SELL on the SHORT side opens it, though SELL closes a LONG
+    assert rows == [] and reg.loss_streak == 0 and not reg.get(SYM, 'LONG').active
@@ -1,18 +1,32 @@
 import os, time, random
 from decimal import Decimal, ROUND_DOWN, getcontext
 from typing import Any, Callable
-from dotenv import load_dotenv
-from binance.client import Client
+from overhuman_metrics import metrics
 
 getcontext().prec = 18
 
+_ENV_LOADED = False
+
+def load_env():
+    """Read .env into os.environ once per process (.env wins over the inherited environment)."""
+    global _ENV_LOADED
+    if _ENV_LOADED: return
+    from dotenv import load_dotenv
+    load_dotenv(override=True); _ENV_LOADED = True
+
 def load_env_overrides(cfg):
-    load_dotenv(override=True)
+    load_env()
     cfg.TESTNET    = _env_bool("TESTNET", cfg.TESTNET)
     cfg.SYMBOL     = os.getenv("SYMBOL", cfg.SYMBOL)
     cfg.LEVERAGE   = int(os.getenv("LEVERAGE", cfg.LEVERAGE))
     cfg.HEDGE_MODE = _env_bool("HEDGE_MODE", cfg.HEDGE_MODE)
     cfg.INTERVAL   = os.getenv("INTERVAL", cfg.INTERVAL)
+    cfg.MARKET_DATA_MODE = os.getenv("MARKET_DATA_MODE", getattr(cfg, "MARKET_DATA_MODE", "rest")).lower()
+    cfg.USER_DATA_STREAM = _env_bool("USER_DATA_STREAM", getattr(cfg, "USER_DATA_STREAM", True))
+    cfg.METRICS_PORT = int(os.getenv("METRICS_PORT", getattr(cfg, "METRICS_PORT", 0)))
+    cfg.PROFILE_CYCLES = int(os.getenv("PROFILE_CYCLES", getattr(cfg, "PROFILE_CYCLES", 0)))
+    cfg.KLINE_ARCHIVE = _env_bool("KLINE_ARCHIVE", getattr(cfg, "KLINE_ARCHIVE", True))
+    cfg.KLINE_ARCHIVE_DIR = os.getenv("KLINE_ARCHIVE_DIR", getattr(cfg, "KLINE_ARCHIVE_DIR", "kline_archive"))
     return cfg
 
 def _env_bool(key: str, default: bool) -> bool:
@@ -21,26 +35,83 @@ def _env_bool(key: str, default: bool) -> bool:
     return str(v).strip().lower() in ("1","true","yes","y","on")
 
 def get_api_keys():
-    from dotenv import dotenv_values
-    env = dotenv_values()
-    key = env.get("API_KEY") or os.getenv("API_KEY")
-    sec = env.get("API_SECRET") or os.getenv("API_SECRET")
+    load_env()
+    key = os.getenv("API_KEY")
+    sec = os.getenv("API_SECRET")
     if not key or not sec:
         raise RuntimeError("Missing API_KEY/API_SECRET. Fill them in .env")
     return key, sec
 
-def setup_client(TESTNET: bool):
+def setup_client(TESTNET: bool, pool_size: int = 16, connect_timeout: float = 3.05, read_timeout: float = 10.0):
+    """Sync client on a pooled keep-alive session: up to pool_size concurrent connections per host,
+    TLS sessions reused across calls, (connect, read) timeouts on every request, latency per endpoint."""
+    key, sec = get_api_keys()
+    client = _futures_client_class()(key, sec, testnet=TESTNET, requests_params={'timeout': (connect_timeout, read_timeout)})
+    tune_session(client.session, pool_size)
+    return client
+
+def _futures_client_class():
+    from binance.client import Client  # deferred: python-binance (+ dateparser, aiohttp) is the slowest import
+    class FuturesClient(Client):
+        """Client minus the constructor's spot ping, a TLS round-trip to a host the bot never calls."""
+        def __init__(self, *args, **kwargs): super(Client, self).__init__(*args, **kwargs)
+    return FuturesClient
+
+def tune_session(session, pool_size: int = 16):
+    """Mount a sized HTTPAdapter (no urllib3 retries, retry() owns that) and time every response."""
+    from requests.adapters import HTTPAdapter
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+    session.mount('https://', adapter); session.mount('http://', adapter)
+    session.headers['Connection'] = 'keep-alive'
+    session.hooks.setdefault('response', []).append(_record_latency)
+    return session
+
+def _record_latency(resp, *args, **kwargs):
+    # resp.elapsed: request sent -> response headers parsed (excludes body download and our queueing)
+    try: metrics.observe(f'http{{path="{_path(resp.url)}"}}', resp.elapsed.total_seconds())
+    except Exception: pass
+    return resp
+
+def _path(url: str) -> str:
+    from urllib.parse import urlsplit
+    return urlsplit(url).path or '/'
+
+async def setup_async_client(TESTNET: bool, pool_size: int = 16, connect_timeout: float = 3.05, read_timeout: float = 10.0):
+    """AsyncClient for concurrent callers (asyncio.gather over symbols) with the same pool size,
+    timeouts and per-endpoint latency as setup_client. Close with `await client.close_connection()`."""
+    import aiohttp
+    from binance import AsyncClient
     key, sec = get_api_keys()
-    return Client(key, sec, testnet=TESTNET)
+    trace = aiohttp.TraceConfig()
+    async def _start(session, ctx, params): ctx.t0 = time.perf_counter()
+    async def _end(session, ctx, params): metrics.observe(f'http{{path="{params.url.path}"}}', time.perf_counter() - ctx.t0)
+    trace.on_request_start.append(_start); trace.on_request_end.append(_end)
+    session_params = {'connector': aiohttp.TCPConnector(limit=pool_size, limit_per_host=pool_size, ttl_dns_cache=300, keepalive_timeout=60),
+                      'trace_configs': [trace]}
+    timeout = aiohttp.ClientTimeout(total=connect_timeout + read_timeout, sock_connect=connect_timeout, sock_read=read_timeout)
+    return await AsyncClient.create(key, sec, testnet=TESTNET, requests_params={'timeout': timeout}, session_params=session_params)
 
-def retry(op: Callable, attempts=5, base_delay=0.8, jitter=0.2, on_error: Callable[[Exception,int],None]=None):
+def retry(op: Callable, attempts=5, base_delay=0.8, jitter=0.2, on_error: Callable[[Exception,int],None]=None,
+          name: str = None, weight: int = 0):
+    """Call op() with exponential backoff; every attempt is timed into metrics as rest{call="name"}."""
+    key = name or getattr(op, '__name__', 'call')
     for i in range(attempts):
+        t0 = time.perf_counter()
         try:
-            return op()
+            res = op()
+            metrics.observe(f'rest{{call="{key}"}}', time.perf_counter() - t0)
+            if weight: metrics.inc(f'rest_weight{{call="{key}"}}', weight)
+            return res
         except Exception as e:
+            metrics.observe(f'rest{{call="{key}"}}', time.perf_counter() - t0)
+            metrics.inc(f'rest_errors{{call="{key}"}}')
             if on_error: on_error(e, i+1)
             if i == attempts - 1: raise
+            metrics.inc(f'rest_retries{{call="{key}"}}')
             delay = base_delay * (2 ** i) + random.uniform(0, jitter)
+            if getattr(e, 'status_code', None) in (418, 429):
+                from overhuman_ratelimit import limiter  # lazy: overhuman_config imports utils
+                delay = max(delay, limiter.backoff_for(e))
             time.sleep(delay)
 
 def round_step(qty: Decimal, step: Decimal) -> Decimal: